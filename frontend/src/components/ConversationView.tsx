@@ -112,12 +112,14 @@ export function ConversationView({ ws, recorder }: Props) {
             <ControlPanel
               isConnected={isConnected}
               isWarming={isWarming}
+              queuePosition={ws.queuePosition}
               hasError={hasError}
               textPrompt={textPrompt}
               onTextPromptChange={setTextPrompt}
               onStart={startConversation}
               onStop={stopConversation}
               vcPipeline={vcPipeline}
+              proxyStats={ws.proxyStats}
               meanvcSteps={meanvcSteps}
               onMeanvcStepsChange={setMeanvcSteps}
               audioOutputs={audioOutputs}
@@ -24,7 +24,11 @@ function MetricRow({ icon, label, value }: { icon: React.ReactNode; label: strin
   )
 }
 
-function ResponseCard({ title, color, m }: { title: string; color: string; m: ResponseMetrics }) {
+// Pitch numbers from different trackers aren't comparable, so say which one made them.
+function ResponseCard({ title, color, m, pitchBackend }: {
+  title: string; color: string; m: ResponseMetrics; pitchBackend?: string | null
+}) {
+  const src = pitchBackend ? ` (${pitchBackend})` : ""
   return (
     <div
       className="flex flex-col rounded-lg border-2 p-4"
@@ -37,8 +41,11 @@ function ResponseCard({ title, color, m }: { title: string; color: string; m: Re
       <div className="divide-y divide-border/60">
         <MetricRow icon={<Gauge className="size-3.5" />} label="Speech Rate" value={num(m.speech_rate, 1, " syl/s")} />
         <MetricRow icon={<Smile className="size-3.5" />} label="Sentiment" value={m.sentiment ?? "N/A"} />
-        <MetricRow icon={<Activity className="size-3.5" />} label="Mean Pitch" value={num(m.mean_pitch, 0, " Hz")} />
-        <MetricRow icon={<Waves className="size-3.5" />} label="Pitch Std Dev" value={num(m.std_pitch, 0, " Hz")} />
+        <MetricRow icon={<Activity className="size-3.5" />} label={`Mean Pitch${src}`} value={num(m.mean_pitch, 0, " Hz")} />
+        <MetricRow icon={<Waves className="size-3.5" />} label={`Pitch Std Dev${src}`} value={num(m.std_pitch, 0, " Hz")} />
+        {m.voiced_ratio != null && (
+          <MetricRow icon={<Waves className="size-3.5" />} label={`Voiced${src}`} value={num(m.voiced_ratio * 100, 0, "%")} />
+        )}
         {m.duration != null && (
           <MetricRow icon={<Clock className="size-3.5" />} label="Duration" value={num(m.duration, 1, " s")} />
         )}
@@ -90,8 +97,8 @@ export function MetricsResultView({ data }: { data: MetricsResult }) {
 
       {/* Per-response text/pitch metrics */}
       <div className="grid gap-4 sm:grid-cols-2">
-        <ResponseCard title="Original Speaker" color={COLOR_A} m={data.response_a} />
-        <ResponseCard title="Voice Converted Speaker" color={COLOR_B} m={data.response_b} />
+        <ResponseCard title="Original Speaker" color={COLOR_A} m={data.response_a} pitchBackend={data.pitch_backend} />
+        <ResponseCard title="Voice Converted Speaker" color={COLOR_B} m={data.response_b} pitchBackend={data.pitch_backend} />
       </div>
 
       {/* Semantic similarity */}
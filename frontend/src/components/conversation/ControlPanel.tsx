@@ -6,18 +6,21 @@ import { Mic, MicOff, ChevronRight, Wand2, Volume2, Pause, Headphones } from "lu
 import { useRef, useState } from "react"
 import { cn } from "@/lib/utils"
 import type { useMeanVCPipeline } from "@/hooks/useMeanVCPipeline"
+import type { ProxyStats } from "@/hooks/useWebSocket"
 
 type VCState = ReturnType<typeof useMeanVCPipeline>
 
 interface Props {
   isConnected: boolean
   isWarming: boolean
+  queuePosition?: number | null
   hasError: boolean
   textPrompt: string
   onTextPromptChange: (v: string) => void
   onStart: () => void
   onStop: () => void
   vcPipeline: VCState
+  proxyStats: ProxyStats | null
   meanvcSteps: number
   onMeanvcStepsChange: (v: number) => void
   audioOutputs: MediaDeviceInfo[]
@@ -61,10 +64,10 @@ function PipelinePill({ children }: { children: React.ReactNode }) {
 }
 
 export function ControlPanel({
-  isConnected, isWarming, hasError,
+  isConnected, isWarming, queuePosition, hasError,
   textPrompt, onTextPromptChange,
   onStart, onStop,
-  vcPipeline, meanvcSteps, onMeanvcStepsChange,
+  vcPipeline, proxyStats, meanvcSteps, onMeanvcStepsChange,
   audioOutputs,
   feedbackEnabled, onFeedbackEnabledChange,
   feedbackDeviceId, onFeedbackDeviceChange,
@@ -134,7 +137,9 @@ export function ControlPanel({
       {isWarming && (
         <div className="flex flex-col items-center gap-0.5 text-center">
           <p className="text-xs font-medium">Connecting…</p>
-          <p className="text-[11px] text-muted-foreground">Loading model</p>
+          <p className="text-[11px] text-muted-foreground">
+            {queuePosition ? `All engines busy — #${queuePosition} in queue` : "Loading model"}
+          </p>
         </div>
       )}
       {!isConnected && (
@@ -202,6 +207,15 @@ export function ControlPanel({
                 )}
               </div>
             )}
+            {vcPipeline.vcStreaming && proxyStats && (
+              <p
+                className={`text-[10px] ${proxyStats.lag_ms > 500 || proxyStats.dropped_ms > 0 ? "text-amber-400" : "text-muted-foreground"}`}
+                title="Server-side VC backlog and audio dropped to keep up"
+              >
+                VC lag {Math.round(proxyStats.lag_ms)} ms · dropped {Math.round(proxyStats.dropped_ms)} ms
+                {proxyStats.rtf !== null && ` · RTF ${proxyStats.rtf.toFixed(2)}`}
+              </p>
+            )}
 
             <div className="space-y-1.5 border-t border-purple-500/20 pt-2">
               <div className="flex items-center justify-between">
@@ -1,9 +1,9 @@
 import { useState, useRef, useCallback, useEffect } from "react"
 import { webmToWavBlob } from "@/lib/audio"
-import { transcribeRecording, transcribeWavBlob, compareMetricsData, type MetricsResult } from "@/services/api"
+import { transcribeRecording, transcribeWavBlob, compareMetricsData, fetchRecordingMeta, fetchRecordingTrack, type MetricsResult, type RecordingMeta } from "@/services/api"
 import { mergeAudioTracks } from "@/services/audioMerge"
 import { formatTime } from "@/lib/utils"
-import type { useWebSocket } from "@/hooks/useWebSocket"
+import type { useWebSocket, ProsodyStats } from "@/hooks/useWebSocket"
 import type { useRecorder } from "@/hooks/useRecorder"
 import type { useMeanVCPipeline } from "@/hooks/useMeanVCPipeline"
 
@@ -77,16 +77,37 @@ export function useConversation(ws: WsState, recorder: RecorderState, vcPipeline
 
     if (wasVC) {
       ;(async () => {
-        const vcWav = ws.getVcUserWav()
+        // Prefer the server-side recording (written to disk as it streamed);
+        // fall back to the 0x03 frames / local mic capture collected here.
+        const rec = ws.getRecording()
+        let vcWav: Blob | null = null
+        let originalWav: Blob | null = null
+        let pplxWav: Blob | null = null
+        let meta: RecordingMeta | null = null
+        if (rec) {
+          try {
+            meta = await fetchRecordingMeta(rec.id)
+            // Each track on its own, so one failed fetch only loses that track.
+            const fetched = await Promise.allSettled(
+              ["vc", "mic", "reply"].map((t) => fetchRecordingTrack(meta!, t))
+            )
+            fetched.forEach((r) => { if (r.status === "rejected") console.error("Fetching recording track failed:", r.reason) })
+            ;[vcWav, originalWav, pplxWav] = fetched.map((r) => (r.status === "fulfilled" ? r.value : null))
+          } catch (e) {
+            console.error("Fetching server-side recording failed:", e)
+          }
+        }
+        // Always drained (it resets the 0x03 buffer); used when the server copy is missing.
+        const localVcWav = ws.getVcUserWav()
+        vcWav ??= localVcWav
         if (!vcWav) { setProcessing(false); return }
         setUserWavUrl(URL.createObjectURL(vcWav))
 
-        const originalWav = getOriginalUserWav()
+        originalWav ??= getOriginalUserWav()
         if (originalWav) setOriginalUserWavUrl(URL.createObjectURL(originalWav))
 
-        let pplxWav: Blob | null = null
         try {
-          pplxWav = await ws.getPersonaplexWav()
+          pplxWav ??= await ws.getPersonaplexWav()
           if (pplxWav) setPersonaplexWavUrl(URL.createObjectURL(pplxWav))
         } catch { /* ignore */ }
 
@@ -124,14 +145,26 @@ export function useConversation(ws: WsState, recorder: RecorderState, vcPipeline
         // also holds PersonaPlex 7B — concurrency caused CUDA OOM).
         if (originalWav) {
           setVcMetricsLoading(true)
-          compareMetricsData(originalWav, vcWav)
+          // Tagged so the server's results store can aggregate per voice/model/engine;
+          // the engine is the one the proxy announced (left untagged without a recording).
+          // Pitch was already tracked live by the proxy (0x06): the final snapshot is in the
+          // recording's meta (the browser closes before it can arrive), else the last frame.
+          // With it the server skips its pitch pass and returns and stores the live stats
+          // (pitch_backend "live-yin").
+          const prosody = (meta?.prosody as ProsodyStats | undefined) ?? ws.getProsody()
+          const live = prosody && prosody.mic.seconds > 0 && prosody.vc.seconds > 0 ? prosody : null
+          compareMetricsData(originalWav, vcWav, {
+            voice: vcTargetId ?? undefined, model: "personaplex", vc_engine: rec?.server, session_id: rec?.id,
+            metrics: live ? ["transcript", "duration", "rate", "sentiment", "similarity", "aesthetics"] : undefined,
+            prosody: live ?? undefined,
+          })
             .then(setVcMetrics)
             .catch(() => setVcMetrics(null))
             .finally(() => setVcMetricsLoading(false))
         }
       })()
     }
-  }, [recorder, ws, vcStreaming, vcStop, getOriginalUserWav])
+  }, [recorder, ws, vcStreaming, vcStop, getOriginalUserWav, vcTargetId])
 
   // VC mode: once the proxy relays PersonaPlex's handshake, open the gate so mic
   // PCM starts flowing. (Mic was already acquired in startConversation.)
@@ -16,6 +16,9 @@ export interface MeanVCPipelineState {
 // so this hook only: (1) uploads the target voice, and (2) captures raw mic PCM
 // and forwards it untagged to the proxy socket via `sendRawAudio`. The proxy
 // converts each chunk and relays it to PersonaPlex over localhost.
+// Mic PCM goes out as int16 ("s16"), half the bytes of raw float32.
+const WIRE_CODEC = "s16" as const;
+
 export function useMeanVCPipeline(
   sendRawAudio: (data: ArrayBuffer) => void,
   initialSteps: number = 2,
@@ -94,7 +97,11 @@ export function useMeanVCPipeline(
       const ch = e.inputBuffer.getChannelData(0);
       // Snapshot the raw mic (inputBuffer is reused, so copy) before sending.
       originalPcmRef.current.push(new Float32Array(ch));
-      sendRawRef.current(ch.buffer);
+      const s16 = new Int16Array(ch.length);
+      for (let i = 0; i < ch.length; i++) {
+        s16[i] = Math.max(-1, Math.min(1, ch[i])) * 32767;
+      }
+      sendRawRef.current(s16.buffer);
     };
     source.connect(processor);
     // Near-silent sink keeps the ScriptProcessor firing.
@@ -115,6 +122,7 @@ export function useMeanVCPipeline(
       sourceSr: audioCtx.sampleRate,
       steps: initialSteps,
       voicePrompt: "NATF2.pt",
+      codec: WIRE_CODEC,
     };
   }, [state.vcTargetId, initialSteps]);
 
@@ -10,6 +10,46 @@ export interface ProxyDescriptor {
   sourceSr: number;
   steps: number;
   voicePrompt?: string;
+  // Wire format for mic uplink + 0x03 echo (default "f32").
+  codec?: "f32" | "s16";
+}
+
+// Lag/drop report the chat-proxy pushes as 0x04 JSON (services/common/backpressure.py).
+export interface ProxyStats {
+  lag_ms: number;
+  dropped_ms: number;
+  dropped_chunks: number;
+  echo_dropped: number;
+  infer_ms: number;
+  rtf: number | null;
+  chunks: number;
+}
+
+// Running prosody of one proxy track (0x06 JSON, services/common/prosody.py).
+export interface ProsodyTrack {
+  seconds: number;
+  speech_s: number;
+  voiced_ratio: number | null;
+  f0_mean: number | null;
+  f0_std: number | null;
+  energy_db_mean: number | null;
+  energy_db_std: number | null;
+}
+
+export interface ProsodyStats {
+  mic: ProsodyTrack;
+  vc: ProsodyTrack;
+  reply: ProsodyTrack;
+  final: boolean;
+}
+
+// Server-side recording of this proxy session (0x05 JSON, services/common/recorder.py).
+export interface RecordingInfo {
+  id: string;
+  format: "wav" | "flac";
+  // VC engine behind the proxy ("meanvc" | "xvc").
+  server?: string;
+  tracks: Record<string, number>;
 }
 
 export interface Transcript {
@@ -59,6 +99,7 @@ export function useWebSocket() {
   }, []);
   const personaplexOpus = useRef<{ packet: Uint8Array; time: number }[]>([]);
   const vcUserPcm = useRef<Float32Array[]>([]);
+  const echoCodecRef = useRef<"f32" | "s16">("f32");
   const conversationStart = useRef(0);
   const [connected, setConnected] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -67,6 +108,13 @@ export function useWebSocket() {
   const [responseChunks, setResponseChunks] = useState<ArrayBuffer[]>([]);
   const [warmupComplete, setWarmupComplete] = useState(false);
   const [handshakeReceived, setHandshakeReceived] = useState(false);
+  const [proxyStats, setProxyStats] = useState<ProxyStats | null>(null);
+  const [prosody, setProsody] = useState<ProsodyStats | null>(null);
+  // Position in the speech-LM server's engine queue (MiniCPM-o pool), null when not queued.
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
+  const recordingRef = useRef<RecordingInfo | null>(null);
+  // Latest 0x06 snapshot, readable after disconnect (the state may be stale in callbacks).
+  const prosodyRef = useRef<ProsodyStats | null>(null);
 
   useEffect(() => {
     const init = async () => {
@@ -177,8 +225,14 @@ export function useWebSocket() {
 
   const connect = useCallback((textPrompt?: string, proxy?: ProxyDescriptor) => {
     const url = proxy
-      ? getChatProxyWsUrl(proxy.targetId, proxy.sourceSr, proxy.steps, textPrompt ?? "", proxy.voicePrompt)
+      ? getChatProxyWsUrl(proxy.targetId, proxy.sourceSr, proxy.steps, textPrompt ?? "", proxy.voicePrompt, proxy.codec)
       : getPersonaplexWsURL(textPrompt);
+    echoCodecRef.current = proxy?.codec ?? "f32";
+    setProxyStats(null);
+    setProsody(null);
+    prosodyRef.current = null;
+    setQueuePosition(null);
+    recordingRef.current = null;
     console.log("Connecting to:", url);
     setError(null);
     personaplexOpus.current = [];
@@ -212,6 +266,14 @@ export function useWebSocket() {
     };
 
     socket.onmessage = async (event) => {
+      if (typeof event.data === "string") {
+        // JSON side-channel (e.g. {"type":"queue","position":2} while all engines are busy).
+        try {
+          const msg = JSON.parse(event.data);
+          if (msg.type === "queue") setQueuePosition(msg.position);
+        } catch { /* not JSON */ }
+        return;
+      }
       try {
         const arrayBuffer = await (event.data instanceof Blob
           ? event.data.arrayBuffer()
@@ -222,6 +284,7 @@ export function useWebSocket() {
 
         if (tag === 0) {
           console.log("Handshake received, server ready");
+          setQueuePosition(null);
           setWarmupComplete(true);
           setHandshakeReceived(true);
         } else if (tag === 1) {
@@ -238,11 +301,22 @@ export function useWebSocket() {
             return updated;
           });
         } else if (tag === 3) {
-          // Converted user voice from the proxy (raw float32 PCM @16kHz):
+          // Converted user voice from the proxy (raw PCM @16kHz, float32 or int16):
           // kept for the user/merged WAV downloads, and optionally monitored live.
-          const pcm = new Float32Array(payload);
+          const pcm = echoCodecRef.current === "s16"
+            ? Float32Array.from(new Int16Array(payload), (v) => v / 32768)
+            : new Float32Array(payload);
+          // Kept even with a server-side recording: it is the fallback if fetching that fails.
           vcUserPcm.current.push(pcm);
           if (feedbackEnabledRef.current) playFeedback(pcm);
+        } else if (tag === 4) {
+          setProxyStats(JSON.parse(new TextDecoder().decode(payload)));
+        } else if (tag === 5) {
+          recordingRef.current = JSON.parse(new TextDecoder().decode(payload));
+          console.log("[proxy] Server-side recording:", recordingRef.current?.id);
+        } else if (tag === 6) {
+          prosodyRef.current = JSON.parse(new TextDecoder().decode(payload));
+          setProsody(prosodyRef.current);
         }
       } catch {
         // Ignore unrecognized messages
@@ -260,7 +334,7 @@ export function useWebSocket() {
   }, []);
 
   // Raw, untagged binary send — used in proxy/VC mode where the chat-proxy
-  // expects raw float32 mic PCM.
+  // expects raw (untagged) mic PCM in the negotiated codec.
   const sendRawAudio = useCallback((data: ArrayBuffer) => {
     if (socketRef.current?.readyState === WebSocket.OPEN) {
       socketRef.current.send(data);
@@ -274,6 +348,7 @@ export function useWebSocket() {
     setConnected(false);
     setWarmupComplete(false);
     setHandshakeReceived(false);
+    setQueuePosition(null);
     scheduledEnd.current = 0;
   }, []);
 
@@ -329,6 +404,9 @@ export function useWebSocket() {
     return createWavFile(combined, 16000);
   }, []);
 
+  const getRecording = useCallback((): RecordingInfo | null => recordingRef.current, []);
+  const getProsody = useCallback((): ProsodyStats | null => prosodyRef.current, []);
+
   const getPersonaplexStartTime = useCallback((): number => {
     if (personaplexOpus.current.length === 0) return 0;
     return (personaplexOpus.current[0].time - conversationStart.current) / 1000;
@@ -356,11 +434,16 @@ export function useWebSocket() {
     responseChunks,
     warmupComplete,
     handshakeReceived,
+    proxyStats,
+    prosody,
+    queuePosition,
     connect,
     disconnect,
     sendAudio,
     sendRawAudio,
     getVcUserWav,
+    getRecording,
+    getProsody,
     setPersonaplexSink,
     configureFeedback,
     clearTranscripts,
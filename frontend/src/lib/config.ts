@@ -13,13 +13,15 @@ export function getMeanvcLoadTargetUrl(): string {
 // Server-side VC bridge: the browser talks to MeanVC, which converts the mic
 // audio and forwards it to PersonaPlex over localhost (no browser round trip).
 // The returned socket speaks PersonaPlex's framing (0x00/0x01/0x02) plus 0x03
-// for the converted user voice used by downloads.
+// for the converted user voice used by downloads. `codec` is the wire format for
+// both the mic uplink and the 0x03 echo ("s16" halves the bandwidth of "f32").
 export function getChatProxyWsUrl(
   targetId: string,
   sourceSr: number,
   steps: number,
   textPrompt: string,
   voicePrompt: string = "NATF2.pt",
+  codec: "f32" | "s16" = "f32",
 ): string {
   const host = (import.meta as any).env?.VITE_MEANVC_HOST || "130.237.3.103";
   const params = new URLSearchParams({
@@ -28,10 +30,20 @@ export function getChatProxyWsUrl(
     source_sr: String(sourceSr),
     text_prompt: textPrompt,
     voice_prompt: voicePrompt,
+    codec,
+    echo_codec: codec,
   });
   return `wss://${host}:5002/api/meanvc/chat-proxy?${params.toString()}`;
 }
 
+// Server-side chat-proxy recording track (announced as a 0x05 frame when the VC
+// server runs with VC_RECORD_DIR). Served with HTTP Range support. Without a file,
+// the recording's meta.json (track list).
+export function getRecordingUrl(recordingId: string, file?: string): string {
+  const host = (import.meta as any).env?.VITE_MEANVC_HOST || "130.237.3.103";
+  return `https://${host}:5002/api/meanvc/recordings/${recordingId}${file ? `/${file}` : ""}`;
+}
+
 const DEFAULT_PROMPT = "You enjoy having a good conversation.";
 
 export function getPersonaplexWsURL(textPrompt?: string): string {
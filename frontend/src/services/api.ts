@@ -1,5 +1,6 @@
-import { API_BASE } from "@/lib/config"
+import { API_BASE, getRecordingUrl } from "@/lib/config"
 import { createWavFile } from "@/lib/audio"
+import type { ProsodyStats } from "@/hooks/useWebSocket"
 
 export async function transcribeRecording(
   chunks: Blob[]
@@ -31,6 +32,30 @@ export async function transcribeWavBlob(
   return resp.json()
 }
 
+// meta.json of a finished server-side chat-proxy recording. Track file names come
+// from here: an empty track stays .wav even when the session records flac.
+export interface RecordingMeta {
+  id: string
+  tracks: Record<string, { file: string; sr: number; duration_s: number }>
+  prosody?: unknown
+}
+
+// The server holds the request until the session's files are finalized.
+export async function fetchRecordingMeta(recordingId: string): Promise<RecordingMeta> {
+  const resp = await fetch(getRecordingUrl(recordingId))
+  if (!resp.ok) throw new Error(`${resp.status}: ${await resp.text()}`)
+  return resp.json()
+}
+
+// Fetch one track ("mic" | "vc" | "reply") of a recording; null if it is empty.
+export async function fetchRecordingTrack(meta: RecordingMeta, track: string): Promise<Blob | null> {
+  const t = meta.tracks[track]
+  if (!t || !t.duration_s) return null
+  const resp = await fetch(getRecordingUrl(meta.id, t.file))
+  if (!resp.ok) throw new Error(`${resp.status}: ${await resp.text()}`)
+  return resp.blob()
+}
+
 export async function convertVoice(sourceFile: File, targetFile: File): Promise<Blob> {
   const fd = new FormData()
   fd.append("source_audio", sourceFile)
@@ -56,6 +81,9 @@ export interface ResponseMetrics {
   std_pitch: number | null
   transcript?: string | null
   duration?: number | null
+  // From the chat proxy's live prosody (0x06) when it replaced the server's pitch pass.
+  voiced_ratio?: number | null
+  energy_db_mean?: number | null
 }
 
 export interface AestheticMetrics {
@@ -70,16 +98,43 @@ export interface MetricsResult {
   response_b: ResponseMetrics
   comparison: { semantic_similarity: number | null }
   aesthetics: { response_a: AestheticMetrics; response_b: AestheticMetrics }
+  // Metric plugins that ran (?metrics=); fields of the others are null.
+  metrics?: string[]
+  // True when the aesthetics are placeholders (audiobox not installed on the server).
+  aesthetics_mock?: boolean
+  // Where mean/std pitch came from: the server's pitch backend ("pyin" | "yin"), the
+  // proxy's live prosody ("live-yin"), or null when neither ran.
+  pitch_backend?: string | null
+}
+
+// Dimensions the server stores the result under, for /api/metrics/aggregate.
+export interface MetricsTags {
+  voice?: string
+  model?: string
+  vc_engine?: string
+  session_id?: string
+}
+
+// Metric plugins to run (server default: all), e.g. everything but "pitch". Without
+// the pitch plugin, the proxy's live prosody snapshot supplies the stored pitch ("live-yin").
+export interface MetricsOptions extends MetricsTags {
+  metrics?: string[]
+  prosody?: ProsodyStats
 }
 
 // JSON variant — returns the raw metrics so the UI renders them as HTML/CSS
 // (radar chart + cards) instead of a server-rendered PNG.
-export async function compareMetricsData(source: Blob, target: Blob): Promise<MetricsResult> {
+export async function compareMetricsData(source: Blob, target: Blob, options: MetricsOptions = {}): Promise<MetricsResult> {
   const fd = new FormData()
   // Explicit .wav filenames so the backend's extension check passes for raw Blobs.
   fd.append("source_audio", source, "source.wav")
   fd.append("target_audio", target, "target.wav")
-  const resp = await fetch(`${API_BASE}/api/metrics-comparison?output=json`, { method: "POST", body: fd })
+  const params = new URLSearchParams({ output: "json" })
+  const { metrics, prosody, ...tags } = options
+  if (prosody) fd.append("prosody", JSON.stringify(prosody))
+  for (const [k, v] of Object.entries(tags)) if (v) params.set(k, v)
+  if (metrics?.length) params.set("metrics", metrics.join(","))
+  const resp = await fetch(`${API_BASE}/api/metrics-comparison?${params}`, { method: "POST", body: fd })
   if (!resp.ok) throw new Error(await resp.text())
   return resp.json()
 }
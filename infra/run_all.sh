@@ -98,6 +98,8 @@ if [ "$SPEECH_LM_ENGINE" = "minicpm_o" ]; then
     export MINICPM_O_CPP_PORT="${MINICPM_O_CPP_PORT:-19080}"
     export MINICPM_REF_AUDIO="${MINICPM_REF_AUDIO:-$HEARMEOUT_DIR/recordings/Target_2.wav}"
     export MINICPM_O_OUTPUT_DIR="${MINICPM_O_OUTPUT_DIR:-$SERVICES/minicpm_o/_omni_out}"
+    # Engines in the bridge's pool (ports CPP_PORT, CPP_PORT+1, ...); "auto" sizes by free VRAM.
+    export MINICPM_O_INSTANCES="${MINICPM_O_INSTANCES:-1}"
     # llama-server (CUDA build) needs its cudart at runtime — and it MUST match the toolkit
     # it was built with (the runfile toolkit at $WORKSPACE/cuda-*, which is <= the driver).
     # Build a lib path, applied ONLY to the MiniCPM-o launch (not exported globally), so it
@@ -163,6 +165,19 @@ fi
 
 echo -e "${DIM}────────────────────────────────────────────────────${NC}"
 echo -e "  ${GREEN}started${NC}  $LM_LABEL=$PID1  app-api=$PID2  $VC_LABEL=$PID3"
-echo -e "  ${DIM}(models load on first connect; Ctrl-C to stop all)${NC}"
+echo -e "  ${DIM}(models load + warm up in the background; Ctrl-C to stop all)${NC}"
 echo
+
+# Report each service once its GET /ready turns 200 (models loaded and warmed up);
+# /api/health only means the process is listening. PersonaPlex has no /ready.
+wait_ready() {  # label url
+    for _ in $(seq 1 600); do
+        if curl -ksf -o /dev/null "$2"; then echo -e "  ${GREEN}ready${NC}    $1"; return; fi
+        sleep 2
+    done
+    echo -e "  ${YELLOW}WARN:${NC} $1 not ready after 20 min — see $2"
+}
+wait_ready "app-api" "https://127.0.0.1:5001/ready" &
+wait_ready "$VC_LABEL" "https://127.0.0.1:5002/ready" &
+[ "$SPEECH_LM_ENGINE" = "minicpm_o" ] && wait_ready "$LM_LABEL" "https://127.0.0.1:8000/ready" &
 wait
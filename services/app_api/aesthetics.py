@@ -0,0 +1,204 @@
+"""Windowed, memory-bounded audiobox-aesthetics scoring.
+
+metrics.py used to call `predictor.forward([{"path": a}, {"path": b}])`. That
+decodes both files in full and pushes them through audiobox in one forward,
+so peak memory and latency grow with response length. Here each file is split
+into AES_WINDOW_S windows instead:
+
+  - windows are read straight from disk (soundfile seeks), so only the windows
+    of the current batch are ever decoded;
+  - windows from all files go into shared forwards, each holding at most
+    AES_BATCH_S seconds of audio. Activation memory is linear in audio length,
+    so that is the peak-memory bound;
+  - per-window PQ/CU/CE/PC scores are averaged per file, weighted by window
+    duration;
+  - windows are visited in a low-discrepancy order (van der Corput), so any
+    prefix of them covers the whole file. Once a file has AES_MIN_WINDOWS and
+    the standard error of every score is below AES_CONVERGE_SE, its remaining
+    windows are skipped. AES_CONVERGE_SE=0 turns the early exit off.
+
+AES_MODE picks how this is used:
+
+  full      whole files, packed into forwards of at most AES_BATCH_S seconds
+  chunked   always windowed
+  auto      windowed only when some file is longer than AES_CHUNK_OVER_S (default)
+
+Env:
+  AES_MODE           auto (default) | full | chunked
+  AES_CHUNK_OVER_S   auto mode: window files longer than this (default 30)
+  AES_WINDOW_S       window length in seconds (default 10)
+  AES_BATCH_S        audio seconds per forward in both modes, the memory bound (default 40)
+  AES_MIN_WINDOWS    windows scored before early exit is considered (default 4)
+  AES_CONVERGE_SE    standard-error threshold for early exit (default 0.1, 0 = off)
+"""
+
+import logging
+import os
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+AES_MODES = ("auto", "full", "chunked")
+AES_MODE = os.environ.get("AES_MODE", "auto").lower()
+CHUNK_OVER_S = float(os.environ.get("AES_CHUNK_OVER_S", "30"))
+WINDOW_S = float(os.environ.get("AES_WINDOW_S", "10"))
+BATCH_S = float(os.environ.get("AES_BATCH_S", "40"))
+MIN_WINDOWS = int(os.environ.get("AES_MIN_WINDOWS", "4"))
+CONVERGE_SE = float(os.environ.get("AES_CONVERGE_SE", "0.1"))
+MIN_TAIL_S = 1.0   # a shorter last window is merged into the one before it
+
+
+def _van_der_corput(n: int) -> list[int]:
+    """0..n-1 in base-2 radical-inverse order: every prefix is spread over the range."""
+    if n <= 1:
+        return list(range(n))
+    bits = max(1, (n - 1).bit_length())
+    order = sorted(range(1 << bits), key=lambda i: int(f"{i:0{bits}b}"[::-1], 2))
+    return [i for i in order if i < n]
+
+
+class _FileScore:
+    def __init__(self, path: str, window_s: float):
+        self.path = path
+        info = sf.info(path)
+        self.sr = info.samplerate
+        self.frames = info.frames
+        self.duration = info.frames / info.samplerate
+        win = int(window_s * self.sr)
+        starts = list(range(0, self.frames, win))   # none for an empty file
+        if len(starts) > 1 and (self.frames - starts[-1]) < MIN_TAIL_S * self.sr:
+            starts.pop()
+        ends = starts[1:] + [self.frames]
+        self.windows = [(s, e - s) for s, e in zip(starts, ends)]
+        self.queue = [self.windows[i] for i in _van_der_corput(len(self.windows))]
+        self.scores: list[dict] = []
+        self.weights: list[float] = []
+        self.converged = False
+
+    def read(self, start: int, length: int) -> np.ndarray:
+        with sf.SoundFile(self.path) as f:
+            f.seek(start)
+            audio = f.read(length, dtype="float32", always_2d=True)
+        return audio.mean(axis=1)
+
+    def add(self, score: dict, seconds: float, min_windows: int, converge_se: float) -> None:
+        self.scores.append(score)
+        self.weights.append(seconds)
+        if converge_se <= 0 or len(self.scores) < min_windows:
+            return
+        w = np.asarray(self.weights)
+        w = w / w.sum()
+        n_eff = 1.0 / np.sum(w ** 2)
+        for k in self.scores[0]:
+            x = np.array([s[k] for s in self.scores], dtype=np.float64)
+            mean = np.sum(w * x)
+            se = np.sqrt(np.sum(w * (x - mean) ** 2) / max(n_eff - 1.0, 1.0))
+            if se >= converge_se:
+                return
+        self.converged = True
+
+    def result(self) -> dict:
+        if not self.scores:
+            return {}
+        w = np.asarray(self.weights, dtype=np.float64)
+        return {k: float(np.sum(w * [s[k] for s in self.scores]) / w.sum()) for k in self.scores[0]}
+
+
+def score_chunked(predictor, paths: list[str], window_s: float = WINDOW_S, batch_s: float = BATCH_S,
+                  min_windows: int = MIN_WINDOWS, converge_se: float = CONVERGE_SE) -> list[dict]:
+    """predictor.forward-compatible scores for `paths`, scored window by window."""
+    import torch
+
+    files = [_FileScore(p, window_s) for p in paths]
+    forwards = 0
+    while True:
+        # Round-robin over the files still open, up to batch_s seconds of audio.
+        batch, seconds, added = [], 0.0, True
+        while added:
+            added = False
+            for f in files:
+                if f.converged or not f.queue:
+                    continue
+                start, length = f.queue[0]
+                secs = length / f.sr
+                if batch and seconds + secs > batch_s:
+                    continue
+                f.queue.pop(0)
+                batch.append((f, secs, start, length))
+                seconds += secs
+                added = True
+        if not batch:
+            break
+        items = [{"path": torch.from_numpy(f.read(start, length))[None], "sample_rate": f.sr}
+                 for f, _, start, length in batch]
+        scores = predictor.forward(items)
+        forwards += 1
+        del items
+        for (f, secs, _, _), sc in zip(batch, scores):
+            f.add({k: float(v) for k, v in sc.items()}, secs, min_windows, converge_se)
+
+    for f in files:
+        skipped = len(f.queue)
+        logger.info(f"aesthetics: {os.path.basename(f.path)} {f.duration:.1f}s, "
+                    f"{len(f.scores)}/{len(f.windows)} windows"
+                    + (f" (converged, {skipped} skipped)" if f.converged and skipped else ""))
+    logger.info(f"aesthetics: {forwards} forwards of <= {batch_s:g}s audio")
+    return [f.result() for f in files]
+
+
+def _durations(paths: list[str]) -> list[float | None]:
+    """Seconds per file; None for a format soundfile can't read (audiobox decodes it itself)."""
+    out = []
+    for p in paths:
+        try:
+            out.append(sf.info(p).duration)
+        except sf.SoundFileError:
+            out.append(None)
+    return out
+
+
+def score_full(predictor, paths: list[str], durations: list[float | None] | None = None,
+               batch_s: float = BATCH_S) -> list[dict]:
+    """Whole-file scores, with files packed into forwards of at most batch_s seconds of audio.
+
+    A file longer than batch_s, or of unknown length, gets a forward of its own; an empty
+    file gets {} and never reaches audiobox.
+    """
+    durations = _durations(paths) if durations is None else durations
+    results: list[dict] = [{} for _ in paths]
+    batches, batch, seconds = [], [], 0.0
+    for i, d in enumerate(durations):
+        if d == 0:
+            continue
+        secs = batch_s if d is None else d
+        if batch and seconds + secs > batch_s:
+            batches.append(batch)
+            batch, seconds = [], 0.0
+        batch.append(i)
+        seconds += secs
+    if batch:
+        batches.append(batch)
+    for batch in batches:
+        for i, sc in zip(batch, predictor.forward([{"path": paths[i]} for i in batch])):
+            results[i] = sc
+    if len(batches) > 1:
+        logger.info(f"aesthetics: {len(paths)} files in {len(batches)} forwards of <= {batch_s:g}s audio")
+    return results
+
+
+def score(predictor, paths: list[str], mode: str | None = None) -> list[dict]:
+    """Scores for `paths` ({"PQ", "CU", "CE", "PC"} each, {} for an empty file), chunked per AES_MODE."""
+    mode = (mode or AES_MODE).lower()
+    if mode not in AES_MODES:
+        raise ValueError(f"Unknown aesthetics mode {mode!r} (expected one of {', '.join(AES_MODES)})")
+    durations = _durations(paths)
+    if mode == "auto":
+        mode = "chunked" if max((d or 0.0 for d in durations), default=0.0) > CHUNK_OVER_S else "full"
+    if mode == "chunked":
+        try:
+            return score_chunked(predictor, paths)
+        except sf.SoundFileError as e:   # soundfile can't read or seek in this format
+            logger.warning(f"aesthetics: chunked scoring failed ({e}); scoring whole files")
+    return score_full(predictor, paths, durations)
@@ -4,6 +4,7 @@ voice conversion, metrics comparison, and recording endpoints.
 Standalone FastAPI (no Modal dependency).
 """
 
+import asyncio
 import os
 import sys
 import subprocess
@@ -11,13 +12,15 @@ import tempfile
 import uuid
 import shutil
 import logging
+import threading
 from pathlib import Path
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
 from starlette.background import BackgroundTask
+import numpy as np
 import torch
 
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +34,30 @@ SEED_VC_DIR = REPO_ROOT / "seed-vc"
 INFERENCE_SCRIPT = SEED_VC_DIR / "inference.py"
 RECORDINGS_DIR = REPO_ROOT / "recordings"
 
+# Helpers shared with the other services live in services/common/.
+COMMON_DIR = str(Path(__file__).resolve().parents[1] / "common")
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
+
+from preload import ModelPreloader  # noqa: E402
+
+# metrics.py / metrics_pool.py sit beside this file (services/app_api/).
+APP_DIR = str(Path(__file__).resolve().parent)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from asr import get_asr  # noqa: E402
+from pitch import DEFAULT_BACKEND as DEFAULT_PITCH_BACKEND, PITCH_BACKENDS  # noqa: E402
+from metrics import LIVE_PITCH_BACKEND, METRIC_NAMES, live_pitch, resolve_metrics  # noqa: E402  (cheap: models import on first use, in the workers)
+from results_store import DIMENSIONS, open_store  # noqa: E402
+from metrics_pool import (  # noqa: E402
+    MetricsBusy,
+    MetricsCancelled,
+    MetricsError,
+    MetricsPool,
+    MetricsTimeout,
+)
+
 ALLOWED_EXTENSIONS = {"wav", "mp3", "flac", "m4a", "ogg"}
 UPLOAD_FOLDER = tempfile.gettempdir()
 
@@ -40,41 +67,21 @@ save_audio = None
 read_audio = None
 collect_chunks = None
 
-whisper_model = None
-whisper_model_cpu = None
-
-
-def _init_whisper():
-    global whisper_model
-    if whisper_model is None:
-        from faster_whisper import WhisperModel
-
-        # WHISPER_DEVICE forces CPU/GPU (run_all.sh sets cpu when a heavy speech LM
-        # like MiniCPM-o needs the whole GPU). Default: GPU if available.
-        device = os.environ.get(
-            "WHISPER_DEVICE", "cuda" if torch.cuda.is_available() else "cpu"
-        )
-        compute = "int8_float16" if device == "cuda" else "int8"
-        model_size = os.environ.get("WHISPER_MODEL", "small")
-        whisper_model = WhisperModel(model_size, device=device, compute_type=compute)
-        logger.info(f"Whisper model '{model_size}' loaded on {device}")
-
-
-def _init_whisper_cpu():
-    """Lazy CPU Whisper, used as an OOM fallback when the shared GPU is full."""
-    global whisper_model_cpu
-    if whisper_model_cpu is None:
-        from faster_whisper import WhisperModel
-
-        model_size = os.environ.get("WHISPER_MODEL", "small")
-        whisper_model_cpu = WhisperModel(model_size, device="cpu", compute_type="int8")
-        logger.info(f"Whisper CPU fallback model '{model_size}' loaded")
-    return whisper_model_cpu
+# Held while loading, so a request racing the background preload doesn't load twice
+# (ASRService has its own lock).
+_vad_lock = threading.Lock()
+preloader = ModelPreloader("app-api")
+# /api/metrics-comparison runs in worker processes, each with its own models loaded.
+metrics_pool = MetricsPool()
+# Every comparison result is also kept for /api/metrics/aggregate (None if RESULTS_DB="").
+results_store = None
 
 
 def _init_vad():
     global vad_model, get_speech_timestamps, save_audio, read_audio, collect_chunks
-    if vad_model is None:
+    with _vad_lock:
+        if vad_model is not None:
+            return
         model, utils = torch.hub.load(
             repo_or_dir="snakers4/silero-vad", model="silero_vad"
         )
@@ -82,6 +89,29 @@ def _init_vad():
         (get_speech_timestamps, save_audio, read_audio, _, collect_chunks) = utils
 
 
+def _register_preload():
+    """Whisper + VAD here, plus the metrics workers, which (unless PRELOAD_METRICS=0)
+    load and warm the /api/metrics-comparison models in their own processes."""
+
+    def load_whisper():
+        return get_asr().load()
+
+    def warm_whisper(asr):
+        asr.transcribe(np.zeros(16000, dtype=np.float32))
+
+    def load_vad():
+        _init_vad()
+        return vad_model
+
+    def warm_vad(model):
+        get_speech_timestamps(torch.zeros(16000), model, sampling_rate=16000)
+
+    preloader.add("whisper", load_whisper, warm_whisper)
+    preloader.add("vad", load_vad, warm_vad)
+    # Optional: if the workers can't load, the rest of the API is still ready.
+    preloader.add("metrics_workers", lambda: metrics_pool.wait_ready(), required=False)
+
+
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -91,11 +121,21 @@ def create_app():
 
     @app.on_event("startup")
     async def preload_models():
-        logger.info("Pre-loading Whisper model...")
-        _init_whisper()
-        logger.info("Pre-loading VAD model...")
-        _init_vad()
-        logger.info("Pre-loading complete")
+        # Concurrent load + warm-up in the background (common/preload.py); the server
+        # listens meanwhile and /ready turns 200 once everything is warm.
+        global results_store
+        _register_preload()
+        metrics_pool.start()
+        preloader.start()
+        results_store = open_store()
+        if results_store is not None:
+            results_store.start()
+
+    @app.on_event("shutdown")
+    async def stop_metrics_pool():
+        await metrics_pool.close()
+        if results_store is not None:
+            await asyncio.to_thread(results_store.close)
 
     app.add_middleware(
         CORSMiddleware,
@@ -112,43 +152,22 @@ def create_app():
     async def health_check():
         return JSONResponse({"status": "healthy", "service": "vc-api"})
 
+    @app.get("/ready")
+    async def ready_check():
+        return JSONResponse(preloader.status(), status_code=200 if preloader.ready else 503)
+
     @app.post("/api/transcribe")
     async def transcribe_audio(audio: UploadFile = File(...)):
-        _init_whisper()
-
         contents = await audio.read()
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
             f.write(contents)
             temp_path = f.name
 
-        def _run(model):
-            segments_result, _ = model.transcribe(temp_path, beam_size=1, language="en")
-            segs = []
-            for s in segments_result:  # generation (and any OOM) happens here
-                if s.text.strip():
-                    segs.append(
-                        {
-                            "start": round(s.start, 2),
-                            "end": round(s.end, 2),
-                            "text": s.text.strip(),
-                        }
-                    )
-            return segs
-
         try:
-            try:
-                segments = _run(whisper_model)
-            except RuntimeError as e:
-                # Shared GPU can be exhausted by PersonaPlex + other jobs; fall
-                # back to a CPU model instead of 500-ing the whole transcript.
-                if "out of memory" in str(e).lower() and torch.cuda.is_available():
-                    logger.warning("Whisper CUDA OOM — clearing cache, retrying on CPU")
-                    torch.cuda.empty_cache()
-                    segments = _run(_init_whisper_cpu())
-                else:
-                    raise
-            text = " ".join(s["text"] for s in segments)
-            return JSONResponse({"text": text, "segments": segments})
+            # Off the event loop: during startup this waits on the preloader's
+            # Whisper load, which must not stall /ready and every other request.
+            result = await asyncio.to_thread(get_asr().transcribe, temp_path)
+            return JSONResponse({"text": result["text"], "segments": result["segments"]})
         finally:
             os.unlink(temp_path)
             # Release Whisper's CUDA working memory between conversations so it
@@ -160,7 +179,7 @@ def create_app():
     async def voice_conversion(
         source_audio: UploadFile = File(...), target_audio: UploadFile = File(...)
     ):
-        _init_vad()
+        await asyncio.to_thread(_init_vad)   # may wait on the preloader's VAD load
 
         if not source_audio.filename or not target_audio.filename:
             raise HTTPException(status_code=400, detail="Missing audio files")
@@ -288,13 +307,50 @@ def create_app():
 
     @app.post("/api/metrics-comparison")
     async def metrics_comparison(
+        request: Request,
         source_audio: UploadFile = File(...),
         target_audio: UploadFile = File(...),
         output: str = "image",
+        pitch_backend: str | None = None,
+        dpi: int | None = None,
+        voice: str | None = None,
+        model: str | None = None,
+        vc_engine: str | None = None,
+        session_id: str | None = None,
+        metrics: str | None = None,
+        prosody: str | None = Form(None),
     ):
         if not source_audio.filename or not target_audio.filename:
             raise HTTPException(status_code=400, detail="Missing audio files")
 
+        # The chat proxy's live prosody snapshot (form field, 0x06 JSON): when the
+        # pitch plugin isn't run, its pitch stats are returned and stored instead.
+        try:
+            live = None if prosody is None else live_pitch(prosody)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid prosody: {e}")
+
+        # ?metrics=pitch,rate runs only those plugins (plus what they need); default METRICS_DEFAULT.
+        try:
+            metric_names = None if metrics is None else resolve_metrics(metrics)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if metric_names == []:   # ?metrics= or ?metrics=, would run nothing and store an all-NULL row
+            raise HTTPException(
+                status_code=400,
+                detail=f"metrics must name at least one of {', '.join(METRIC_NAMES)}",
+            )
+
+        if output not in ("image", "svg", "json"):
+            raise HTTPException(status_code=400, detail="Invalid output. Supported: image, svg, json")
+        if dpi is not None and not 50 <= dpi <= 300:
+            raise HTTPException(status_code=400, detail="dpi must be between 50 and 300")
+        if pitch_backend is not None and pitch_backend not in PITCH_BACKENDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid pitch_backend. Supported: {', '.join(PITCH_BACKENDS)}",
+            )
+
         if not (
             allowed_file(source_audio.filename) and allowed_file(target_audio.filename)
         ):
@@ -311,8 +367,9 @@ def create_app():
             target_filename = f"target_{comparison_id}.wav"
             source_path = os.path.join(temp_dir, source_filename)
             target_path = os.path.join(temp_dir, target_filename)
+            plot_ext = "svg" if output == "svg" else "png"
             plot_path = os.path.join(
-                temp_dir, f"metrics_comparison_{comparison_id}.png"
+                temp_dir, f"metrics_comparison_{comparison_id}.{plot_ext}"
             )
 
             with open(source_path, "wb") as f:
@@ -322,18 +379,45 @@ def create_app():
 
             logger.info(f"Processing metrics comparison with ID: {comparison_id}")
 
-            # metrics.py sits beside this file (services/app_api/).
-            sys.path.insert(0, str(Path(__file__).resolve().parent))
-
+            # Analysis (and the PNG render) runs in a metrics worker process; the
+            # worker is killed if the client goes away or the deadline passes.
             try:
-                from metrics import analyze_voices, create_comprehensive_metrics_plot
-            except ImportError as e:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Metrics analysis module not available: {e}",
+                results, plotted = await metrics_pool.run(
+                    source_path,
+                    target_path,
+                    None if output == "json" else plot_path,
+                    is_disconnected=request.is_disconnected,
+                    pitch_backend=pitch_backend,
+                    plot_dpi=dpi,
+                    metric_names=metric_names,
                 )
+            except MetricsBusy as e:
+                raise HTTPException(status_code=503, detail=f"Metrics busy, retry later ({e})")
+            except MetricsTimeout as e:
+                raise HTTPException(status_code=504, detail=str(e))
+            except MetricsCancelled:
+                logger.info(f"Metrics comparison {comparison_id} cancelled: client disconnected")
+                raise HTTPException(status_code=499, detail="Client disconnected")
+            except MetricsError as e:
+                raise HTTPException(status_code=500, detail=f"Metrics analysis failed: {e}")
+
+            # Which pitch numbers these are: the plugin's backend as resolved (the server
+            # default when none was asked for), the proxy's live YIN, or none.
+            if "pitch" in results.get("metrics", ()):
+                results["pitch_backend"] = pitch_backend or DEFAULT_PITCH_BACKEND
+            elif live is not None:
+                for side, fields in live.items():
+                    results[side].update(fields)
+                results["pitch_backend"] = LIVE_PITCH_BACKEND
+            else:
+                results["pitch_backend"] = None
 
-            results = analyze_voices(source_path, target_path)
+            # Queued for the results store's writer thread; never waits on disk.
+            if results_store is not None:
+                results_store.add(comparison_id, results, {
+                    "voice": voice, "model": model, "vc_engine": vc_engine, "session_id": session_id,
+                    "pitch_backend": results["pitch_backend"],
+                })
 
             # JSON path: return the raw metrics dict so the frontend can render
             # it with HTML/CSS (no server-side matplotlib). Temp files are already
@@ -342,18 +426,14 @@ def create_app():
                 shutil.rmtree(temp_dir, ignore_errors=True)
                 return JSONResponse(results)
 
-            if (
-                results["aesthetics"]["response_a"]
-                and results["aesthetics"]["response_b"]
-            ):
-                create_comprehensive_metrics_plot(results, save_path=plot_path)
+            if plotted:
                 logger.info(f"Generated metrics comparison plot: {plot_path}")
 
                 cleanup = BackgroundTask(shutil.rmtree, temp_dir, ignore_errors=True)
                 return FileResponse(
                     plot_path,
-                    media_type="image/png",
-                    filename=f"metrics_comparison_{comparison_id}.png",
+                    media_type="image/svg+xml" if plot_ext == "svg" else "image/png",
+                    filename=f"metrics_comparison_{comparison_id}.{plot_ext}",
                     background=cleanup,
                 )
             else:
@@ -371,6 +451,30 @@ def create_app():
             shutil.rmtree(temp_dir, ignore_errors=True)
             raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+    # Plain def: FastAPI runs it in its threadpool, so the SQLite query is off the loop.
+    @app.get("/api/metrics/aggregate")
+    def metrics_aggregate(
+        group_by: str = "voice,side",
+        voice: str | None = None,
+        model: str | None = None,
+        vc_engine: str | None = None,
+        side: str | None = None,
+        pitch_backend: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+    ):
+        if results_store is None:
+            raise HTTPException(status_code=503, detail="Results store disabled (RESULTS_DB)")
+        dims = [d.strip() for d in group_by.split(",") if d.strip()]
+        filters = {d: v for d, v in (("voice", voice), ("model", model), ("vc_engine", vc_engine),
+                                     ("side", side), ("pitch_backend", pitch_backend)) if v is not None}
+        try:
+            groups = results_store.aggregate(dims, filters, since=since, until=until)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return JSONResponse({"group_by": dims, "filters": filters, "groups": groups,
+                             "dimensions": list(DIMENSIONS)})
+
     @app.get("/recordings/{filename}")
     async def serve_recording(filename: str):
         if not RECORDINGS_DIR.exists():
@@ -0,0 +1,180 @@
+"""One speech-recognition service for app-api: /api/transcribe and metrics.get_transcript.
+
+These used to load two different Whisper models. /api/transcribe used a
+quantised CTranslate2 faster-whisper model. metrics.py loaded HF
+openai/whisper-small (WhisperProcessor + WhisperForConditionalGeneration) in fp32
+on CPU, about 1 GB of weights, decoded in eager PyTorch. Both now go through
+ASRService, which defaults to faster-whisper (int8 on CPU, int8_float16 on CUDA).
+One process loads one model, with the same device choice, CUDA-OOM fallback to
+CPU, and optional batched decoding.
+
+The metrics worker processes (metrics_pool.py) each hold their own instance,
+CPU-only, since they hide CUDA. The HF model is still available: set
+ASR_BACKEND=hf, or it is used automatically if faster-whisper can't be imported.
+
+Env:
+  ASR_BACKEND      faster_whisper (default) | hf
+  WHISPER_MODEL    model size / HF suffix (default small -> openai/whisper-small)
+  WHISPER_DEVICE   cuda | cpu (default: cuda if available)
+  ASR_BATCH_SIZE   >0 decodes VAD-split segments in batches (BatchedInferencePipeline);
+                   0 (default) keeps the sequential long-form decoder
+  ASR_CPU_THREADS  CTranslate2 threads on CPU (default 0 = library default)
+"""
+
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ASR_BACKENDS = ("faster_whisper", "hf")
+
+
+def _cuda_available() -> bool:
+    import torch
+
+    return torch.cuda.is_available()
+
+
+class ASRService:
+    """Lazily loaded Whisper; transcribe() accepts a file path or 16 kHz float32 audio."""
+
+    def __init__(self, backend: str | None = None, model_size: str | None = None,
+                 device: str | None = None, batch_size: int | None = None):
+        self.backend = (backend or os.environ.get("ASR_BACKEND", "faster_whisper")).lower()
+        if self.backend not in ASR_BACKENDS:
+            raise ValueError(
+                f"Unsupported ASR backend {self.backend!r} (expected one of {', '.join(ASR_BACKENDS)})"
+            )
+        self.model_size = model_size or os.environ.get("WHISPER_MODEL", "small")
+        self._device = device or os.environ.get("WHISPER_DEVICE")
+        self.batch_size = batch_size if batch_size is not None else int(os.environ.get("ASR_BATCH_SIZE", "0"))
+        self.device: str | None = None
+        self._model = None
+        self._pipeline = None
+        self._cpu_model = None
+        self._hf = None
+        self._lock = threading.Lock()
+
+    # -- loading --
+    def _load_fw(self, device: str):
+        from faster_whisper import WhisperModel
+
+        compute = "int8_float16" if device == "cuda" else "int8"
+        model = WhisperModel(self.model_size, device=device, compute_type=compute,
+                             cpu_threads=int(os.environ.get("ASR_CPU_THREADS", "0")))
+        logger.info(f"Whisper model '{self.model_size}' loaded on {device} ({compute})")
+        return model
+
+    def _load_hf(self):
+        from transformers import WhisperForConditionalGeneration, WhisperProcessor
+
+        name = f"openai/whisper-{self.model_size}"
+        processor = WhisperProcessor.from_pretrained(name)
+        model = WhisperForConditionalGeneration.from_pretrained(name)
+        model.eval()
+        logger.info(f"HF Whisper '{name}' loaded on cpu (fallback backend)")
+        return processor, model
+
+    def load(self) -> "ASRService":
+        with self._lock:
+            if self._model is not None or self._hf is not None:
+                return self
+            if self.backend == "faster_whisper":
+                try:
+                    import faster_whisper  # noqa: F401
+                except ImportError as e:
+                    logger.warning(f"faster-whisper unavailable ({e}); using the HF backend")
+                    self.backend = "hf"
+            if self.backend == "hf":
+                self.device = "cpu"
+                self._hf = self._load_hf()
+                return self
+            self.device = self._device or ("cuda" if _cuda_available() else "cpu")
+            self._model = self._load_fw(self.device)
+            if self.batch_size > 0:
+                from faster_whisper import BatchedInferencePipeline
+
+                self._pipeline = BatchedInferencePipeline(model=self._model)
+        return self
+
+    def _cpu_fallback(self):
+        with self._lock:
+            if self._cpu_model is None:
+                self._cpu_model = self._load_fw("cpu")
+        return self._cpu_model
+
+    # -- inference --
+    def _run_fw(self, model, audio, language: str, batched: bool) -> list[dict]:
+        if batched:
+            result, _ = self._pipeline.transcribe(audio, beam_size=1, language=language,
+                                                  batch_size=self.batch_size)
+        else:
+            result, _ = model.transcribe(audio, beam_size=1, language=language)
+        segs = []
+        for s in result:  # generation (and any OOM) happens here
+            if s.text.strip():
+                segs.append({"start": round(s.start, 2), "end": round(s.end, 2), "text": s.text.strip()})
+        return segs
+
+    def _run_hf(self, audio, language: str) -> list[dict]:
+        import librosa
+        import torch
+
+        processor, model = self._hf
+        if isinstance(audio, str):
+            audio, _ = librosa.load(audio, sr=16000)
+        # truncation=False + return_timestamps: Whisper's own long-form decoding.
+        inputs = processor(
+            audio, sampling_rate=16000, return_tensors="pt",
+            truncation=False, padding="longest", return_attention_mask=True,
+        )
+        with torch.no_grad():
+            ids = model.generate(**inputs, return_timestamps=True, language=language)
+        text = processor.batch_decode(ids, skip_special_tokens=True)[0].strip()
+        return [{"start": 0.0, "end": round(len(audio) / 16000, 2), "text": text}] if text else []
+
+    def transcribe(self, audio: str | np.ndarray, language: str = "en") -> dict:
+        """{"text", "segments": [{"start", "end", "text"}], "backend", "device"}."""
+        self.load()
+        if isinstance(audio, np.ndarray):
+            audio = np.ascontiguousarray(audio, dtype=np.float32)
+        if self._hf is not None:
+            segs = self._run_hf(audio, language)
+            device = "cpu"
+        else:
+            device = self.device
+            try:
+                segs = self._run_fw(self._model, audio, language, self._pipeline is not None)
+            except RuntimeError as e:
+                # Shared GPU can be exhausted by PersonaPlex + other jobs; fall
+                # back to a CPU model instead of failing the whole transcript.
+                if "out of memory" not in str(e).lower() or self.device != "cuda":
+                    raise
+                import torch
+
+                logger.warning("Whisper CUDA OOM — clearing cache, retrying on CPU")
+                torch.cuda.empty_cache()
+                segs = self._run_fw(self._cpu_fallback(), audio, language, False)
+                device = "cpu"
+        return {
+            "text": " ".join(s["text"] for s in segs),
+            "segments": segs,
+            "backend": self.backend,
+            "device": device,
+        }
+
+
+_service: ASRService | None = None
+_service_lock = threading.Lock()
+
+
+def get_asr() -> ASRService:
+    """The process-wide ASRService (not loaded until first use or load())."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ASRService()
+        return _service
@@ -0,0 +1,290 @@
+"""Batch metrics over a corpus of original-vs-converted response pairs (offline bias studies).
+
+metrics.py's __main__ runs one hardcoded pair. This runner takes thousands:
+
+  - pairs come from a manifest (CSV or JSONL with `a` and `b` path columns, an
+    optional `id`, and any extra columns such as speaker or group, which are
+    copied into the output), or from a directory with `original/` and
+    `converted/` subdirectories whose files are matched by name;
+  - pairs are grouped into batches of --batch and spread over --workers spawned
+    processes. Each process imports metrics.py once, so every model is a
+    per-worker singleton. Within a batch the sentiment pipeline, the sentence
+    encoder and audiobox each get one call covering all of its pairs, not one
+    call per pair. ASR and pitch still run per file;
+  - every finished batch is written to <out>.parts/part-NNNNNN.parquet straight
+    away. A rerun skips any pair ids that are already there, so an interrupted
+    run can be resumed;
+  - at the end the parts are merged into one columnar <out> (Parquet, or Arrow
+    IPC when <out> ends in .arrow/.feather). Progress lines report pairs/s and
+    an ETA, so runs can be sized.
+
+Unlike /api/metrics-comparison, audiobox scores are left null when
+audiobox_aesthetics is missing; no mock values go into a study.
+
+    uv run python corpus_eval.py --manifest pairs.csv --out results.parquet --workers 4
+    uv run python corpus_eval.py --dir corpus/ --out results.parquet --pitch-backend yin
+"""
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+import aesthetics
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+logger = logging.getLogger("corpus-eval")
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".m4a", ".ogg"}
+AES_KEYS = {
+    "PQ": "production_quality",
+    "CU": "content_usefulness",
+    "CE": "content_enjoyment",
+    "PC": "production_complexity",
+}
+SIDE_COLUMNS = ("transcript", "speech_rate", "sentiment", "mean_pitch", "std_pitch",
+                "duration", *AES_KEYS.values())
+
+
+# -- pairs --
+def load_manifest(path: Path) -> list[dict]:
+    if path.suffix.lower() in (".jsonl", ".ndjson"):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    base = path.parent
+    pairs = []
+    for i, row in enumerate(rows):
+        if not row.get("a") or not row.get("b"):
+            raise ValueError(f"{path}: row {i + 1} needs 'a' and 'b' columns")
+        row = {k: ("" if v is None else str(v)) for k, v in row.items()}
+        row["id"] = row.get("id") or f"{i:06d}"
+        row["a"] = str((base / row["a"]).resolve())
+        row["b"] = str((base / row["b"]).resolve())
+        pairs.append(row)
+    return pairs
+
+
+def pairs_from_dir(root: Path, a_sub: str, b_sub: str) -> list[dict]:
+    a_files = {p.stem: p for p in (root / a_sub).rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS}
+    b_files = {p.stem: p for p in (root / b_sub).rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS}
+    missing = len(a_files.keys() ^ b_files.keys())
+    if missing:
+        logger.warning(f"{missing} files under {root} have no counterpart and are skipped")
+    return [{"id": stem, "a": str(a_files[stem].resolve()), "b": str(b_files[stem].resolve())}
+            for stem in sorted(a_files.keys() & b_files.keys())]
+
+
+# -- worker process side --
+_metrics = None
+
+
+def _init_worker(threads: int, warm: bool) -> None:
+    global _metrics
+    # CPU-only like metrics_pool.py; set before torch is imported in this process.
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    os.environ["WHISPER_DEVICE"] = "cpu"
+    os.environ.setdefault("ASR_CPU_THREADS", str(threads))
+    import torch
+
+    torch.set_num_threads(threads)
+    import metrics
+
+    _metrics = metrics
+    if warm:
+        metrics._get_asr()
+        metrics._get_sentiment()
+        metrics._get_sbert()
+        metrics._get_aes()
+
+
+def _duration(path: str) -> float | None:
+    import librosa
+
+    try:
+        return float(librosa.get_duration(path=path))
+    except Exception:
+        return None
+
+
+def _eval_batch(job: tuple[list[dict], str | None]) -> tuple[list[dict], float]:
+    """All metrics for one batch of pairs -> (rows, seconds spent)."""
+    pairs, pitch_backend = job
+    m = _metrics
+    t0 = time.perf_counter()
+    rows = [{**p, "error": None} for p in pairs]
+    paths = [(r, side, r[side]) for r in rows for side in ("a", "b")]
+
+    # Per file: ASR, speech rate, pitch, duration.
+    for r, side, path in paths:
+        transcript = m.get_transcript(path)
+        mean_pitch, std_pitch = m.calculate_pitch_stats(path, pitch_backend)
+        r[f"{side}_transcript"] = transcript
+        r[f"{side}_speech_rate"] = m.calculate_speech_rate(path, transcript)
+        r[f"{side}_mean_pitch"] = None if mean_pitch is None else float(mean_pitch)
+        r[f"{side}_std_pitch"] = None if std_pitch is None else float(std_pitch)
+        r[f"{side}_duration"] = _duration(path)
+        if not transcript:
+            r["error"] = f"empty transcript ({side})"
+
+    texts = [r[f"{side}_transcript"] or "" for r, side, _ in paths]
+
+    # Across the batch: one call per text model and one audiobox forward.
+    try:
+        labels = m._get_sentiment()(texts, batch_size=len(texts), truncation=True)
+        for (r, side, _), out in zip(paths, labels):
+            r[f"{side}_sentiment"] = out["label"]
+    except Exception as e:
+        for r in rows:
+            r["error"] = r["error"] or f"sentiment: {e}"
+
+    try:
+        emb = m._get_sbert().encode(texts, batch_size=len(texts), normalize_embeddings=True)
+        emb = np.asarray(emb).reshape(len(rows), 2, -1)
+        sims = np.abs(np.sum(emb[:, 0] * emb[:, 1], axis=1))
+        for r, s in zip(rows, sims):
+            r["semantic_similarity"] = float(s)
+    except Exception as e:
+        for r in rows:
+            r["error"] = r["error"] or f"similarity: {e}"
+
+    if m.AUDIOBOX_AVAILABLE:
+        try:
+            scores = aesthetics.score(m._get_aes(), [path for _, _, path in paths])
+            for (r, side, _), sc in zip(paths, scores):
+                for k, v in sc.items():
+                    r[f"{side}_{AES_KEYS.get(k, k)}"] = float(v)
+        except Exception as e:
+            for r in rows:
+                r["error"] = r["error"] or f"aesthetics: {e}"
+    return rows, time.perf_counter() - t0
+
+
+# -- parent side --
+def _schema(extra: list[str]) -> pa.Schema:
+    text = {"transcript", "sentiment"}
+    fields = [pa.field("id", pa.string()), pa.field("a", pa.string()), pa.field("b", pa.string())]
+    fields += [pa.field(k, pa.string()) for k in extra]
+    for side in ("a", "b"):
+        fields += [pa.field(f"{side}_{c}", pa.string() if c in text else pa.float64())
+                   for c in SIDE_COLUMNS]
+    fields += [pa.field("semantic_similarity", pa.float64()), pa.field("error", pa.string())]
+    return pa.schema(fields)
+
+
+def _done_ids(parts: Path) -> set[str]:
+    done: set[str] = set()
+    for p in sorted(parts.glob("part-*.parquet")):
+        done.update(pq.read_table(p, columns=["id"]).column("id").to_pylist())
+    return done
+
+
+def _write_part(parts: Path, n: int, rows: list[dict], schema: pa.Schema) -> None:
+    table = pa.Table.from_pylist(rows, schema=schema)
+    tmp = parts / f".part-{n:06d}.parquet.tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, parts / f"part-{n:06d}.parquet")   # a killed run never leaves half a part
+
+
+def _merge(parts: Path, out: Path, schema: pa.Schema) -> int:
+    files = sorted(parts.glob("part-*.parquet"))
+    table = pa.concat_tables([pq.read_table(p, schema=schema) for p in files]) if files \
+        else schema.empty_table()
+    if out.suffix.lower() in (".arrow", ".feather"):
+        feather.write_feather(table, out)
+    else:
+        pq.write_table(table, out)
+    return table.num_rows
+
+
+def run(pairs: list[dict], out: Path, workers: int, batch: int, pitch_backend: str | None,
+        warm: bool) -> None:
+    parts = out.with_name(out.name + ".parts")
+    parts.mkdir(parents=True, exist_ok=True)
+    extra = sorted({k for p in pairs for k in p} - {"id", "a", "b"})
+    schema = _schema(extra)
+
+    done = _done_ids(parts)
+    todo = [p for p in pairs if p["id"] not in done]
+    if done:
+        logger.info(f"resuming: {len(pairs) - len(todo)} of {len(pairs)} pairs already done")
+    batches = [(todo[i:i + batch], pitch_backend) for i in range(0, len(todo), batch)]
+    next_part = len(list(parts.glob("part-*.parquet")))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    t0 = time.perf_counter()
+    n_done = 0
+    busy_s = 0.0
+    if batches:
+        ctx = multiprocessing.get_context("spawn")   # torch + fork don't mix
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(threads, warm)) as pool:
+            ready_s = None
+            for rows, secs in pool.imap_unordered(_eval_batch, batches):
+                if ready_s is None:
+                    ready_s = time.perf_counter() - t0
+                _write_part(parts, next_part, rows, schema)
+                next_part += 1
+                n_done += len(rows)
+                busy_s += secs
+                elapsed = time.perf_counter() - t0
+                rate = n_done / elapsed
+                eta = (len(todo) - n_done) / rate if rate else float("inf")
+                logger.info(f"{n_done}/{len(todo)} pairs, {rate:.2f} pairs/s, ETA {eta / 60:.1f} min")
+    elapsed = time.perf_counter() - t0
+    total = _merge(parts, out, schema)
+    summary = {
+        "pairs": n_done,
+        "elapsed_s": round(elapsed, 1),
+        "pairs_per_s": round(n_done / elapsed, 3) if n_done else None,
+        # per-worker rate excluding model load; multiply by workers to size a run
+        "pairs_per_worker_s": round(n_done / busy_s, 3) if busy_s else None,
+        "workers": workers,
+        "batch": batch,
+        "rows_in_output": total,
+        "output": str(out),
+    }
+    logger.info(json.dumps(summary))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--manifest", type=Path, help="CSV or JSONL with a, b (+ id, extra) columns")
+    src.add_argument("--dir", type=Path, help="directory with original/ and converted/ subdirs")
+    ap.add_argument("--a-dir", default="original", help="--dir subdirectory for side a")
+    ap.add_argument("--b-dir", default="converted", help="--dir subdirectory for side b")
+    ap.add_argument("--out", type=Path, required=True, help=".parquet, or .arrow/.feather")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4))
+    ap.add_argument("--batch", type=int, default=8, help="pairs per batched model call")
+    ap.add_argument("--pitch-backend", choices=("pyin", "yin"), default=None)
+    ap.add_argument("--limit", type=int, default=0, help="only the first N pairs")
+    ap.add_argument("--no-warm", action="store_true", help="load models lazily in the workers")
+    args = ap.parse_args()
+
+    pairs = load_manifest(args.manifest) if args.manifest else \
+        pairs_from_dir(args.dir, args.a_dir, args.b_dir)
+    if args.limit:
+        pairs = pairs[:args.limit]
+    ids = [p["id"] for p in pairs]
+    if len(set(ids)) != len(ids):
+        sys.exit("pair ids must be unique (resume depends on them)")
+    if not pairs:
+        sys.exit("no pairs found")
+    run(pairs, args.out, max(1, args.workers), max(1, args.batch), args.pitch_backend,
+        not args.no_warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,100 @@
+"""Voice-comparison metrics: transcript, speech rate, pitch, sentiment, similarity, aesthetics.
+
+This module used to import transformers, sentence-transformers, audiobox,
+librosa and matplotlib at the top. Anything that imported it (each metrics
+worker, corpus_eval.py) paid all of that import time and RSS, even for a
+pitch-only comparison. Now each metric is a plugin in a small registry:
+
+  - a plugin is a function decorated with @metric(name, needs=..., warm=...). It
+    fills its fields of the per-pair result and imports its heavy dependencies
+    inside its body, so they load on first use;
+  - `needs` names the plugins whose output it reads (rate, sentiment and
+    similarity need transcript). resolve_metrics() expands a request to
+    that closure in run order;
+  - analyze_voices(..., metrics=["pitch", "rate"]) runs only those plugins.
+    Fields of the metrics that were not run stay None, and the result lists
+    the ones that ran under "metrics". /api/metrics-comparison takes
+    ?metrics=pitch,rate.
+
+Importing this module costs numpy and soundfile. Metrics workers warm only the
+METRICS_DEFAULT set at spawn; any other metric loads the first time a request
+asks for it.
+
+Env:
+  METRICS_DEFAULT   comma-separated metrics run when a request names none (default all)
+"""
+
+import importlib.util
+import json
+import math
+import os
 import warnings
-import librosa
+
 import numpy as np
-import pyphen
-from transformers import pipeline, WhisperProcessor, WhisperForConditionalGeneration
-from sentence_transformers import SentenceTransformer, util
-import torch
-import soundfile as sf
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend for server environments
+import aesthetics
+from asr import get_asr
+import pitch
+import text_models
 
 # PyTorch internal deprecation from attention layers in SBERT/transformers; not actionable.
 warnings.filterwarnings("ignore", message="Support for mismatched key_padding_mask and attn_mask")
-from matplotlib.patches import FancyBboxPatch
-import matplotlib.pyplot as plt
-
-try:
-    from audiobox_aesthetics.infer import initialize_predictor
-    AUDIOBOX_AVAILABLE = True
-except ImportError:
-    AUDIOBOX_AVAILABLE = False
+
+# Checked without importing it; audiobox (and torch) load with the aesthetics plugin.
+AUDIOBOX_AVAILABLE = importlib.util.find_spec("audiobox_aesthetics") is not None
+if not AUDIOBOX_AVAILABLE:
     print("Warning: audiobox_aesthetics not available. Aesthetic metrics will use mock values.")
 
 # These metrics are offline/post-conversation analysis. Run them on CPU so they never
 # contend with PersonaPlex (7B) for GPU memory — repeatedly loading them on cuda after
 # every conversation was leaking/fragmenting GPU memory and causing OOM. Also cache each
 # model as a lazy singleton so they load once instead of per request.
-_asr_processor = None
-_asr_model = None
+# Transcription goes through asr.py (faster-whisper int8, the same backend as
+# /api/transcribe); ASR_BACKEND=hf restores the HF openai/whisper-small model.
 _sentiment_pipe = None
 _sbert_model = None
 _aes_predictor = None
+_onnx_tried = False
 
 def _get_asr():
-    global _asr_processor, _asr_model
-    if _asr_model is None:
-        _asr_processor = WhisperProcessor.from_pretrained("openai/whisper-small")
-        _asr_model = WhisperForConditionalGeneration.from_pretrained("openai/whisper-small")
-        _asr_model.eval()
-    return _asr_processor, _asr_model
+    return get_asr().load()
+
+def _load_onnx_text_models():
+    # METRICS_TEXT_BACKEND=onnx|onnx-int8: exported ONNX Runtime models (text_models.py).
+    # Tried once; if it returns None the PyTorch models below are used.
+    global _sentiment_pipe, _sbert_model, _onnx_tried
+    if _onnx_tried or text_models.TEXT_BACKEND == "torch":
+        return
+    _onnx_tried = True
+    models = text_models.load()
+    if models is not None:
+        _sentiment_pipe, _sbert_model = models
 
 def _get_sentiment():
     global _sentiment_pipe
     if _sentiment_pipe is None:
+        _load_onnx_text_models()
+    if _sentiment_pipe is None:
+        from transformers import pipeline
+
         _sentiment_pipe = pipeline("sentiment-analysis", model="distilbert/distilbert-base-uncased-finetuned-sst-2-english", device=-1)
     return _sentiment_pipe
 
 def _get_sbert():
     global _sbert_model
     if _sbert_model is None:
+        _load_onnx_text_models()
+    if _sbert_model is None:
+        from sentence_transformers import SentenceTransformer
+
         _sbert_model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
     return _sbert_model
 
 def _get_aes():
     global _aes_predictor
     if _aes_predictor is None and AUDIOBOX_AVAILABLE:
+        import torch
+        from audiobox_aesthetics.infer import initialize_predictor
+
         # audiobox's setup_model() loads on cuda when available — which OOMs on a full
         # shared GPU (PersonaPlex/X-VC) *during* the load, before we could move it.
         # Hide cuda for the duration of init so it loads straight onto CPU.
@@ -72,17 +113,7 @@ def _get_aes():
 
 def get_transcript(audio_path):
     try:
-        processor, model = _get_asr()
-        audio, _ = librosa.load(audio_path, sr=16000)
-        # Per transformers docs: truncation=False + return_attention_mask + padding="longest"
-        # feeds the full audio; return_timestamps enables Whisper's own long-form algorithm (§3.8).
-        inputs = processor(
-            audio, sampling_rate=16000, return_tensors="pt",
-            truncation=False, padding="longest", return_attention_mask=True,
-        )
-        with torch.no_grad():
-            ids = model.generate(**inputs, return_timestamps=True)
-        return processor.batch_decode(ids, skip_special_tokens=True)[0].strip()
+        return _get_asr().transcribe(audio_path)["text"]
     except Exception as e:
         print(f"Error during transcription: {e}")
         return ""
@@ -93,12 +124,15 @@ def calculate_speech_rate(audio_path, transcript):
     Calculates the speech rate in syllables per second.
     """
     try:
+        import librosa
+        import pyphen
+
         dic = pyphen.Pyphen(lang='en_US')
         syllable_count = sum(len(dic.inserted(word).split('-')) for word in transcript.split())
-        
+
         audio, sr = librosa.load(audio_path, sr=None)
         duration = librosa.get_duration(y=audio, sr=sr)
-        
+
         if duration > 0:
             return syllable_count / duration
         return 0
@@ -107,17 +141,20 @@ def calculate_speech_rate(audio_path, transcript):
         return None
 
 # --- Metric 2: Pitch Analysis ---
-def calculate_pitch_stats(audio_path):
+def calculate_pitch_stats(audio_path, backend=None):
     """
     Calculates the mean and standard deviation of the pitch (F0).
+    backend: "pyin" (accurate) or "yin" (fast); see pitch.py. Default PITCH_BACKEND.
     """
     try:
+        import librosa
+
         audio, sr = librosa.load(audio_path, sr=None)
-        f0, voiced_flag, _ = librosa.pyin(audio, sr=sr, fmin=65, fmax=400)
-        
+        f0, voiced_flag = pitch.track(audio, sr, backend)
+
         # Get only the F0 values for voiced frames
         voiced_f0 = f0[voiced_flag]
-        
+
         if len(voiced_f0) > 0:
             mean_pitch = np.mean(voiced_f0)
             std_pitch = np.std(voiced_f0)
@@ -150,268 +187,207 @@ def calculate_semantic_similarity(transcript_a, transcript_b):
         model = _get_sbert()
 
         # Compute embedding for both transcripts
-        embedding_1 = model.encode(transcript_a, convert_to_tensor=True)
-        embedding_2 = model.encode(transcript_b, convert_to_tensor=True)
-        
-        # Compute cosine-similarity
-        cosine_scores = torch.abs(util.cos_sim(embedding_1, embedding_2))
-        return cosine_scores.item()
+        embedding_1, embedding_2 = np.asarray(model.encode([transcript_a, transcript_b]), dtype=np.float64)
+
+        # Compute cosine-similarity (in NumPy, so the ONNX text backend never imports torch)
+        norm = np.linalg.norm(embedding_1) * np.linalg.norm(embedding_2)
+        return float(abs(embedding_1 @ embedding_2) / max(norm, 1e-12))
     except Exception as e:
         print(f"Error calculating semantic similarity: {e}")
         return None
 
-# --- Main Analysis Function ---
-def analyze_voices(audio_path_a, audio_path_b):
-    """
-    Runs all analyses on the two provided audio files.
-    """
-    # Get transcripts
-    transcript_a = get_transcript(audio_path_a)
-    transcript_b = get_transcript(audio_path_b)
-
-    def _safe_duration(path):
-        try:
-            return float(librosa.get_duration(path=path))
-        except Exception as e:
-            print(f"Error getting duration: {e}")
-            return None
-
-    # Calculate metrics for Response A
-    metrics_a = {
-        "speech_rate": calculate_speech_rate(audio_path_a, transcript_a),
-        "sentiment": analyze_sentiment(transcript_a),
-        "mean_pitch": calculate_pitch_stats(audio_path_a)[0],
-        "std_pitch": calculate_pitch_stats(audio_path_a)[1],
-        "transcript": transcript_a,
-        "duration": _safe_duration(audio_path_a),
-    }
+def _safe_duration(path):
+    try:
+        import soundfile as sf
 
-    # Calculate metrics for Response B
-    metrics_b = {
-        "speech_rate": calculate_speech_rate(audio_path_b, transcript_b),
-        "sentiment": analyze_sentiment(transcript_b),
-        "mean_pitch": calculate_pitch_stats(audio_path_b)[0],
-        "std_pitch": calculate_pitch_stats(audio_path_b)[1],
-        "transcript": transcript_b,
-        "duration": _safe_duration(audio_path_b),
-    }
+        return float(sf.info(path).duration)
+    except Exception:
+        pass
+    try:
+        import librosa
 
-    # Calculate comparison metrics
-    comparison_metrics = {
-        "semantic_similarity": calculate_semantic_similarity(transcript_a, transcript_b)
-    }
+        return float(librosa.get_duration(path=path))
+    except Exception as e:
+        print(f"Error getting duration: {e}")
+        return None
 
-    # --- Aesthetic Metrics ---
-    aesthetic_metrics = {
-        "response_a": {
-            "production_quality": None,
-            "content_usefulness": None,
-            "content_enjoyment": None,
-            "production_complexity": None,
-        },
-        "response_b": {
-            "production_quality": None,
-            "content_usefulness": None,
-            "content_enjoyment": None,
-            "production_complexity": None,
-        }
-    }
-    
+# --- Metric plugins ---
+# name -> (needs, run, warm). run(pair) fills pair["results"]; warm() loads and primes
+# the plugin's model for metrics workers. Registration order is the default run order.
+_REGISTRY = {}
+SIDES = ("response_a", "response_b")
+AES_KEYS = {
+    "PQ": "production_quality",
+    "CU": "content_usefulness",
+    "CE": "content_enjoyment",
+    "PC": "production_complexity",
+}
+
+def metric(name, needs=(), warm=None):
+    def register(run):
+        _REGISTRY[name] = (tuple(needs), run, warm)
+        return run
+    return register
+
+@metric("transcript", warm=lambda: _get_asr().transcribe(np.zeros(16000, dtype=np.float32)))
+def _transcript(pair):
+    for side, path in pair["paths"].items():
+        pair["results"][side]["transcript"] = get_transcript(path)
+
+@metric("duration")
+def _duration(pair):
+    for side, path in pair["paths"].items():
+        pair["results"][side]["duration"] = _safe_duration(path)
+
+@metric("rate", needs=["transcript"])
+def _rate(pair):
+    for side, path in pair["paths"].items():
+        res = pair["results"][side]
+        res["speech_rate"] = calculate_speech_rate(path, res["transcript"])
+
+@metric("pitch")
+def _pitch(pair):
+    for side, path in pair["paths"].items():
+        res = pair["results"][side]
+        res["mean_pitch"], res["std_pitch"] = calculate_pitch_stats(path, pair["pitch_backend"])
+
+@metric("sentiment", needs=["transcript"], warm=lambda: _get_sentiment()("warm up"))
+def _sentiment(pair):
+    for side in pair["paths"]:
+        res = pair["results"][side]
+        res["sentiment"] = analyze_sentiment(res["transcript"])
+
+@metric("similarity", needs=["transcript"], warm=lambda: _get_sbert().encode(["warm up"]))
+def _similarity(pair):
+    a, b = (pair["results"][side]["transcript"] for side in SIDES)
+    pair["results"]["comparison"]["semantic_similarity"] = calculate_semantic_similarity(a, b)
+
+@metric("aesthetics", warm=lambda: _get_aes())
+def _aesthetics(pair):
+    out = pair["results"]["aesthetics"]
     if AUDIOBOX_AVAILABLE:
         try:
             predictor = _get_aes()
-            scores = predictor.forward([{"path": audio_path_a}, {"path": audio_path_b}])
+            # Whole files, or windowed with bounded memory for long ones (aesthetics.py).
+            scores = aesthetics.score(predictor, [pair["paths"][side] for side in SIDES])
 
             # The model returns keys like 'PQ', 'CU', etc. We map them to our desired keys.
-            key_map = {
-                "PQ": "production_quality",
-                "CU": "content_usefulness",
-                "CE": "content_enjoyment",
-                "PC": "production_complexity",
-            }
-
             if scores and len(scores) > 1:
-                aesthetic_metrics["response_a"] = {key_map.get(k, k): v for k, v in scores[0].items()}
-                aesthetic_metrics["response_b"] = {key_map.get(k, k): v for k, v in scores[1].items()}
+                for side, sc in zip(SIDES, scores):
+                    if sc:   # {} for an empty file: keep the blank scores
+                        out[side] = {AES_KEYS.get(k, k): v for k, v in sc.items()}
 
         except Exception as e:
             print(f"Error calculating aesthetic metrics: {e}")
     else:
-        # Use mock values when audiobox_aesthetics is not available
+        # Use mock values when audiobox_aesthetics is not available; flagged, so they
+        # stay out of the results store.
         print("Using mock aesthetic metrics (audiobox_aesthetics not available)")
-        aesthetic_metrics = {
-            "response_a": {
-                "production_quality": 6.5,
-                "content_usefulness": 7.2,
-                "content_enjoyment": 6.8,
-                "production_complexity": 5.5,
-            },
-            "response_b": {
-                "production_quality": 7.1,
-                "content_usefulness": 6.9,
-                "content_enjoyment": 7.5,
-                "production_complexity": 6.2,
-            }
+        pair["results"]["aesthetics_mock"] = True
+        out["response_a"] = {
+            "production_quality": 6.5,
+            "content_usefulness": 7.2,
+            "content_enjoyment": 6.8,
+            "production_complexity": 5.5,
+        }
+        out["response_b"] = {
+            "production_quality": 7.1,
+            "content_usefulness": 6.9,
+            "content_enjoyment": 7.5,
+            "production_complexity": 6.2,
         }
 
+METRIC_NAMES = tuple(_REGISTRY)
+
+def resolve_metrics(names=None):
+    """Requested metric names (default METRICS_DEFAULT) plus what they need, in run order."""
+    if names is None:
+        names = DEFAULT_METRICS
+    elif isinstance(names, str):
+        names = names.split(",")
+    wanted = set()
+
+    def visit(name):
+        if name not in _REGISTRY:
+            raise ValueError(f"Unknown metric {name!r} (expected any of {', '.join(METRIC_NAMES)})")
+        if name not in wanted:
+            wanted.add(name)
+            for dep in _REGISTRY[name][0]:
+                visit(dep)
+
+    for name in names:
+        name = name.strip().lower()
+        if name:
+            visit(name)
+    return [name for name in METRIC_NAMES if name in wanted]
+
+DEFAULT_METRICS = resolve_metrics(os.environ.get("METRICS_DEFAULT") or METRIC_NAMES)
+
+def warm(names=None):
+    """Load and prime the models of these metrics (default METRICS_DEFAULT)."""
+    for name in resolve_metrics(names):
+        warm_fn = _REGISTRY[name][2]
+        if warm_fn is not None:
+            warm_fn()
 
-    return {
-        "response_a": metrics_a,
-        "response_b": metrics_b,
-        "comparison": comparison_metrics,
-        "aesthetics": aesthetic_metrics
-    }
-
-def create_comprehensive_metrics_plot(metrics_data, save_path='metrics_comparison.png'):
+# --- Main Analysis Function ---
+def analyze_voices(audio_path_a, audio_path_b, pitch_backend=None, metrics=None):
     """
-    Creates a highly stylized, comprehensive metrics visualization for web display.
+    Runs the selected analyses (default METRICS_DEFAULT) on the two provided audio files.
     """
-    # Extract data
-    response_a = metrics_data["response_a"]
-    response_b = metrics_data["response_b"]
-    aesthetics_a = metrics_data["aesthetics"]["response_a"]
-    aesthetics_b = metrics_data["aesthetics"]["response_b"]
-    semantic_sim = metrics_data["comparison"]["semantic_similarity"]
-    
-    # Create figure with a light background color and better proportions
-    fig = plt.figure(figsize=(22, 14))
-    fig.patch.set_facecolor('#F9FAFB')
-    
-    # Define modern, web-friendly colors
-    color_a = '#22C55E'  # Green
-    color_b = '#EF4444'  # Red
-    text_color_dark = '#1F2937'
-    text_color_light = '#6B7280'
-    border_color = '#E5E7EB'
-    # Set global font size for all text in this figure
-    plt.rcParams.update({'font.size': 24})
-
-    # Create a well-balanced grid layout without title space
-    gs = fig.add_gridspec(3, 5, height_ratios=[2.5, 2.5, 0.8], width_ratios=[1.3, 0.2, 1.8, 0.2, 1.3],
-                         hspace=0.25, wspace=0.15, top=0.95, bottom=0.08, left=0.03, right=0.97)
-        
-    
-    # --- Left & Right Side: Response Metrics with better spacing ---
-    for i, (resp_data, color, full_label) in enumerate([
-        (response_a, color_a, 'Response to Original Speaker'), 
-        (response_b, color_b, 'Response to Voice Converted Speaker')
-    ]):
-        # Use cleaner column positioning (0 for left, 4 for right)
-        ax_resp = fig.add_subplot(gs[0:2, 0 if i == 0 else 4])
-        
-        # Use FancyBboxPatch with better proportions and padding
-        ax_resp.add_patch(FancyBboxPatch((0.08, 0.08), 0.84, 0.84,
-                                         boxstyle="round,pad=0.04,rounding_size=0.06",
-                                         facecolor=color, alpha=0.08, 
-                                         edgecolor=color, linewidth=2.5,
-                                         transform=ax_resp.transAxes))
-        
-        # Better positioned title with word wrapping consideration
-        title_lines = full_label.split(' to ')
-        title_text = f"{title_lines[0]} to \n {title_lines[1]}"
-        if title_lines[1] == "Voice Converted Speaker":
-            title_text = f"{title_lines[0]} to \n Voice Converted \n Speaker"
-        # Lower the y-position and reduce font size to prevent overflow
-        ax_resp.text(0.5, 0.85, title_text, fontsize=32, fontweight='bold',
-                    ha='center', va='center', transform=ax_resp.transAxes,
-                    color=text_color_dark, linespacing=1.2)
-        # More spaced out details with better formatting
-        details_text = f"Speech Rate\n{resp_data['speech_rate']:.0f} syl/sec\n\n" \
-                       f"Sentiment\n{resp_data['sentiment']}\n\n" \
-                       f"Mean Pitch\n{resp_data['mean_pitch']:.0f} Hz\n\n" \
-                       f"Pitch Std Dev\n{resp_data['std_pitch']:.0f} Hz"
-        ax_resp.text(0.5, 0.45, details_text, fontsize=26, fontweight='normal',
-                      ha='center', va='center', transform=ax_resp.transAxes,
-                      color=text_color_dark, linespacing=1.3)
-        ax_resp.axis('off')
-
-    # --- Center: Radar Chart with optimal positioning and sizing ---
-    ax_radar = fig.add_subplot(gs[0:2, 2], projection='polar')
-    
-    metric_keys = ['production_quality', 'content_enjoyment', 'production_complexity', 'content_usefulness']
-    labels = {
-        "production_quality": "Production\nQuality",
-        "content_enjoyment": "Content\nEnjoyment",
-        "production_complexity": "Production\nComplexity",
-        "content_usefulness": "Content\nUsefulness"
+    names = resolve_metrics(metrics)
+    blank = dict.fromkeys(AES_KEYS.values())
+    pair = {
+        "paths": {"response_a": audio_path_a, "response_b": audio_path_b},
+        "pitch_backend": pitch_backend,
+        "results": {
+            **{side: dict.fromkeys(("speech_rate", "sentiment", "mean_pitch", "std_pitch",
+                                    "transcript", "duration")) for side in SIDES},
+            "comparison": {"semantic_similarity": None},
+            "aesthetics": {side: dict(blank) for side in SIDES},
+            "aesthetics_mock": False,
+        },
     }
-    
-    stats_a = [aesthetics_a.get(k, 0) for k in metric_keys]
-    stats_b = [aesthetics_b.get(k, 0) for k in metric_keys]
-    angles = np.linspace(0, 2 * np.pi, len(metric_keys), endpoint=False).tolist()
-    
-    stats_a_closed = stats_a + stats_a[:1]
-    stats_b_closed = stats_b + stats_b[:1]
-    angles_closed = angles + angles[:1]
+    for name in names:
+        _REGISTRY[name][1](pair)
+    return {**pair["results"], "metrics": names}
 
-    ax_radar.set_facecolor(fig.get_facecolor())
-    ax_radar.set_ylim(0, 10)
+# Pitch backend recorded for stats taken from the chat proxy's live prosody
+# (16 kHz YIN, PROSODY_SILENCE_DB gate; see common/prosody.py) instead of the pitch plugin.
+LIVE_PITCH_BACKEND = "live-yin"
 
-    # --- Clean grid with better visibility ---
-    ax_radar.grid(False)
-    ax_radar.spines['polar'].set_visible(False)
-    ax_radar.set_yticklabels([])
-    ax_radar.set_xticklabels([])
+def live_pitch(raw):
+    """Per-side pitch fields from a chat-proxy prosody snapshot (0x06 JSON).
 
-    # Axis lines
-    for angle in angles:
-        ax_radar.plot([angle, angle], [0, 10], color=border_color, linestyle='-', linewidth=1.8, alpha=0.9)
-
-    # Concentric circles
-    for r in np.arange(2, 11, 2):
-        ax_radar.plot(angles_closed, [r] * len(angles_closed), color=border_color, linewidth=1.5, alpha=0.7)
-        ax_radar.text(np.pi/2, r, str(r), ha='center', va='center', fontsize=10, color=text_color_light,
-                      bbox=dict(boxstyle='round,pad=0.2', fc=fig.get_facecolor(), ec='none', alpha=0.9))
-
-    # --- Plot Data with enhanced visibility ---
-    ax_radar.plot(angles_closed, stats_a_closed, color=color_a, linewidth=4, linestyle='solid', 
-                 label='Response to Original Speaker', zorder=3)
-    ax_radar.fill(angles_closed, stats_a_closed, color=color_a, alpha=0.2, zorder=2)
-    ax_radar.scatter(angles, stats_a, c=color_a, s=140, zorder=4, edgecolors='white', linewidth=3)
-
-    ax_radar.plot(angles_closed, stats_b_closed, color=color_b, linewidth=4, linestyle='solid', 
-                 label='Response to Voice Converted Speaker', zorder=3)
-    ax_radar.fill(angles_closed, stats_b_closed, color=color_b, alpha=0.2, zorder=2)
-    ax_radar.scatter(angles, stats_b, c=color_b, s=140, zorder=4, edgecolors='white', linewidth=3)
-
-    # Better positioned labels with adequate spacing
-    for angle, label_key in zip(angles, metric_keys):
-        ax_radar.text(angle, 11.8, labels[label_key], ha='center', va='center', 
-                     fontsize=28, fontweight='bold', color=text_color_dark, linespacing=1.0)
-
-    # --- Bottom Section: Semantic Similarity & Legend with perfect spacing ---
-    ax_bottom = fig.add_subplot(gs[2, :])
-    ax_bottom.axis('off')
-
-    # Semantic similarity box with better proportions and positioning (moved up)
-    ax_bottom.add_patch(FancyBboxPatch((0.36, 0.55), 0.28, 0.5,
-                                       boxstyle="round,pad=0.04,rounding_size=0.08",
-                                       facecolor=text_color_dark,
-                                       edgecolor='none', transform=ax_bottom.transAxes,
-                                       clip_on=False, zorder=5))
-    semantic_text = f"Semantic Similarity: {semantic_sim:.2f}"
-    ax_bottom.text(0.5, 0.8, semantic_text, fontsize=28, fontweight='bold',
-                    ha='center', va='center', transform=ax_bottom.transAxes,
-                    color='white', zorder=6)
-
-    legend_elements = [
-        plt.Line2D([0], [0], marker='o', color='w', label='Response to Original Speaker',
-                   markerfacecolor=color_a, markersize=14),
-        plt.Line2D([0], [0], marker='o', color='w', label='Response to Voice Converted Speaker',
-                   markerfacecolor=color_b, markersize=14)
-    ]
-    legend = ax_bottom.legend(handles=legend_elements, loc='lower center', 
-                             bbox_to_anchor=(0.5, -0.15), ncol=2, fontsize=24,
-                             frameon=False, columnspacing=4, handletextpad=1)
-    
-    # Ensure legend text is properly styled
-    for text in legend.get_texts():
-        text.set_color(text_color_dark)
-        text.set_fontweight('medium')
-    
-    plt.tight_layout(rect=[0, 0.02, 1, 0.98])
-    plt.savefig(save_path, dpi=300, bbox_inches='tight', facecolor=fig.get_facecolor())
-    plt.close()
+    The mic track is the original speaker (response_a), vc the converted voice
+    (response_b). Raises ValueError if the snapshot is malformed or a track is empty.
+    """
+    snap = json.loads(raw)
+    fields = {}
+    for side, track in zip(SIDES, ("mic", "vc")):
+        t = snap.get(track) if isinstance(snap, dict) else None
+        if not isinstance(t, dict) or not t.get("seconds"):
+            raise ValueError(f"prosody has no {track!r} track")
+        fields[side] = {k: _finite(t.get(src)) for k, src in (
+            ("mean_pitch", "f0_mean"), ("std_pitch", "f0_std"),
+            ("voiced_ratio", "voiced_ratio"), ("energy_db_mean", "energy_db_mean"))}
+    return fields
+
+def _finite(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+def create_comprehensive_metrics_plot(metrics_data, save_path='metrics_comparison.png', dpi=None):
+    """
+    Creates a highly stylized, comprehensive metrics visualization for web display.
+    PNG (at dpi, default METRICS_CARD_DPI) or SVG, by save_path's extension; see metrics_card.py.
+    """
+    import metrics_card
+
+    metrics_card.save(metrics_data, save_path, dpi=dpi)
     print(f"✨ Prettified comprehensive metrics plot saved to {save_path}")
 
 
@@ -420,6 +396,10 @@ def create_radar_chart(aesthetics_a, aesthetics_b, save_path='metrics_comparison
     Creates a highly stylized, web-ready radar chart with a diamond grid.
     This function is kept for backward compatibility.
     """
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-interactive backend for server environments
+    import matplotlib.pyplot as plt
+
     metric_keys = ['production_quality', 'content_enjoyment', 'production_complexity', 'content_usefulness']
     
     # Prettify labels, splitting long ones into two lines
@@ -547,4 +527,3 @@ if __name__ == '__main__':
         create_comprehensive_metrics_plot(analysis_results)
         
     # Also create the standalone radar chart for backward compatibility
-    # create_radar_chart(analysis_results["aesthetics"]["response_a"], analysis_results["aesthetics"]["response_b"])
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""Metrics-comparison card renderer (PNG or SVG), with the static chrome drawn once.
+
+create_comprehensive_metrics_plot used to build a 22x14-inch pyplot figure on
+every request: gridspec, polar axes, FancyBboxPatches, legend. It saved that
+at dpi=300, a ~6600x4200 PNG, and set the global plt.rcParams on the way.
+
+MetricsCard builds the same layout once per thread and DPI with the
+object-oriented API (Figure + FigureCanvasAgg: no pyplot, no rcParams), and
+sorts the artists into two groups:
+
+  chrome  background, panels, titles, the radar grid, axis labels, the legend
+          and the similarity box. Rasterised once and kept as an Agg
+          background region;
+  data    the per-response detail text, the two radar polygons, their lines
+          and markers, and the similarity value. These are animated artists, so
+          a full draw skips them.
+
+A PNG render restores the background and blits only the data artists, crops
+to the precomputed tight box and encodes with Pillow, as a 256-colour palette
+image unless METRICS_CARD_PALETTE=0. An SVG render saves the
+same figure as vectors, which is small and needs no rasterisation at all.
+Each thread keeps its own figures (threading.local), so renders in metrics
+workers or threads never share matplotlib state; at most two per thread (the
+CARD_DPI card and the last other DPI asked for).
+
+Env:
+  METRICS_CARD_DPI       PNG resolution (default 100; the old renderer used 300)
+  METRICS_CARD_PALETTE   1 (default): palette PNG; 0: full RGB
+"""
+
+import gc
+import io
+import os
+import threading
+import warnings
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.patches import FancyBboxPatch
+
+CARD_DPI = int(os.environ.get("METRICS_CARD_DPI", "100"))
+CARD_PALETTE = os.environ.get("METRICS_CARD_PALETTE", "1") not in ("0", "false")
+CARD_FORMATS = ("png", "svg")
+
+BG = "#F9FAFB"
+COLOR_A = "#22C55E"   # green
+COLOR_B = "#EF4444"   # red
+TEXT_DARK = "#1F2937"
+TEXT_LIGHT = "#6B7280"
+BORDER = "#E5E7EB"
+LABEL_A = "Response to Original Speaker"
+LABEL_B = "Response to Voice Converted Speaker"
+TITLES = ("Response to \n Original Speaker", "Response to \n Voice Converted \n Speaker")
+
+METRIC_KEYS = ["production_quality", "content_enjoyment", "production_complexity", "content_usefulness"]
+METRIC_LABELS = {
+    "production_quality": "Production\nQuality",
+    "content_enjoyment": "Content\nEnjoyment",
+    "production_complexity": "Production\nComplexity",
+    "content_usefulness": "Content\nUsefulness",
+}
+PAD_INCHES = 0.1
+
+# tight_layout calls the polar radar "not compatible", but lays it out fine. A module-level
+# filter, because catch_warnings() isn't thread-safe.
+warnings.filterwarnings("ignore", message="This figure includes Axes that are not compatible with tight_layout")
+
+
+def _fmt(value, spec: str) -> str:
+    if value is None:
+        return "n/a"
+    try:
+        return format(value, spec)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class MetricsCard:
+    """One pre-drawn card at a fixed DPI; png()/svg() fill in a result and encode it."""
+
+    def __init__(self, dpi: int = CARD_DPI):
+        self.dpi = dpi
+        fig = self.fig = Figure(figsize=(22, 14), dpi=dpi, facecolor=BG)
+        self.canvas = FigureCanvasAgg(fig)
+        gs = fig.add_gridspec(3, 5, height_ratios=[2.5, 2.5, 0.8], width_ratios=[1.3, 0.2, 1.8, 0.2, 1.3],
+                              hspace=0.25, wspace=0.15, top=0.95, bottom=0.08, left=0.03, right=0.97)
+
+        # Side panels: box and title are chrome, the numbers are data.
+        self.details = []
+        for i, (color, title) in enumerate(zip((COLOR_A, COLOR_B), TITLES)):
+            ax = fig.add_subplot(gs[0:2, 0 if i == 0 else 4])
+            ax.add_patch(FancyBboxPatch((0.08, 0.08), 0.84, 0.84,
+                                        boxstyle="round,pad=0.04,rounding_size=0.06",
+                                        facecolor=color, alpha=0.08, edgecolor=color, linewidth=2.5,
+                                        transform=ax.transAxes))
+            ax.text(0.5, 0.85, title, fontsize=32, fontweight="bold", ha="center", va="center",
+                    transform=ax.transAxes, color=TEXT_DARK, linespacing=1.2)
+            self.details.append(ax.text(0.5, 0.45, "", fontsize=26, ha="center", va="center",
+                                        transform=ax.transAxes, color=TEXT_DARK, linespacing=1.3,
+                                        animated=True))
+            ax.axis("off")
+
+        # Radar: grid, ring labels and axis labels are chrome; polygons are data.
+        radar = self.radar = fig.add_subplot(gs[0:2, 2], projection="polar")
+        self.angles = np.linspace(0, 2 * np.pi, len(METRIC_KEYS), endpoint=False)
+        closed = np.append(self.angles, self.angles[0])
+        radar.set_facecolor(BG)
+        radar.set_ylim(0, 10)
+        radar.grid(False)
+        radar.spines["polar"].set_visible(False)
+        radar.set_yticklabels([])
+        radar.set_xticklabels([])
+        for angle in self.angles:
+            radar.plot([angle, angle], [0, 10], color=BORDER, linewidth=1.8, alpha=0.9)
+        for r in range(2, 11, 2):
+            radar.plot(closed, [r] * len(closed), color=BORDER, linewidth=1.5, alpha=0.7)
+            radar.text(np.pi / 2, r, str(r), ha="center", va="center", fontsize=10, color=TEXT_LIGHT,
+                       bbox=dict(boxstyle="round,pad=0.2", fc=BG, ec="none", alpha=0.9))
+        for angle, key in zip(self.angles, METRIC_KEYS):
+            radar.text(angle, 11.8, METRIC_LABELS[key], ha="center", va="center", fontsize=28,
+                       fontweight="bold", color=TEXT_DARK, linespacing=1.0)
+        zeros = np.zeros(len(closed))
+        self.series = []
+        for color in (COLOR_A, COLOR_B):
+            (fill,) = radar.fill(closed, zeros, color=color, alpha=0.2, zorder=2, animated=True)
+            (line,) = radar.plot(closed, zeros, color=color, linewidth=4, zorder=3, animated=True)
+            dots = radar.scatter(self.angles, zeros[:-1], c=color, s=140, zorder=4, edgecolors="white",
+                                 linewidth=3, animated=True)
+            self.series.append((fill, line, dots))
+
+        # Bottom: similarity box and legend are chrome; the value is data.
+        bottom = fig.add_subplot(gs[2, :])
+        bottom.axis("off")
+        bottom.add_patch(FancyBboxPatch((0.36, 0.55), 0.28, 0.5,
+                                        boxstyle="round,pad=0.04,rounding_size=0.08",
+                                        facecolor=TEXT_DARK, edgecolor="none", transform=bottom.transAxes,
+                                        clip_on=False, zorder=5))
+        self.similarity = bottom.text(0.5, 0.8, "", fontsize=28, fontweight="bold", ha="center",
+                                      va="center", transform=bottom.transAxes, color="white", zorder=6,
+                                      animated=True)
+        handles = [Line2D([0], [0], marker="o", color="w", label=label, markerfacecolor=color, markersize=14)
+                   for label, color in ((LABEL_A, COLOR_A), (LABEL_B, COLOR_B))]
+        legend = bottom.legend(handles=handles, loc="lower center", bbox_to_anchor=(0.5, -0.15), ncol=2,
+                               fontsize=24, frameon=False, columnspacing=4, handletextpad=1)
+        for text in legend.get_texts():
+            text.set_color(TEXT_DARK)
+            text.set_fontweight("medium")
+
+        fig.tight_layout(rect=[0, 0.02, 1, 0.98])
+
+        self.data_artists = sorted([*self.details, *(a for s in self.series for a in s), self.similarity],
+                                   key=lambda a: a.get_zorder())
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(fig.bbox)
+        # Crop box of the chrome, like savefig(bbox_inches="tight"), in buffer pixels.
+        tight = fig.get_tightbbox(self.canvas.get_renderer()).padded(PAD_INCHES)
+        h = int(fig.bbox.height)
+        x0, x1 = max(0, int(tight.x0 * dpi)), min(int(fig.bbox.width), int(np.ceil(tight.x1 * dpi)))
+        y0, y1 = max(0, h - int(np.ceil(tight.y1 * dpi))), min(h, h - int(tight.y0 * dpi))
+        self.crop = (slice(y0, y1), slice(x0, x1))
+
+    def _update(self, metrics_data: dict) -> None:
+        for text, key in zip(self.details, ("response_a", "response_b")):
+            d = metrics_data[key]
+            text.set_text(f"Speech Rate\n{_fmt(d.get('speech_rate'), '.0f')} syl/sec\n\n"
+                          f"Sentiment\n{_fmt(d.get('sentiment'), '')}\n\n"
+                          f"Mean Pitch\n{_fmt(d.get('mean_pitch'), '.0f')} Hz\n\n"
+                          f"Pitch Std Dev\n{_fmt(d.get('std_pitch'), '.0f')} Hz")
+        for (fill, line, dots), key in zip(self.series, ("response_a", "response_b")):
+            aes = metrics_data["aesthetics"][key] or {}
+            stats = np.array([aes.get(k) or 0.0 for k in METRIC_KEYS], dtype=float)
+            closed = np.append(stats, stats[0])
+            angles = np.append(self.angles, self.angles[0])
+            fill.set_xy(np.column_stack([angles, closed]))
+            line.set_data(angles, closed)
+            dots.set_offsets(np.column_stack([self.angles, stats]))
+        sim = metrics_data["comparison"]["semantic_similarity"]
+        self.similarity.set_text(f"Semantic Similarity: {_fmt(sim, '.2f')}")
+
+    def png(self, metrics_data: dict) -> bytes:
+        from PIL import Image
+
+        self._update(metrics_data)
+        self.canvas.restore_region(self.background)
+        for artist in self.data_artists:
+            self.fig.draw_artist(artist)
+        rgb = np.asarray(self.canvas.buffer_rgba())[self.crop + (slice(0, 3),)]
+        out = io.BytesIO()
+        img = Image.fromarray(np.ascontiguousarray(rgb))
+        if CARD_PALETTE:
+            # Flat UI colours + anti-aliasing fit a 256-colour palette with no visible
+            # loss; about 3x smaller than RGB and quicker to deflate.
+            img = img.quantize(256, method=Image.Quantize.FASTOCTREE)
+        img.save(out, format="PNG", compress_level=6)
+        return out.getvalue()
+
+    def svg(self, metrics_data: dict) -> bytes:
+        self._update(metrics_data)
+        for artist in self.data_artists:
+            artist.set_animated(False)
+        try:
+            out = io.BytesIO()
+            self.fig.savefig(out, format="svg", bbox_inches="tight", pad_inches=PAD_INCHES,
+                             facecolor=BG)
+        finally:
+            for artist in self.data_artists:
+                artist.set_animated(True)
+            # savefig went through the SVG backend; point the figure back at its Agg canvas.
+            self.fig.set_canvas(self.canvas)
+        return out.getvalue()
+
+
+_local = threading.local()
+
+
+def _card(dpi: int) -> MetricsCard:
+    # A card holds its full-size Agg buffer and background (~240 MB near 300 dpi), so
+    # each thread keeps the CARD_DPI card plus only the most recently used other one.
+    cards = getattr(_local, "cards", None)
+    if cards is None:
+        cards = _local.cards = {}
+    if dpi not in cards:
+        evicted = [d for d in cards if d != CARD_DPI]
+        for old in evicted:
+            del cards[old]
+        if evicted:
+            gc.collect()   # figures are reference cycles; free the buffers before the next one
+        cards[dpi] = MetricsCard(dpi)
+    return cards[dpi]
+
+
+def render(metrics_data: dict, fmt: str = "png", dpi: int | None = None) -> bytes:
+    """The card for one analyze_voices() result as PNG or SVG bytes."""
+    fmt = fmt.lower()
+    if fmt not in CARD_FORMATS:
+        raise ValueError(f"Unknown card format {fmt!r} (expected one of {', '.join(CARD_FORMATS)})")
+    card = _card(CARD_DPI if fmt == "svg" else int(dpi or CARD_DPI))
+    return card.svg(metrics_data) if fmt == "svg" else card.png(metrics_data)
+
+
+def save(metrics_data: dict, path: str, dpi: int | None = None) -> None:
+    """render() to `path`; the format follows the extension (.svg, otherwise PNG)."""
+    fmt = "svg" if str(path).lower().endswith(".svg") else "png"
+    data = render(metrics_data, fmt, dpi)
+    with open(path, "wb") as f:
+        f.write(data)
@@ -0,0 +1,315 @@
+"""Process pool for /api/metrics-comparison, so analysis never blocks the event loop.
+
+analyze_voices() means Whisper generation, two pyin runs per file, audiobox and
+sentence-transformers. The image path adds the metrics-card render. Run inline
+in the async handler, all of that stalled every other request for its whole
+duration. Here it runs in METRICS_WORKERS separate processes. Each one imports
+metrics.py once and, unless PRELOAD_METRICS=0, loads and warms the models of the
+METRICS_DEFAULT plugins at spawn time. The workers are CPU-only
+(CUDA_VISIBLE_DEVICES is cleared), as metrics.py already intends.
+
+A plain ProcessPoolExecutor can't stop a job that is already running, so the
+pool manages its own workers over pipes:
+
+  - at most METRICS_MAX_PENDING jobs are queued or running; more get MetricsBusy;
+  - each job has a METRICS_TIMEOUT_S deadline, covering queue wait plus run;
+  - a job whose client disconnected, or that ran out of time, is stopped by
+    terminating its worker. A fresh worker is spawned in its place.
+
+Env:
+  METRICS_WORKERS       worker processes (default 1; each holds its own copy of the models)
+  METRICS_MAX_PENDING   jobs queued or running before new ones are refused (default 4)
+  METRICS_TIMEOUT_S     per-request deadline in seconds (default 180)
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsError(RuntimeError):
+    pass
+
+
+class MetricsBusy(MetricsError):
+    pass
+
+
+class MetricsTimeout(MetricsError):
+    pass
+
+
+class MetricsCancelled(MetricsError):
+    pass
+
+
+# -- worker process side --
+def _warm(metrics) -> None:
+    import metrics_card
+
+    metrics.warm()   # the METRICS_DEFAULT plugins; others load on their first request
+    metrics_card._card(metrics_card.CARD_DPI)   # draws the card's static chrome
+
+
+def _run_job(metrics, source_path: str, target_path: str, plot_path: str | None,
+             pitch_backend: str | None = None, plot_dpi: int | None = None,
+             metric_names: list[str] | None = None):
+    results = metrics.analyze_voices(source_path, target_path, pitch_backend=pitch_backend,
+                                     metrics=metric_names)
+    plotted = False
+    if plot_path and results["aesthetics"]["response_a"] and results["aesthetics"]["response_b"]:
+        metrics.create_comprehensive_metrics_plot(results, save_path=plot_path, dpi=plot_dpi)
+        plotted = True
+    return results, plotted
+
+
+def _worker_main(conn, preload: bool) -> None:
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""   # before torch is imported in this process
+    os.environ["WHISPER_DEVICE"] = "cpu"       # asr.py: int8 faster-whisper on CPU
+    t0 = time.perf_counter()
+    try:
+        import metrics
+
+        if preload:
+            _warm(metrics)
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", time.perf_counter() - t0))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        try:
+            conn.send(("result", True, _run_job(metrics, *job)))
+        except Exception as e:
+            conn.send(("result", False, f"{type(e).__name__}: {e}"))
+
+
+# -- parent side --
+class _Worker:
+    def __init__(self, ctx, preload: bool, n: int):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child, preload),
+                                name=f"metrics-worker-{n}", daemon=True)
+        self.proc.start()
+        child.close()
+        self.n = n
+        self.ready = False
+        self.retired = False
+        self.load_s: float | None = None
+        self.future: asyncio.Future | None = None
+        self.jobs = 0
+
+
+class MetricsPool:
+    def __init__(self, workers: int | None = None, max_pending: int | None = None,
+                 timeout_s: float | None = None, preload: bool | None = None):
+        self.workers = workers or int(os.environ.get("METRICS_WORKERS", "1"))
+        self.max_pending = max_pending or int(os.environ.get("METRICS_MAX_PENDING", "4"))
+        self.timeout_s = timeout_s or float(os.environ.get("METRICS_TIMEOUT_S", "180"))
+        if preload is None:
+            preload = os.environ.get("PRELOAD_METRICS", "1") not in ("0", "false")
+        self.preload = preload
+        self._ctx = multiprocessing.get_context("spawn")   # torch + fork don't mix
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._idle: asyncio.Queue[_Worker] | None = None
+        self._live: list[_Worker] = []
+        self._spawned = 0
+        self._pending = 0
+        self._closing = False
+        self._initial_ready = threading.Event()
+        self._settled = 0   # initial workers that became ready or failed
+        self.error: str | None = None
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.respawns = 0
+
+    # -- lifecycle --
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._idle = asyncio.Queue()
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self) -> None:
+        w = _Worker(self._ctx, self.preload, self._spawned)
+        self._spawned += 1
+        self._live.append(w)
+        self._loop.add_reader(w.conn.fileno(), self._on_message, w)
+
+    def wait_ready(self, timeout: float = 1800) -> dict:
+        """Block (on a preload thread) until the first workers have loaded their models."""
+        if not self._initial_ready.wait(timeout):
+            raise TimeoutError(f"metrics workers not ready after {timeout:.0f}s")
+        if self.error and not any(w.ready for w in self._live):
+            raise MetricsError(self.error)
+        return self.stats()
+
+    async def close(self) -> None:
+        self._closing = True
+        for w in list(self._live):
+            if w.ready and w.future is None:
+                try:
+                    w.conn.send(None)
+                except OSError:
+                    pass
+            self._retire(w)
+
+    def _retire(self, w: _Worker) -> None:
+        if w.retired:
+            return
+        w.retired = True
+        if w in self._live:
+            self._live.remove(w)
+        try:
+            self._loop.remove_reader(w.conn.fileno())
+        except (OSError, ValueError):
+            pass
+        w.conn.close()
+        if w.proc.is_alive():
+            w.proc.terminate()
+        # Reap off the loop; terminate() makes this quick.
+        try:
+            self._loop.run_in_executor(None, w.proc.join, 5)
+        except RuntimeError:   # loop shutting down
+            pass
+        if w.future is not None and not w.future.done():
+            w.future.set_exception(MetricsError("metrics worker exited"))
+        w.future = None
+
+    def _replace(self, w: _Worker) -> None:
+        self._retire(w)
+        if not self._closing:
+            self.respawns += 1
+            self._spawn()
+
+    def _on_message(self, w: _Worker) -> None:
+        try:
+            msg = w.conn.recv()
+        except (EOFError, OSError):
+            logger.warning(f"metrics worker {w.n} (pid {w.proc.pid}) exited unexpectedly")
+            if w.ready:
+                self._replace(w)
+            else:
+                self._retire(w)
+                self._init_failed(w, "exited during model load")
+            return
+        kind = msg[0]
+        if kind == "ready":
+            w.ready = True
+            w.load_s = msg[1]
+            logger.info(f"metrics worker {w.n} ready in {w.load_s:.1f}s")
+            self._idle.put_nowait(w)
+            self._settle()
+        elif kind == "failed":
+            self._retire(w)
+            self._init_failed(w, msg[1])
+        elif kind == "result":
+            fut, w.future = w.future, None
+            if fut is not None and not fut.done():
+                fut.set_result(msg[1:])
+
+    def _init_failed(self, w: _Worker, error: str) -> None:
+        # Don't respawn a worker that can't even load: it would fail the same way.
+        self.error = error
+        logger.error(f"metrics worker {w.n} failed to start: {error}")
+        self._settle()
+
+    def _settle(self) -> None:
+        self._settled += 1
+        if self._settled >= self.workers:
+            self._initial_ready.set()
+
+    # -- jobs --
+    async def _wait(self, aw: Awaitable, deadline: float,
+                    is_disconnected: Callable[[], Awaitable[bool]] | None):
+        """Await `aw`, polling the client every 0.5 s; raise on deadline or disconnect."""
+        task = asyncio.ensure_future(aw)
+        try:
+            while True:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    raise MetricsTimeout(f"metrics analysis exceeded {self.timeout_s:g}s")
+                done, _ = await asyncio.wait({task}, timeout=min(0.5, remaining))
+                if done:
+                    return task.result()
+                if is_disconnected is not None and await is_disconnected():
+                    raise MetricsCancelled("client disconnected")
+        except BaseException:
+            if not task.done():
+                task.cancel()
+            elif (not task.cancelled() and task.exception() is None
+                  and isinstance(task.result(), _Worker)):
+                self._idle.put_nowait(task.result())   # got a worker just as we gave up
+            raise
+
+    async def run(self, source_path: str, target_path: str, plot_path: str | None = None,
+                  is_disconnected: Callable[[], Awaitable[bool]] | None = None,
+                  pitch_backend: str | None = None, plot_dpi: int | None = None,
+                  metric_names: list[str] | None = None):
+        """analyze_voices (+ the card when plot_path is given: .png or .svg) in a worker
+        -> (results, plotted). metric_names picks the metric plugins (default METRICS_DEFAULT)."""
+        if self._idle is None:
+            raise MetricsError("metrics pool not started")
+        if not self._live:
+            raise MetricsError(self.error or "no metrics workers")
+        if self._pending >= self.max_pending:
+            raise MetricsBusy(f"{self._pending} metrics jobs already pending")
+        self._pending += 1
+        deadline = self._loop.time() + self.timeout_s
+        w = None
+        try:
+            while True:
+                w = await self._wait(self._idle.get(), deadline, is_disconnected)
+                if not w.retired:
+                    break
+            w.future = self._loop.create_future()
+            w.jobs += 1
+            w.conn.send((source_path, target_path, plot_path, pitch_backend, plot_dpi, metric_names))
+            ok, payload = await self._wait(w.future, deadline, is_disconnected)
+            if not ok:
+                self.failed += 1
+                raise MetricsError(payload)
+            self.completed += 1
+            return payload
+        except (MetricsTimeout, MetricsCancelled, asyncio.CancelledError) as e:
+            if isinstance(e, MetricsTimeout):
+                self.timeouts += 1
+            else:
+                self.cancelled += 1
+            if w is not None and w.future is not None:
+                # The job is still running; the only way to stop it is to stop the process.
+                logger.warning(f"metrics worker {w.n}: {type(e).__name__}; restarting it")
+                self._replace(w)
+                w = None
+            raise
+        finally:
+            self._pending -= 1
+            if w is not None and not w.retired and w.future is None:
+                self._idle.put_nowait(w)
+
+    def stats(self) -> dict:
+        return {
+            "workers": [{"n": w.n, "pid": w.proc.pid, "ready": w.ready, "busy": w.future is not None,
+                         "jobs": w.jobs, "load_s": round(w.load_s, 1) if w.load_s else None}
+                        for w in self._live],
+            "pending": self._pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "respawns": self.respawns,
+            "error": self.error,
+        }
@@ -0,0 +1,91 @@
+"""Pitch (F0) tracking backends for the metrics.
+
+calculate_pitch_stats used librosa.pyin on native-rate audio. pyin's Viterbi
+decoding over a pitch-by-voicing HMM is the slowest step of the metrics on CPU,
+and it gets worse on 44.1/48 kHz recordings, which pyin frames at full rate.
+There are now two backends:
+
+  pyin   librosa.pyin at native rate. The accurate mode, and the default.
+  yin    YIN (de Cheveigné & Kawahara, 2002), fully vectorised in NumPy. It
+         first resamples to 16 kHz, which is plenty for a 65-400 Hz range. All
+         frames go through one batched FFT for the difference function, then
+         the cumulative-mean normalisation, the absolute-threshold search and
+         the parabolic refinement, each as a single array operation. No
+         per-frame Python loop and no HMM. Frames with no dip below the
+         threshold are unvoiced.
+
+Both return (f0, voiced) like librosa.pyin: f0 in Hz with NaN where unvoiced.
+Pick a backend per call (?pitch_backend= on /api/metrics-comparison) or set
+PITCH_BACKEND. bench_pitch.py compares the two on recordings/.
+
+Env:
+  PITCH_BACKEND   pyin (default) | yin
+"""
+
+import math
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# The YIN core is shared with the proxies' live prosody (services/common/prosody.py).
+COMMON_DIR = str(Path(__file__).resolve().parents[1] / "common")
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
+
+from prosody import yin_frames, yin_lags  # noqa: E402
+
+PITCH_BACKENDS = ("pyin", "yin")
+DEFAULT_BACKEND = os.environ.get("PITCH_BACKEND", "pyin").lower()
+
+FMIN = 65.0
+FMAX = 400.0
+
+YIN_SR = 16000
+YIN_HOP = 160          # 10 ms, close to pyin's default 512-sample hop at 48 kHz
+YIN_THRESHOLD = 0.15
+YIN_SILENCE_DB = -50.0  # frames this far below the loudest frame are unvoiced
+
+
+def yin(audio: np.ndarray, sr: int, fmin: float = FMIN, fmax: float = FMAX,
+        threshold: float = YIN_THRESHOLD) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorised YIN over the whole signal -> (f0 with NaN when unvoiced, voiced)."""
+    from scipy.signal import resample_poly
+
+    audio = np.asarray(audio, dtype=np.float64)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=-1)
+    if sr != YIN_SR:
+        g = math.gcd(int(sr), YIN_SR)
+        audio = resample_poly(audio, YIN_SR // g, int(sr) // g)
+
+    _, _, frame = yin_lags(YIN_SR, fmin, fmax)
+    y = np.pad(audio, frame // 2)
+    if len(y) < frame:
+        y = np.pad(y, (0, frame - len(y)))
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame)[::YIN_HOP]
+    f0, voiced, power = yin_frames(frames, YIN_SR, fmin, fmax, threshold)
+
+    # Offline, silence is relative to the loudest frame of the file.
+    level = 10.0 * np.log10(power + 1e-12)
+    voiced &= level > level.max() + YIN_SILENCE_DB
+    return np.where(voiced, f0, np.nan), voiced
+
+
+def pyin(audio: np.ndarray, sr: int, fmin: float = FMIN,
+         fmax: float = FMAX) -> tuple[np.ndarray, np.ndarray]:
+    import librosa
+
+    f0, voiced, _ = librosa.pyin(audio, sr=sr, fmin=fmin, fmax=fmax)
+    return f0, voiced
+
+
+def track(audio: np.ndarray, sr: int, backend: str | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """(f0, voiced) with the named backend (default PITCH_BACKEND)."""
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend == "yin":
+        return yin(audio, sr)
+    if backend == "pyin":
+        return pyin(audio, sr)
+    raise ValueError(f"Unknown pitch backend {backend!r} (expected one of {', '.join(PITCH_BACKENDS)})")
@@ -0,0 +1,278 @@
+"""Persistent store of /api/metrics-comparison results, with grouped aggregates.
+
+Every metrics comparison used to be returned once and thrown away, so bias
+analysis across sessions (per target voice, speech model, VC engine) meant
+collecting results in the browser. Here each result is kept in SQLite:
+
+  - one row per response (side "a" = original speaker, "b" = voice-converted),
+    with the comparison's dimensions (voice, model, vc_engine, session_id)
+    denormalised onto it. The pair's semantic similarity is stored on the "a"
+    row only ("b" has NULL), so it counts once per comparison in any group;
+  - indexes on (voice, model, vc_engine), model, vc_engine and created_at, so
+    grouped and filtered queries don't scan the table;
+  - add() only enqueues. A writer thread inserts in batches of up to
+    RESULTS_BATCH rows, or whatever arrived within RESULTS_FLUSH_S, in one
+    transaction each. The request path never waits on disk;
+  - aggregate() runs GROUP BY inside SQLite on its own connection (WAL mode,
+    so reads don't block the writer) and returns count, mean and standard
+    deviation per group. Sentiment is stored as 1/0 for POSITIVE/NEGATIVE, so
+    its mean is the share of positive responses. Mock aesthetics (audiobox not
+    installed) are stored as NULL.
+
+Results queued but not yet flushed are not visible to aggregate() yet.
+
+Env:
+  RESULTS_DB        SQLite path; empty disables the store (default <repo>/results/metrics.sqlite3)
+  RESULTS_BATCH     rows per insert transaction (default 256)
+  RESULTS_FLUSH_S   longest a queued result waits before it is written (default 2)
+"""
+
+import json
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = Path(__file__).resolve().parents[2] / "results" / "metrics.sqlite3"
+RESULTS_DB = os.environ.get("RESULTS_DB", str(DEFAULT_DB))
+RESULTS_BATCH = int(os.environ.get("RESULTS_BATCH", "256"))
+RESULTS_FLUSH_S = float(os.environ.get("RESULTS_FLUSH_S", "2"))
+
+DIMENSIONS = ("voice", "model", "vc_engine", "side", "pitch_backend")
+METRICS = ("sentiment", "similarity", "speech_rate", "mean_pitch", "std_pitch", "voiced_ratio", "duration",
+           "production_quality", "content_usefulness", "content_enjoyment", "production_complexity")
+SIDES = {"a": "response_a", "b": "response_b"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_results (
+    id INTEGER PRIMARY KEY,
+    comparison_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    session_id TEXT,
+    voice TEXT,
+    model TEXT,
+    vc_engine TEXT,
+    pitch_backend TEXT,
+    side TEXT NOT NULL,
+    transcript TEXT,
+    sentiment_label TEXT,
+    sentiment REAL,
+    similarity REAL,
+    speech_rate REAL,
+    mean_pitch REAL,
+    std_pitch REAL,
+    voiced_ratio REAL,
+    duration REAL,
+    production_quality REAL,
+    content_usefulness REAL,
+    content_enjoyment REAL,
+    production_complexity REAL
+);
+CREATE INDEX IF NOT EXISTS idx_results_dims ON metric_results (voice, model, vc_engine, side);
+CREATE INDEX IF NOT EXISTS idx_results_model ON metric_results (model, side);
+CREATE INDEX IF NOT EXISTS idx_results_engine ON metric_results (vc_engine, side);
+CREATE INDEX IF NOT EXISTS idx_results_created ON metric_results (created_at);
+CREATE INDEX IF NOT EXISTS idx_results_comparison ON metric_results (comparison_id);
+"""
+_COLUMNS = ("comparison_id", "created_at", "session_id", "voice", "model", "vc_engine", "pitch_backend",
+            "side", "transcript", "sentiment_label", *METRICS)
+_INSERT = f"INSERT INTO metric_results ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+
+def _number(value) -> float | None:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _sentiment(label) -> float | None:
+    if not isinstance(label, str):
+        return None
+    return {"POSITIVE": 1.0, "NEGATIVE": 0.0}.get(label.upper())
+
+
+def rows_for(comparison_id: str, results: dict, tags: dict, created_at: float | None = None) -> list[tuple]:
+    """One insert row per response of an analyze_voices() result."""
+    created_at = time.time() if created_at is None else created_at
+    similarity = _number((results.get("comparison") or {}).get("semantic_similarity"))
+    # Placeholder scores (audiobox missing) would skew every aggregate; store NULL.
+    mock = bool(results.get("aesthetics_mock"))
+    rows = []
+    for side, key in SIDES.items():
+        resp = results.get(key) or {}
+        aes = {} if mock else (results.get("aesthetics") or {}).get(key) or {}
+        row = {
+            "comparison_id": comparison_id,
+            "created_at": created_at,
+            **{d: tags.get(d) or None for d in ("session_id", "voice", "model", "vc_engine", "pitch_backend")},
+            "side": side,
+            "transcript": resp.get("transcript"),
+            "sentiment_label": resp.get("sentiment"),
+            "sentiment": _sentiment(resp.get("sentiment")),
+            "similarity": similarity if side == "a" else None,   # once per pair
+            **{k: _number(resp.get(k)) for k in ("speech_rate", "mean_pitch", "std_pitch",
+                                                 "voiced_ratio", "duration")},
+            **{k: _number(aes.get(k)) for k in ("production_quality", "content_usefulness",
+                                                "content_enjoyment", "production_complexity")},
+        }
+        rows.append(tuple(row[c] for c in _COLUMNS))
+    return rows
+
+
+class ResultsStore:
+    def __init__(self, path: str | Path, batch: int = RESULTS_BATCH, flush_s: float = RESULTS_FLUSH_S):
+        self.path = Path(path)
+        self.batch = max(1, batch)
+        self.flush_s = flush_s
+        self._q: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._local = threading.local()
+        self.written = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Metric columns added since the table was created (e.g. voiced_ratio).
+            have = {row[1] for row in conn.execute("PRAGMA table_info(metric_results)")}
+            for m in METRICS:
+                if m not in have:
+                    conn.execute(f"ALTER TABLE metric_results ADD COLUMN {m} REAL")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        # One read connection per thread (aggregate() runs in the web server's threadpool).
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    # -- writes --
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="results-store", daemon=True)
+            self._thread.start()
+
+    def add(self, comparison_id: str, results: dict, tags: dict) -> None:
+        """Queue a comparison for the writer thread; returns immediately."""
+        self._q.put(rows_for(comparison_id, results, tags))
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush whatever is queued and stop the writer."""
+        if self._thread is not None:
+            self._q.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _writer(self) -> None:
+        conn = self._connect()
+        stop = False
+        while not stop:
+            item = self._q.get()
+            if item is None:
+                break
+            rows = list(item)
+            deadline = time.monotonic() + self.flush_s
+            while len(rows) < self.batch:
+                try:
+                    item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                rows.extend(item)
+            try:
+                with conn:
+                    conn.executemany(_INSERT, rows)
+                self.written += len(rows)
+            except sqlite3.Error as e:
+                logger.error(f"results store: dropped {len(rows)} rows: {e}")
+        conn.close()
+
+    # -- reads --
+    def aggregate(self, group_by: list[str], filters: dict | None = None,
+                  since: float | None = None, until: float | None = None) -> list[dict]:
+        """Count, mean and std of every metric per group, computed in SQLite."""
+        for d in group_by:
+            if d not in DIMENSIONS:
+                raise ValueError(f"Unknown group_by {d!r} (expected any of {', '.join(DIMENSIONS)})")
+        where, params = [], []
+        for d, value in (filters or {}).items():
+            if d not in DIMENSIONS:
+                raise ValueError(f"Unknown filter {d!r} (expected any of {', '.join(DIMENSIONS)})")
+            where.append(f"{d} = ?")
+            params.append(value)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+
+        # SQLite has no STDDEV; std comes from AVG(x) and AVG(x*x).
+        select = [*group_by, "COUNT(DISTINCT comparison_id) AS comparisons", "COUNT(*) AS responses"]
+        for m in METRICS:
+            select += [f"COUNT({m}) AS {m}__n", f"AVG({m}) AS {m}__mean", f"AVG({m} * {m}) AS {m}__sq"]
+        sql = f"SELECT {', '.join(select)} FROM metric_results"
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+
+        groups = []
+        for row in self._reader().execute(sql, params):
+            if not row["responses"]:
+                continue
+            out = {d: row[d] for d in group_by}
+            out["comparisons"] = row["comparisons"]
+            out["responses"] = row["responses"]
+            for m in METRICS:
+                n, mean, sq = row[f"{m}__n"], row[f"{m}__mean"], row[f"{m}__sq"]
+                out[m] = {
+                    "n": n,
+                    "mean": mean,
+                    "std": math.sqrt(max(sq - mean * mean, 0.0)) if n else None,
+                }
+            groups.append(out)
+        return groups
+
+    def stats(self) -> dict:
+        return {"path": str(self.path), "queued": self._q.qsize(), "written": self.written}
+
+
+def open_store() -> ResultsStore | None:
+    """The store at RESULTS_DB, or None when disabled or unavailable."""
+    if not RESULTS_DB:
+        return None
+    try:
+        return ResultsStore(RESULTS_DB)
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"results store disabled: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Grouped metrics from the results store.")
+    parser.add_argument("--db", default=RESULTS_DB)
+    parser.add_argument("--group-by", default="voice,side")
+    args = parser.parse_args()
+    store = ResultsStore(args.db)
+    print(json.dumps(store.aggregate([d for d in args.group_by.split(",") if d]), indent=2))
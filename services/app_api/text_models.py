@@ -0,0 +1,293 @@
+"""ONNX Runtime backends for the metrics text models (sentiment + sentence embeddings).
+
+metrics.py runs the DistilBERT SST-2 sentiment pipeline and all-MiniLM-L6-v2
+(sentence-transformers) as fp32 PyTorch on CPU. METRICS_TEXT_BACKEND can swap
+both for ONNX Runtime:
+
+  torch       the PyTorch models (default)
+  onnx        fp32 ONNX graphs under ONNX Runtime
+  onnx-int8   the same graphs with int8 dynamic quantisation (weights stored as
+              int8, activations quantised at run time). This gives the smallest
+              RSS and the fastest calls on CPU.
+
+On first use each model is exported with torch.onnx.export (and quantised, for
+onnx-int8) into METRICS_ONNX_DIR. The tokenizer and a meta.json go alongside it.
+Later processes, such as every metrics worker, load only the tokenizer and an
+InferenceSession, with no torch model at all. Each export is checked against
+the PyTorch outputs on a fixed set of sentences (check_parity; also run by
+`python text_models.py --check`). If an export falls outside the tolerances,
+it is recorded as failed and the PyTorch model is used instead.
+
+The wrappers copy the slice of the PyTorch API that metrics.py and
+corpus_eval.py call: `sentiment(texts)` -> [{"label", "score"}] like a
+transformers pipeline, and `encoder.encode(...)` like SentenceTransformer.encode.
+
+Env:
+  METRICS_TEXT_BACKEND   torch (default) | onnx | onnx-int8
+  METRICS_ONNX_DIR       export cache (default ~/.cache/hearmeout/onnx)
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TEXT_BACKENDS = ("torch", "onnx", "onnx-int8")
+TEXT_BACKEND = os.environ.get("METRICS_TEXT_BACKEND", "torch").lower()
+ONNX_DIR = Path(os.environ.get("METRICS_ONNX_DIR", Path.home() / ".cache" / "hearmeout" / "onnx"))
+
+SENTIMENT_MODEL = "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+SBERT_MODEL = "all-MiniLM-L6-v2"
+
+PARITY_TEXTS = [
+    "I really need to get into the server room, can you let me in?",
+    "This is the worst customer service I have ever experienced.",
+    "Thanks so much, that was incredibly helpful!",
+    "The meeting has been moved to three o'clock on Thursday.",
+    "Hmm.",
+    "",
+]
+# (max |Δ probability|, min cosine(torch, onnx)) per backend
+PARITY_TOL = {"onnx": (1e-3, 0.9999), "onnx-int8": (0.05, 0.98)}
+
+
+# -- export --
+def _model_dir(name: str, backend: str, root: Path | None = None) -> Path:
+    return (root or ONNX_DIR) / f"{name.replace('/', '__')}.{backend}"
+
+
+def _ensure_dir(path: Path) -> Path:
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _export(module, tokenizer, out: Path, backend: str) -> list[str]:
+    """torch.onnx.export `module` (first output only), then quantise for onnx-int8."""
+    import torch
+
+    sample = tokenizer(PARITY_TEXTS[:2], padding=True, return_tensors="pt")
+    names = list(sample.keys())
+
+    class _FirstOutput(torch.nn.Module):
+        def __init__(self, m):
+            super().__init__()
+            self.m = m
+
+        def forward(self, *args):
+            return self.m(**dict(zip(names, args)), return_dict=False)[0]
+
+    out.mkdir(parents=True, exist_ok=True)
+    fp32 = out / "model.fp32.onnx"
+    wrapped = _FirstOutput(module.eval())
+    args = tuple(sample[k] for k in names)
+    dyn = {k: {0: "batch", 1: "seq"} for k in names}
+    with torch.no_grad():
+        # logits are (batch, labels); hidden states are (batch, seq, hidden)
+        dyn["output"] = {0: "batch", 1: "seq"} if wrapped(*args).dim() == 3 else {0: "batch"}
+        torch.onnx.export(wrapped, args, fp32,
+                          input_names=names, output_names=["output"], dynamic_axes=dyn,
+                          opset_version=17)
+    if backend == "onnx-int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(fp32), str(out / "model.onnx"), weight_type=QuantType.QInt8)
+        fp32.unlink()
+    else:
+        fp32.rename(out / "model.onnx")
+    tokenizer.save_pretrained(out)
+    return names
+
+
+def _session(path: Path):
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    try:
+        import torch
+
+        opts.intra_op_num_threads = torch.get_num_threads()   # honours worker thread caps
+    except ImportError:
+        pass
+    return ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+
+
+# -- wrappers --
+class OnnxSentiment:
+    """transformers pipeline("sentiment-analysis") lookalike over an ONNX classifier."""
+
+    def __init__(self, path: Path):
+        from transformers import AutoTokenizer
+
+        meta = json.loads((path / "meta.json").read_text())
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.session = _session(path / "model.onnx")
+        self.inputs = meta["inputs"]
+        self.id2label = {int(k): v for k, v in meta["id2label"].items()}
+        self.max_length = meta["max_length"]
+
+    def probs(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        out = []
+        for i in range(0, len(texts), batch_size):
+            enc = self.tokenizer(texts[i:i + batch_size], padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="np")
+            logits = self.session.run(None, {k: enc[k].astype(np.int64) for k in self.inputs})[0]
+            e = np.exp(logits - logits.max(axis=1, keepdims=True))
+            out.append(e / e.sum(axis=1, keepdims=True))
+        return np.concatenate(out) if out else np.zeros((0, len(self.id2label)))
+
+    def __call__(self, texts, batch_size: int | None = None, truncation: bool = True, **_):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        p = self.probs(texts, batch_size or 32)
+        return [{"label": self.id2label[int(j)], "score": float(row[j])}
+                for row, j in zip(p, p.argmax(axis=1))]
+
+
+class OnnxSentenceEncoder:
+    """SentenceTransformer.encode lookalike: ONNX transformer + mean pooling (+ normalise)."""
+
+    def __init__(self, path: Path):
+        from transformers import AutoTokenizer
+
+        meta = json.loads((path / "meta.json").read_text())
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.session = _session(path / "model.onnx")
+        self.inputs = meta["inputs"]
+        self.max_length = meta["max_length"]
+        self.normalize = meta["normalize"]
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_tensor: bool = False,
+               normalize_embeddings: bool = False, **_):
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        out = []
+        for i in range(0, len(sentences), batch_size):
+            enc = self.tokenizer(sentences[i:i + batch_size], padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="np")
+            hidden = self.session.run(None, {k: enc[k].astype(np.int64) for k in self.inputs})[0]
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            out.append((hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        emb = np.concatenate(out).astype(np.float32) if out else np.zeros((0, 0), np.float32)
+        if self.normalize or normalize_embeddings:
+            emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+        if single:
+            emb = emb[0]
+        if convert_to_tensor:
+            import torch
+
+            return torch.from_numpy(emb)
+        return emb
+
+
+# -- parity --
+def check_parity(backend: str, torch_sentiment, torch_sbert, onnx_sentiment, onnx_sbert) -> dict:
+    """Compare ONNX against PyTorch outputs on PARITY_TEXTS."""
+    prob_tol, cos_tol = PARITY_TOL[backend]
+    ref = torch_sentiment(PARITY_TEXTS, top_k=None)
+    labels = [onnx_sentiment.id2label[j] for j in range(len(onnx_sentiment.id2label))]
+    ref_p = np.array([[next(d["score"] for d in r if d["label"] == lab) for lab in labels] for r in ref])
+    p = onnx_sentiment.probs(PARITY_TEXTS)
+    prob_diff = float(np.abs(p - ref_p).max())
+    label_match = bool((p.argmax(1) == ref_p.argmax(1)).all())
+
+    a = torch_sbert.encode(PARITY_TEXTS, normalize_embeddings=True)
+    b = onnx_sbert.encode(PARITY_TEXTS, normalize_embeddings=True)
+    min_cos = float(np.sum(np.asarray(a) * b, axis=1).min())
+    ok = label_match and prob_diff <= prob_tol and min_cos >= cos_tol
+    return {"backend": backend, "ok": ok, "label_match": label_match,
+            "max_prob_diff": round(prob_diff, 5), "min_cosine": round(min_cos, 5)}
+
+
+def _build(backend: str, override: bool = False) -> dict:
+    """Export both models for `backend` and record the parity check in their meta.json."""
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    logger.info(f"Exporting metrics text models to ONNX ({backend}) under {ONNX_DIR}")
+    # Build in a private directory and rename into place: several metrics workers may
+    # export at once, and a reader must never see a half-written model.
+    tmp = Path(tempfile.mkdtemp(prefix=".export-", dir=_ensure_dir(ONNX_DIR)))
+    try:
+        s_dir, e_dir = _model_dir(SENTIMENT_MODEL, backend, tmp), _model_dir(SBERT_MODEL, backend, tmp)
+        tok = AutoTokenizer.from_pretrained(SENTIMENT_MODEL)
+        clf = AutoModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL)
+        names = _export(clf, tok, s_dir, backend)
+        s_meta = {"inputs": names, "id2label": clf.config.id2label,
+                  "max_length": min(tok.model_max_length, 512)}
+        (s_dir / "meta.json").write_text(json.dumps(s_meta))
+
+        st = SentenceTransformer(SBERT_MODEL, device="cpu")
+        names = _export(st[0].auto_model, st.tokenizer, e_dir, backend)
+        e_meta = {"inputs": names, "max_length": st.max_seq_length,
+                  "normalize": any(isinstance(m, Normalize) for m in st)}
+        (e_dir / "meta.json").write_text(json.dumps(e_meta))
+
+        ref_clf = pipeline("sentiment-analysis", model=clf, tokenizer=tok, device=-1)
+        report = check_parity(backend, ref_clf, st, OnnxSentiment(s_dir), OnnxSentenceEncoder(e_dir))
+        for d, meta, name in ((s_dir, s_meta, SENTIMENT_MODEL), (e_dir, e_meta, SBERT_MODEL)):
+            (d / "meta.json").write_text(json.dumps({**meta, "parity": report}))
+            final = _model_dir(name, backend)
+            if final.exists() and override:
+                shutil.rmtree(final)
+            try:
+                d.rename(final)
+            except OSError:
+                pass   # another process finished first; its export is equivalent
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if report["ok"]:
+        logger.info(f"ONNX parity ({backend}): {report}")
+    else:
+        logger.warning(f"ONNX parity ({backend}) failed: {report}")
+    return report
+
+
+def load(backend: str | None = None) -> tuple[OnnxSentiment, OnnxSentenceEncoder] | None:
+    """(sentiment, encoder) for an ONNX backend, exporting on first use; None means
+    use PyTorch (backend "torch", onnxruntime missing, or a failed parity check)."""
+    backend = (backend or TEXT_BACKEND).lower()
+    if backend == "torch":
+        return None
+    if backend not in TEXT_BACKENDS:
+        raise ValueError(f"Unknown text backend {backend!r} (expected one of {', '.join(TEXT_BACKENDS)})")
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError as e:
+        logger.warning(f"onnxruntime unavailable ({e}); metrics text models stay on PyTorch")
+        return None
+    s_dir, e_dir = _model_dir(SENTIMENT_MODEL, backend), _model_dir(SBERT_MODEL, backend)
+    metas = [d / "meta.json" for d in (s_dir, e_dir)]
+    if not all(m.exists() for m in metas):
+        try:
+            _build(backend)
+        except Exception as e:
+            logger.warning(f"ONNX {backend} export failed ({type(e).__name__}: {e}); using PyTorch")
+            return None
+    parity = json.loads(metas[0].read_text())["parity"]
+    if not parity["ok"]:
+        logger.warning(f"ONNX {backend} export failed its parity check {parity}; using PyTorch "
+                       f"(delete {ONNX_DIR} to re-export)")
+        return None
+    return OnnxSentiment(s_dir), OnnxSentenceEncoder(e_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="Export the metrics text models and check parity.")
+    ap.add_argument("--backend", choices=TEXT_BACKENDS[1:], default="onnx-int8")
+    ap.add_argument("--check", action="store_true", help="re-export and print the parity report")
+    args = ap.parse_args()
+    if not args.check:
+        load(args.backend)   # exports only if nothing is cached yet
+    meta = _model_dir(SENTIMENT_MODEL, args.backend) / "meta.json"
+    report = _build(args.backend, override=True) if args.check or not meta.exists() \
+        else json.loads(meta.read_text())["parity"]
+    print(json.dumps(report, indent=2))
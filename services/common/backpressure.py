@@ -0,0 +1,210 @@
+"""Backpressure for the browser -> VC -> PersonaPlex path.
+
+Before this, mic messages piled up unbounded inside the browser WebSocket while
+inference lagged, and the low-value 0x03 echo was awaited inline with the
+latency-critical send to PersonaPlex. Now a proxy session runs:
+
+    reader  --AudioQueue (bounded, drop policy)-->  VC worker  --> PersonaPlex
+                                                        `--EchoSender (coalesce/drop)--> browser 0x03
+
+and reports its lag to the browser as 0x04 JSON frames (see ProxyStats).
+
+Env (per-session override via query params without the prefix, e.g. ?drop_policy=):
+  VC_PROXY_MAX_QUEUE_MS   audio the input queue may hold before dropping (default 1000)
+  VC_PROXY_DROP_POLICY    drop_oldest (default) | skip_to_live
+  VC_PROXY_ECHO_MAX       pending PCM 0x03 payloads before the oldest are dropped (default 64;
+                          Opus echo pages are never dropped)
+  VC_PROXY_STATS_S        0x04 stats interval in seconds, 0 disables (default 1.0)
+  VC_PROXY_PROSODY_S      0x06 live prosody interval in seconds, 0 disables (default 1.0;
+                          see common/prosody.py)
+"""
+
+import asyncio
+import collections
+import json
+import os
+import time
+
+import numpy as np
+
+TAG_STATS = b"\x04"
+DROP_POLICIES = ("drop_oldest", "skip_to_live")
+
+
+class ProxyConfig:
+    """Backpressure knobs for one proxy session (env defaults, query overrides)."""
+
+    def __init__(self, query=None):
+        query = query or {}
+
+        def _get(name, default):
+            key = name.removeprefix("VC_PROXY_").lower()
+            return query.get(key, os.environ.get(name, default))
+
+        self.max_queue_ms = float(_get("VC_PROXY_MAX_QUEUE_MS", 1000))
+        self.drop_policy = str(_get("VC_PROXY_DROP_POLICY", "drop_oldest"))
+        if self.drop_policy not in DROP_POLICIES:
+            raise ValueError(
+                f"Unsupported drop policy {self.drop_policy!r} "
+                f"(expected one of {', '.join(DROP_POLICIES)})"
+            )
+        self.echo_max = int(_get("VC_PROXY_ECHO_MAX", 64))
+        self.stats_s = float(_get("VC_PROXY_STATS_S", 1.0))
+        self.prosody_s = float(_get("VC_PROXY_PROSODY_S", 1.0))
+
+
+class AudioQueue:
+    """Bounded queue of float32 PCM chunks, bounded by total queued duration.
+
+    On overflow, `drop_oldest` discards the oldest chunks until the new one fits
+    (like MiniCPM-o's in_q); `skip_to_live` discards everything queued and keeps
+    only the newest chunk. get() drains the whole backlog in one call, so a worker
+    that fell behind catches up with one larger batch instead of N small ones.
+    """
+
+    def __init__(self, sr: int, max_ms: float, policy: str = "drop_oldest"):
+        self.sr = sr
+        self.max_samples = max(1, int(sr * max_ms / 1000))
+        self.policy = policy
+        self._q: collections.deque[np.ndarray] = collections.deque()
+        self._queued = 0
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.dropped_chunks = 0
+        self.dropped_samples = 0
+
+    @property
+    def queued_ms(self) -> float:
+        return 1000.0 * self._queued / self.sr
+
+    @property
+    def dropped_ms(self) -> float:
+        return 1000.0 * self.dropped_samples / self.sr
+
+    def _drop_left(self) -> None:
+        old = self._q.popleft()
+        self._queued -= len(old)
+        self.dropped_chunks += 1
+        self.dropped_samples += len(old)
+
+    def put_nowait(self, pcm: np.ndarray) -> None:
+        if self._closed or len(pcm) == 0:
+            return
+        if self._queued + len(pcm) > self.max_samples and self._q:
+            if self.policy == "skip_to_live":
+                while self._q:
+                    self._drop_left()
+            else:
+                while self._q and self._queued + len(pcm) > self.max_samples:
+                    self._drop_left()
+        self._q.append(pcm)
+        self._queued += len(pcm)
+        self._ready.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> np.ndarray | None:
+        """Wait for audio and return everything queued; None once closed and drained."""
+        while not self._q:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        out = self._q[0] if len(self._q) == 1 else np.concatenate(self._q)
+        self._q.clear()
+        self._queued = 0
+        return out
+
+
+class EchoSender:
+    """Low-priority sender for the 0x03 converted-voice echo.
+
+    push() never blocks the VC worker. The run() task coalesces everything pending
+    into one WebSocket message, and drops the oldest payloads if the browser link
+    can't keep up (so a slow client never stalls the PersonaPlex path).
+
+    Only raw PCM payloads may be dropped. Opus echo payloads are Ogg pages (header
+    pages first, then sequenced audio pages), so losing one breaks the browser's
+    decoder; pass droppable=False for them and they are all kept.
+    """
+
+    def __init__(self, ws, tag: bytes, max_pending: int = 64, droppable: bool = True):
+        self.ws = ws
+        self.tag = tag
+        self.max_pending = max(1, max_pending)
+        self.droppable = droppable
+        self._pending: collections.deque[bytes] = collections.deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.sent_bytes = 0
+        self.dropped = 0
+
+    def push(self, payload: bytes) -> None:
+        if self._closed:
+            return
+        if self.droppable and len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append(payload)
+        self._ready.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    async def run(self) -> None:
+        while True:
+            if not self._pending:
+                if self._closed:
+                    return
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            body = b"".join(self._pending)
+            self._pending.clear()
+            if self.ws.closed:
+                return
+            msg = self.tag + body
+            self.sent_bytes += len(msg)
+            await self.ws.send_bytes(msg)
+
+
+class ProxyStats:
+    """Per-session lag/drop counters, pushed to the browser as 0x04 UTF-8 JSON."""
+
+    def __init__(self, queue: AudioQueue, echo: EchoSender, chunk_ms: float):
+        self.queue = queue
+        self.echo = echo
+        self.chunk_ms = chunk_ms
+        self.infer_ms = 0.0
+        self.chunks = 0
+        self.started = time.monotonic()
+
+    def record_inference(self, ms: float) -> None:
+        # Exponential average so one slow chunk doesn't dominate the report.
+        self.infer_ms = ms if self.chunks == 0 else 0.8 * self.infer_ms + 0.2 * ms
+        self.chunks += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "proxy_stats",
+            "lag_ms": round(self.queue.queued_ms, 1),
+            "dropped_ms": round(self.queue.dropped_ms, 1),
+            "dropped_chunks": self.queue.dropped_chunks,
+            "echo_dropped": self.echo.dropped,
+            "infer_ms": round(self.infer_ms, 1),
+            "rtf": round(self.infer_ms / self.chunk_ms, 3) if self.chunk_ms else None,
+            "chunks": self.chunks,
+            "uptime_s": round(time.monotonic() - self.started, 1),
+        }
+
+    async def report(self, ws, interval_s: float) -> None:
+        if interval_s <= 0:
+            return
+        while not ws.closed:
+            await asyncio.sleep(interval_s)
+            if ws.closed:
+                return
+            await ws.send_bytes(TAG_STATS + json.dumps(self.snapshot()).encode("utf-8"))
@@ -0,0 +1,176 @@
+"""Pooled upstream connection from the VC chat-proxy to the speech LM on :8000.
+
+Shared by the MeanVC and X-VC servers (services/common/ is put on sys.path by each).
+Instead of a fresh aiohttp.ClientSession + TLS handshake per conversation, the
+process keeps ONE session/connector, primes it at startup and keeps a warm
+keep-alive connection in the pool, so opening /api/chat only costs the WS upgrade.
+
+The localhost hop can optionally skip TLS entirely:
+  PERSONAPLEX_PROXY_SCHEME=ws         plain ws:// (upstream must listen without SSL)
+  PERSONAPLEX_PROXY_UDS=/path.sock    Unix domain socket (implies ws)
+
+Env:
+  PERSONAPLEX_PROXY_HOST / PERSONAPLEX_PROXY_PORT   default 127.0.0.1 / 8000
+  PERSONAPLEX_PROXY_SCHEME                          wss (default) | ws
+  PERSONAPLEX_PROXY_UDS                             optional Unix socket path
+  PERSONAPLEX_PROXY_KEEPWARM_S                      re-prime interval, 0 disables (default 20)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlencode
+
+import aiohttp
+
+logger = logging.getLogger("pplx-upstream")
+
+
+class PersonaPlexUpstream:
+    """Process-wide client for the speech LM's /api/chat WebSocket."""
+
+    def __init__(
+        self,
+        host: str,
+        port: str | int,
+        scheme: str = "wss",
+        uds_path: str | None = None,
+        keepwarm_s: float = 20.0,
+    ):
+        self.host = host
+        self.port = int(port)
+        self.uds_path = uds_path or None
+        # TLS over a Unix socket buys nothing; the UDS hop is always plain.
+        self.scheme = "ws" if self.uds_path else scheme
+        self.keepwarm_s = keepwarm_s
+        self._client: aiohttp.ClientSession | None = None
+        self._keepwarm_task: asyncio.Task | None = None
+
+        # Metrics (exposed via stats()).
+        self.connects = 0
+        self.failures = 0
+        self.connect_ms_last: float | None = None
+        self.connect_ms_min: float | None = None
+        self.connect_ms_max: float | None = None
+        self._connect_ms_total = 0.0
+        self.warmup_ms: float | None = None
+        self.warmups = 0
+        self.last_warm_at: float | None = None
+
+    @classmethod
+    def from_env(cls) -> "PersonaPlexUpstream":
+        return cls(
+            host=os.environ.get("PERSONAPLEX_PROXY_HOST", "127.0.0.1"),
+            port=os.environ.get("PERSONAPLEX_PROXY_PORT", "8000"),
+            scheme=os.environ.get("PERSONAPLEX_PROXY_SCHEME", "wss"),
+            uds_path=os.environ.get("PERSONAPLEX_PROXY_UDS"),
+            keepwarm_s=float(os.environ.get("PERSONAPLEX_PROXY_KEEPWARM_S", 20)),
+        )
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.scheme}://{self.host}:{self.port}"
+
+    @property
+    def _http_url(self) -> str:
+        http = "https" if self.scheme == "wss" else "http"
+        return f"{http}://{self.host}:{self.port}/"
+
+    def _session(self) -> aiohttp.ClientSession:
+        # Created lazily so it binds to the running event loop.
+        if self._client is None or self._client.closed:
+            if self.uds_path:
+                connector = aiohttp.UnixConnector(path=self.uds_path)
+            else:
+                # The speech LM runs on the same host with a self-signed cert, so
+                # verification stays disabled (as the per-call connect did before).
+                connector = aiohttp.TCPConnector(
+                    ssl=False, limit=0, ttl_dns_cache=None,
+                    keepalive_timeout=max(self.keepwarm_s * 2, 30),
+                )
+            self._client = aiohttp.ClientSession(connector=connector)
+        return self._client
+
+    async def warmup(self) -> None:
+        """Prime the pool with one (TLS) keep-alive connection via a plain GET.
+
+        The status code is irrelevant (PersonaPlex may 404 on /); what matters is
+        that the handshake is paid here instead of on the user's first connect.
+        """
+        t0 = time.perf_counter()
+        try:
+            async with self._session().get(
+                self._http_url, timeout=aiohttp.ClientTimeout(total=10)
+            ) as r:
+                await r.read()
+        except Exception as e:
+            logger.warning(f"[upstream] warm-up failed ({e}); will connect on demand")
+            return
+        self.warmup_ms = (time.perf_counter() - t0) * 1000
+        self.warmups += 1
+        self.last_warm_at = time.time()
+        logger.info(f"[upstream] warm ({self.base_url}) in {self.warmup_ms:.1f} ms")
+
+    async def _keepwarm(self) -> None:
+        # A WS upgrade takes its connection out of the pool for good, so re-prime
+        # periodically to always have an idle one ready for the next conversation.
+        while True:
+            await asyncio.sleep(self.keepwarm_s)
+            await self.warmup()
+
+    async def start(self) -> None:
+        await self.warmup()
+        if self.keepwarm_s > 0 and self._keepwarm_task is None:
+            self._keepwarm_task = asyncio.create_task(self._keepwarm())
+
+    async def close(self) -> None:
+        if self._keepwarm_task is not None:
+            self._keepwarm_task.cancel()
+            await asyncio.gather(self._keepwarm_task, return_exceptions=True)
+            self._keepwarm_task = None
+        if self._client is not None and not self._client.closed:
+            await self._client.close()
+        self._client = None
+
+    def chat_url(self, voice_prompt: str, text_prompt: str) -> str:
+        qs = urlencode({"voice_prompt": voice_prompt, "text_prompt": text_prompt})
+        return f"{self.base_url}/api/chat?{qs}"
+
+    async def connect(
+        self, voice_prompt: str, text_prompt: str
+    ) -> tuple[aiohttp.ClientWebSocketResponse, float]:
+        """Open /api/chat on the pooled session. Returns (ws, setup time in ms)."""
+        t0 = time.perf_counter()
+        try:
+            ws = await self._session().ws_connect(
+                self.chat_url(voice_prompt, text_prompt), max_msg_size=0
+            )
+        except Exception:
+            self.failures += 1
+            raise
+        ms = (time.perf_counter() - t0) * 1000
+        self.connects += 1
+        self.connect_ms_last = ms
+        self._connect_ms_total += ms
+        self.connect_ms_min = ms if self.connect_ms_min is None else min(self.connect_ms_min, ms)
+        self.connect_ms_max = ms if self.connect_ms_max is None else max(self.connect_ms_max, ms)
+        return ws, ms
+
+    def stats(self) -> dict:
+        def _r(v):
+            return None if v is None else round(v, 2)
+
+        return {
+            "url": self.base_url,
+            "transport": "uds" if self.uds_path else self.scheme,
+            "connects": self.connects,
+            "failures": self.failures,
+            "connect_ms_last": _r(self.connect_ms_last),
+            "connect_ms_mean": _r(self._connect_ms_total / self.connects) if self.connects else None,
+            "connect_ms_min": _r(self.connect_ms_min),
+            "connect_ms_max": _r(self.connect_ms_max),
+            "warmups": self.warmups,
+            "warmup_ms_last": _r(self.warmup_ms),
+            "last_warm_age_s": _r(time.time() - self.last_warm_at) if self.last_warm_at else None,
+        }
@@ -0,0 +1,156 @@
+"""Concurrent model preloading and readiness for the backend services.
+
+Services used to load their models one after another at startup (or lazily, on
+the first request that needed them). A ModelPreloader instead:
+
+  - loads every registered model at the same time on a thread pool. Checkpoint
+    reads and TorchScript/HF deserialisation mostly release the GIL, so the
+    slowest model sets the startup time instead of the sum of all of them;
+  - runs each model's warm-up inference right after its own load, so the first
+    real request doesn't pay for lazy initialisation (allocator growth, kernel
+    selection, JIT profiling);
+  - then runs the registered steps one at a time. These are for work that needs
+    several models, or that must not overlap the others;
+  - records per-model status and timings for a /ready endpoint. /ready is
+    separate from /api/health: health says the process is up, ready says it is
+    warm, so launchers and load balancers should wait for /ready.
+
+Framework-agnostic: status() is plain JSON for aiohttp or FastAPI handlers.
+
+Env:
+  PRELOAD_WORKERS   loader threads (default: one per model)
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import time
+import traceback
+from typing import Any, Callable
+
+logger = logging.getLogger("preload")
+
+
+class _Entry:
+    def __init__(self, name: str, load: Callable[[], Any], warmup: Callable[[Any], None] | None,
+                 required: bool):
+        self.name = name
+        self.load = load
+        self.warmup = warmup
+        self.required = required
+        self.status = "pending"
+        self.load_s: float | None = None
+        self.warmup_s: float | None = None
+        self.error: str | None = None
+
+    def info(self) -> dict:
+        out = {"status": self.status, "required": self.required}
+        if self.load_s is not None:
+            out["load_s"] = round(self.load_s, 2)
+        if self.warmup_s is not None:
+            out["warmup_s"] = round(self.warmup_s, 2)
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class ModelPreloader:
+    """Registry of model loaders for one service; run() loads them concurrently."""
+
+    def __init__(self, service: str):
+        self.service = service
+        self._entries: dict[str, _Entry] = {}
+        self._steps: list[_Entry] = []
+        self.results: dict[str, Any] = {}
+        self.started: float | None = None
+        self.finished: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def add(self, name: str, load: Callable[[], Any], warmup: Callable[[Any], None] | None = None,
+            required: bool = True) -> None:
+        """Register a model. `warmup(model)` runs on the loader thread after `load()`.
+        If an optional (required=False) model fails, the service still becomes ready."""
+        self._entries[name] = _Entry(name, load, warmup, required)
+
+    def add_step(self, name: str, fn: Callable[[], None], required: bool = True) -> None:
+        """Register work that runs after all models have loaded, one step at a time."""
+        self._steps.append(_Entry(name, lambda: fn(), None, required))
+
+    @property
+    def ready(self) -> bool:
+        return self.finished is not None and not any(
+            e.required and e.status != "ready" for e in self._all()
+        )
+
+    def _all(self) -> list[_Entry]:
+        return [*self._entries.values(), *self._steps]
+
+    def _run_entry(self, e: _Entry) -> Any:
+        e.status = "loading"
+        t0 = time.perf_counter()
+        try:
+            obj = e.load()
+            e.load_s = time.perf_counter() - t0
+            if e.warmup is not None and obj is not None:
+                e.status = "warming"
+                t1 = time.perf_counter()
+                e.warmup(obj)
+                e.warmup_s = time.perf_counter() - t1
+        except Exception as exc:
+            e.status = "failed"
+            e.error = f"{type(exc).__name__}: {exc}"
+            log = logger.error if e.required else logger.warning
+            log(f"[{self.service}] {e.name} failed to load: {e.error}\n{traceback.format_exc()}")
+            if e.load_s is None:
+                e.load_s = time.perf_counter() - t0
+            return None
+        e.status = "ready"
+        logger.info(
+            f"[{self.service}] {e.name} ready (load {e.load_s:.1f}s"
+            + (f", warm-up {e.warmup_s:.1f}s)" if e.warmup_s is not None else ")")
+        )
+        return obj
+
+    async def run(self) -> dict[str, Any]:
+        """Load all models concurrently, then run the steps; returns {name: model}."""
+        loop = asyncio.get_running_loop()
+        self.started = time.perf_counter()
+        workers = int(os.environ.get("PRELOAD_WORKERS", 0)) or max(1, len(self._entries))
+        with concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="preload") as pool:
+            entries = list(self._entries.values())
+            objs = await asyncio.gather(
+                *(loop.run_in_executor(pool, self._run_entry, e) for e in entries)
+            )
+            self.results = {e.name: obj for e, obj in zip(entries, objs)}
+            if all(e.status == "ready" for e in entries if e.required):
+                for step in self._steps:
+                    await loop.run_in_executor(pool, self._run_entry, step)
+            else:
+                for step in self._steps:
+                    step.status = "skipped"
+        self.finished = time.perf_counter()
+        logger.info(
+            f"[{self.service}] preload finished in {self.finished - self.started:.1f}s "
+            f"({'ready' if self.ready else 'NOT ready'})"
+        )
+        return self.results
+
+    def start(self) -> asyncio.Task:
+        """run() in the background, so the server can listen (and answer /ready) meanwhile."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    def status(self) -> dict:
+        if self.started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "service": self.service,
+            "ready": self.ready,
+            "elapsed_s": round(elapsed, 2),
+            "models": {e.name: e.info() for e in self._entries.values()},
+            "steps": {e.name: e.info() for e in self._steps},
+        }
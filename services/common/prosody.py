@@ -0,0 +1,207 @@
+"""Live prosody statistics for a proxy session: running F0, voicing and energy.
+
+Speech rate and pitch used to be computed only after the conversation, from the
+uploaded WAVs. The chat proxies already see every mic chunk, every converted
+chunk and every PersonaPlex reply frame as they pass, so a ProsodyTracker per
+track updates the statistics as the audio goes by:
+
+  - audio is cut into 64 ms frames with a 10 ms hop, and YIN (the difference
+    function from one batched FFT per chunk, then cumulative-mean
+    normalisation, the absolute threshold and parabolic refinement) gives F0
+    for every frame;
+  - frames quieter than PROSODY_SILENCE_DB dBFS are silence. Of the rest, the
+    share YIN calls voiced is the voiced ratio;
+  - F0 (voiced frames) and frame energy in dB (non-silent frames) feed Welford
+    accumulators, giving mean and standard deviation in O(1) memory. The only
+    buffer is one frame of carry-over between chunks.
+
+ProsodyReporter streams {"mic", "vc", "reply"} snapshots to the browser as
+0x06 JSON frames every VC_PROXY_PROSODY_S. At the end of the session the final
+snapshot is sent, logged and stored in the recording's meta.json, so the
+post-conversation pitch analysis is already done.
+
+yin_frames() is also used by app-api's offline pitch backend (pitch.py).
+
+Env:
+  PROSODY_SILENCE_DB   frames below this RMS level in dBFS are silence (default -45)
+"""
+
+import asyncio
+import json
+import math
+import os
+
+import numpy as np
+
+TAG_PROSODY = b"\x06"
+
+FMIN = 65.0
+FMAX = 400.0
+YIN_THRESHOLD = 0.15
+FRAME_S = 0.064
+HOP_S = 0.010
+SILENCE_DB = float(os.environ.get("PROSODY_SILENCE_DB", "-45"))
+
+
+def yin_lags(sr: int, fmin: float = FMIN, fmax: float = FMAX) -> tuple[int, int, int]:
+    """(min_lag, max_lag, frame_length) for YIN at `sr` over [fmin, fmax]."""
+    min_lag = max(2, int(sr // fmax))
+    max_lag = int(math.ceil(sr / fmin))
+    return min_lag, max_lag, max(int(sr * FRAME_S), 2 * max_lag + 2)
+
+
+def yin_frames(frames: np.ndarray, sr: int, fmin: float = FMIN, fmax: float = FMAX,
+               threshold: float = YIN_THRESHOLD) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """YIN over a (n_frames, frame_length) array -> (f0 Hz, voiced, mean power per frame).
+
+    f0 is NaN where no lag dips below `threshold`; silence gating is the caller's.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    n, frame = frames.shape
+    min_lag, max_lag, _ = yin_lags(sr, fmin, fmax)
+    win = frame - max_lag - 1
+    n_fft = 1 << int(math.ceil(math.log2(frame + win)))
+
+    # d(τ) = Σ_j (x_j - x_{j+τ})² = e(0) + e(τ) - 2 r(τ), with the cross term r for
+    # every frame and lag from one batched FFT and the energies from a cumulative sum.
+    spec_w = np.fft.rfft(frames[:, :win], n_fft)
+    spec_f = np.fft.rfft(frames, n_fft)
+    r = np.fft.irfft(np.conj(spec_w) * spec_f, n_fft)[:, :max_lag + 2]
+    cs = np.concatenate([np.zeros((n, 1)), np.cumsum(frames ** 2, axis=1)], axis=1)
+    lags = np.arange(max_lag + 2)
+    energy = cs[:, lags + win] - cs[:, lags]
+    diff = np.maximum(energy[:, :1] + energy - 2.0 * r, 0.0)
+
+    # Cumulative mean normalised difference; d'(0) = 1.
+    cmnd = np.ones_like(diff)
+    csum = np.cumsum(diff[:, 1:], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cmnd[:, 1:] = np.where(csum > 0, diff[:, 1:] * lags[1:] / csum, 1.0)
+
+    # First lag in range that is below the threshold and a local minimum.
+    band = cmnd[:, min_lag:max_lag + 1]
+    nxt = cmnd[:, min_lag + 1:max_lag + 2]
+    prev = cmnd[:, min_lag - 1:max_lag]
+    hit = (band < threshold) & (band <= nxt) & (band <= prev)
+    voiced = hit.any(axis=1)
+    tau = np.argmax(hit, axis=1) + min_lag
+
+    # Parabolic interpolation around the chosen lag.
+    rows = np.arange(n)
+    a, b, c = cmnd[rows, tau - 1], cmnd[rows, tau], cmnd[rows, tau + 1]
+    denom = a - 2.0 * b + c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.where(np.abs(denom) > 1e-12, 0.5 * (a - c) / denom, 0.0)
+    period = tau + np.clip(shift, -1.0, 1.0)
+
+    f0 = np.where(voiced, sr / period, np.nan)
+    return f0, voiced, energy[:, 0] / win
+
+
+class RunningStats:
+    """Welford mean/variance over batches of values; O(1) memory."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        k = len(values)
+        if k == 0:
+            return
+        b_mean = float(values.mean())
+        b_m2 = float(((values - b_mean) ** 2).sum())
+        delta = b_mean - self.mean
+        total = self.n + k
+        self.mean += delta * k / total
+        self.m2 += b_m2 + delta * delta * self.n * k / total
+        self.n = total
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+
+class ProsodyTracker:
+    """Streaming prosody of one mono float32 track at a fixed sample rate."""
+
+    def __init__(self, sr: int):
+        self.sr = sr
+        _, _, self.frame = yin_lags(sr)
+        self.hop = max(1, int(sr * HOP_S))
+        self._carry = np.zeros(0, dtype=np.float32)
+        self.samples = 0
+        self.frames = 0
+        self.speech_frames = 0
+        self.voiced_frames = 0
+        self.f0 = RunningStats()
+        self.energy_db = RunningStats()
+
+    def feed(self, pcm: np.ndarray) -> None:
+        pcm = np.asarray(pcm, dtype=np.float32).reshape(-1)
+        self.samples += len(pcm)
+        buf = np.concatenate([self._carry, pcm]) if len(self._carry) else pcm
+        if len(buf) < self.frame:
+            self._carry = buf.copy()
+            return
+        frames = np.lib.stride_tricks.sliding_window_view(buf, self.frame)[::self.hop]
+        self._carry = buf[len(frames) * self.hop:].copy()
+
+        f0, voiced, power = yin_frames(frames, self.sr)
+        level = 10.0 * np.log10(power + 1e-12)
+        speech = level > SILENCE_DB
+        voiced &= speech
+        self.frames += len(frames)
+        self.speech_frames += int(speech.sum())
+        self.voiced_frames += int(voiced.sum())
+        self.f0.update(f0[voiced])
+        self.energy_db.update(level[speech])
+
+    def snapshot(self) -> dict:
+        return {
+            "seconds": round(self.samples / self.sr, 2),
+            "speech_s": round(self.speech_frames * self.hop / self.sr, 2),
+            "voiced_ratio": round(self.voiced_frames / self.speech_frames, 3) if self.speech_frames else None,
+            "f0_mean": round(self.f0.mean, 1) if self.f0.n else None,
+            "f0_std": round(self.f0.std, 1) if self.f0.n else None,
+            "energy_db_mean": round(self.energy_db.mean, 1) if self.energy_db.n else None,
+            "energy_db_std": round(self.energy_db.std, 1) if self.energy_db.n else None,
+        }
+
+
+class ProsodyReporter:
+    """One tracker per proxy track; reports them to the browser as 0x06 JSON frames."""
+
+    def __init__(self, tracks: dict[str, int]):
+        self.trackers = {name: ProsodyTracker(sr) for name, sr in tracks.items()}
+
+    def feed(self, track: str, pcm: np.ndarray) -> None:
+        self.trackers[track].feed(pcm)
+
+    def snapshot(self, final: bool = False) -> dict:
+        return {**{name: t.snapshot() for name, t in self.trackers.items()}, "final": final}
+
+    def frame(self, final: bool = False) -> bytes:
+        return TAG_PROSODY + json.dumps(self.snapshot(final)).encode("utf-8")
+
+    async def report(self, ws, interval_s: float) -> None:
+        if interval_s <= 0:
+            return
+        while not ws.closed:
+            await asyncio.sleep(interval_s)
+            if ws.closed:
+                return
+            await ws.send_bytes(self.frame())
+
+    async def finish(self, ws) -> dict:
+        """Send the final snapshot if the browser is still there; returns it either way."""
+        snap = self.snapshot(final=True)
+        if not ws.closed:
+            try:
+                await ws.send_bytes(TAG_PROSODY + json.dumps(snap).encode("utf-8"))
+            except (ConnectionResetError, RuntimeError):
+                pass
+        return snap
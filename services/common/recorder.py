@@ -0,0 +1,223 @@
+"""Server-side conversation recorder for the VC chat-proxies.
+
+Each recorded proxy session streams its tracks straight to disk instead of
+collecting arrays in memory (the old `debug_pcm` list) or leaving the browser to
+rebuild WAVs from 0x03 frames:
+
+    <VC_RECORD_DIR>/<id>/mic.wav     raw mic input, at the uplink rate
+                         vc.wav      converted voice, 16 kHz
+                         reply.wav   PersonaPlex's reply (decoded 0x01 Opus), 24 kHz
+                         meta.json   rates, durations, start/end times
+
+WAVs are written through a preallocated, memory-mapped file that grows in
+VC_RECORD_GROW_S steps; the RIFF/data sizes are fixed up and the slack trimmed
+on close, so RSS stays flat however long the conversation runs. With
+VC_RECORD_FORMAT=flac the finished WAVs are transcoded block by block (needs
+soundfile, which both VC services already depend on).
+
+Env (recording is off unless VC_RECORD_DIR is set; ?record=0 opts a session out):
+  VC_RECORD_DIR      root directory for recordings
+  VC_RECORD_FORMAT   wav (default) | flac
+  VC_RECORD_GROW_S   seconds of audio preallocated per mmap growth step (default 60)
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import re
+import struct
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+RECORD_FORMATS = ("wav", "flac")
+_ID_RE = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}$")
+_HEADER = 44
+
+# Sessions still writing, so a download that races the socket close can wait.
+_active: dict[str, "SessionRecorder"] = {}
+
+
+def wav_header(sr: int, data_bytes: int) -> bytes:
+    """44-byte header of a mono 16-bit PCM WAV holding `data_bytes` of samples."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, 1, sr, sr * 2, 2, 16,
+        b"data", data_bytes,
+    )
+
+
+class MmapWavWriter:
+    """Mono 16-bit WAV written incrementally through a growing memory map."""
+
+    def __init__(self, path: str | Path, sr: int, grow_s: float = 60.0):
+        self.path = Path(path)
+        self.sr = sr
+        self.frames = 0
+        self._grow = max(1, int(sr * grow_s)) * 2
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._size = 0
+        self._map: mmap.mmap | None = None
+        self._remap(_HEADER + self._grow)
+        # Header claims the whole preallocation until close() fixes it up.
+        self._map[:_HEADER] = wav_header(sr, self._size - _HEADER)
+
+    @property
+    def duration_s(self) -> float:
+        return self.frames / self.sr
+
+    def _remap(self, size: int) -> None:
+        if self._map is not None:
+            self._map.close()
+        os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._size = size
+
+    def write(self, pcm: np.ndarray) -> None:
+        if self._map is None or len(pcm) == 0:
+            return
+        data = (np.clip(pcm, -1.0, 1.0) * 32767.0).astype("<i2")
+        start = _HEADER + 2 * self.frames
+        end = start + data.nbytes
+        if end > self._size:
+            self._remap(max(end, self._size + self._grow))
+        self._map[start:end] = data.tobytes()
+        self.frames += len(data)
+
+    def close(self) -> None:
+        if self._map is None:
+            return
+        data_bytes = 2 * self.frames
+        self._map[:_HEADER] = wav_header(self.sr, data_bytes)
+        self._map.flush()
+        self._map.close()
+        self._map = None
+        os.ftruncate(self._fd, _HEADER + data_bytes)
+        os.close(self._fd)
+
+
+def _wav_to_flac(wav_path: Path, block_s: float = 10.0) -> Path:
+    import soundfile as sf
+
+    flac_path = wav_path.with_suffix(".flac")
+    with sf.SoundFile(wav_path) as src, sf.SoundFile(
+        flac_path, "w", samplerate=src.samplerate, channels=1, format="FLAC"
+    ) as dst:
+        for block in src.blocks(blocksize=int(src.samplerate * block_s), dtype="int16"):
+            dst.write(block)
+    wav_path.unlink()
+    return flac_path
+
+
+class SessionRecorder:
+    """One directory of per-track recordings for a proxy session."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        tracks: dict[str, int],
+        fmt: str = "wav",
+        grow_s: float = 60.0,
+        meta: dict | None = None,
+    ):
+        if fmt not in RECORD_FORMATS:
+            raise ValueError(
+                f"Unsupported recording format {fmt!r} "
+                f"(expected one of {', '.join(RECORD_FORMATS)})"
+            )
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.dir = Path(root) / self.id
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.meta = dict(meta or {})
+        self.started = time.time()
+        self._writers = {
+            name: MmapWavWriter(self.dir / f"{name}.wav", sr, grow_s)
+            for name, sr in tracks.items()
+        }
+        self._done = asyncio.Event()
+        _active[self.id] = self
+
+    @classmethod
+    def from_env(cls, query, tracks: dict[str, int], meta: dict | None = None):
+        """A recorder if VC_RECORD_DIR is set and the session didn't opt out, else None."""
+        root = os.environ.get("VC_RECORD_DIR")
+        if not root or (query or {}).get("record", "1") in ("0", "false"):
+            return None
+        return cls(
+            root,
+            tracks,
+            fmt=os.environ.get("VC_RECORD_FORMAT", "wav").lower(),
+            grow_s=float(os.environ.get("VC_RECORD_GROW_S", 60)),
+            meta=meta,
+        )
+
+    def write(self, track: str, pcm: np.ndarray) -> None:
+        self._writers[track].write(pcm)
+
+    def info(self) -> dict:
+        return {
+            "type": "recording",
+            "id": self.id,
+            "format": self.fmt,
+            # Which VC engine (meanvc | xvc) made it; they serve the same URLs.
+            "server": self.meta.get("server"),
+            "tracks": {name: w.sr for name, w in self._writers.items()},
+        }
+
+    def _finish(self) -> dict:
+        files = {}
+        for name, w in self._writers.items():
+            w.close()
+            path = w.path
+            if self.fmt == "flac" and w.frames:
+                path = _wav_to_flac(path)
+            files[name] = {"file": path.name, "sr": w.sr, "duration_s": round(w.duration_s, 3)}
+        meta = {
+            **self.meta,
+            "id": self.id,
+            "started": self.started,
+            "ended": time.time(),
+            "tracks": files,
+        }
+        (self.dir / "meta.json").write_text(json.dumps(meta, indent=2))
+        return meta
+
+    async def close(self) -> dict:
+        """Finalize every track (off the event loop) and write meta.json."""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self._finish)
+        finally:
+            self._done.set()
+            _active.pop(self.id, None)
+
+
+async def recording_meta(root: str | Path | None, rec_id: str, wait_s: float = 10.0) -> dict | None:
+    """meta.json of a finished recording; waits briefly if it is still closing."""
+    if not root or not _ID_RE.match(rec_id):
+        return None
+    active = _active.get(rec_id)
+    if active is not None:
+        try:
+            await asyncio.wait_for(active._done.wait(), wait_s)
+        except asyncio.TimeoutError:
+            return None
+    path = Path(root) / rec_id / "meta.json"
+    if not path.is_file():
+        return None
+    return json.loads(path.read_text())
+
+
+async def recording_file(root: str | Path | None, rec_id: str, name: str) -> Path | None:
+    """Path of one track file (e.g. "vc.wav"), or None if it doesn't exist."""
+    meta = await recording_meta(root, rec_id)
+    if meta is None:
+        return None
+    files = {t["file"] for t in meta["tracks"].values()} | {"meta.json"}
+    if name not in files:
+        return None
+    return Path(root) / rec_id / name
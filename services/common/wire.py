@@ -0,0 +1,88 @@
+"""Negotiated audio wire formats for the browser <-> VC-proxy channel.
+
+The browser picks formats per connection with query parameters on
+/api/meanvc/stream and /api/meanvc/chat-proxy:
+
+  codec=f32|s16|opus        mic uplink (default f32 = the original raw float32 PCM)
+  echo_codec=f32|s16|opus   converted voice sent back (0x03 on the chat-proxy,
+                            untagged on /stream); default f32
+
+  f32   raw little-endian float32 PCM at source_sr / 16 kHz     (4 B/sample)
+  s16   raw little-endian int16 PCM, same rates                  (2 B/sample)
+  opus  Ogg-Opus pages (sphn), 24 kHz (48 kHz if source_sr=48000) (~3 KB/s)
+
+For the opus echo on the chat-proxy, the proxy forwards the very pages it sends
+to PersonaPlex, so the browser hears exactly what PersonaPlex hears at no extra
+encode cost.
+"""
+
+import numpy as np
+import sphn
+
+CODECS = ("f32", "s16", "opus")
+OPUS_RATES = (24000, 48000)
+
+
+def parse_codec(value: str | None, default: str = "f32") -> str:
+    """Validate a codec query parameter; raises ValueError on unknown names."""
+    codec = (value or default).lower()
+    if codec not in CODECS:
+        raise ValueError(f"Unsupported codec {value!r} (expected one of {', '.join(CODECS)})")
+    return codec
+
+
+class UplinkDecoder:
+    """Turns incoming binary messages into float32 PCM at `self.sr`."""
+
+    def __init__(self, codec: str, source_sr: int):
+        self.codec = codec
+        self.bytes_in = 0
+        if codec == "opus":
+            # sphn only decodes to 24/48 kHz; the caller resamples from self.sr.
+            self.sr = source_sr if source_sr in OPUS_RATES else OPUS_RATES[0]
+            self._reader = sphn.OpusStreamReader(self.sr)
+        else:
+            self.sr = source_sr
+            self._reader = None
+
+    def decode(self, data: bytes) -> np.ndarray:
+        """Decode one message. Opus may legitimately return zero samples."""
+        self.bytes_in += len(data)
+        if self.codec == "f32":
+            return np.frombuffer(data, dtype="<f4")
+        if self.codec == "s16":
+            return np.frombuffer(data, dtype="<i2").astype(np.float32) * (1.0 / 32768.0)
+        self._reader.append_bytes(data)
+        return self._reader.read_pcm().astype(np.float32, copy=False).reshape(-1)
+
+
+def encode_pcm(pcm: np.ndarray, codec: str) -> bytes:
+    """Encode float32 PCM for the raw (f32/s16) downlink formats."""
+    if codec == "s16":
+        return (np.clip(pcm, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+    return np.asarray(pcm, dtype="<f4").tobytes()
+
+
+class OpusEncoder:
+    """Thin sphn wrapper that takes any PCM length and yields Ogg-Opus pages."""
+
+    FRAME = 1920  # 80 ms @ 24 kHz; sphn.append_pcm only accepts exact frame sizes
+
+    def __init__(self, sr: int = 24000):
+        self.sr = sr
+        self.frame = self.FRAME * sr // 24000
+        self._writer = sphn.OpusStreamWriter(sr)
+        self._buf = np.zeros(0, dtype=np.float32)
+
+    def encode(self, pcm: np.ndarray) -> list[bytes]:
+        self._buf = np.concatenate([self._buf, pcm.astype(np.float32, copy=False)])
+        pages: list[bytes] = []
+        while len(self._buf) >= self.frame:
+            self._writer.append_pcm(np.ascontiguousarray(self._buf[: self.frame]))
+            self._buf = self._buf[self.frame :]
+            while True:
+                enc = self._writer.read_bytes()
+                if len(enc) == 0:
+                    break
+                pages.append(enc)
+        return pages
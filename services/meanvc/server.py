@@ -5,10 +5,8 @@ import os
 import sys
 import time
 import uuid
-import wave
 from pathlib import Path
 from threading import Lock
-from urllib.parse import urlencode
 
 import aiohttp
 import librosa
@@ -25,6 +23,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger("meanvc-server")
 
+# Helpers shared with the X-VC server live in services/common/.
+COMMON_DIR = str(Path(__file__).resolve().parents[1] / "common")
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
+
+from pplx_upstream import PersonaPlexUpstream  # noqa: E402
+from resample import StreamingResampler  # noqa: E402
+from backpressure import AudioQueue, EchoSender, ProxyConfig, ProxyStats  # noqa: E402
+from wire import OpusEncoder, UplinkDecoder, encode_pcm, parse_codec  # noqa: E402
+from recorder import MmapWavWriter, SessionRecorder, recording_file, recording_meta  # noqa: E402
+from preload import ModelPreloader  # noqa: E402
+from prosody import ProsodyReporter  # noqa: E402
+
 
 # Replicate MeanVC's Mel spectrogram and fbank extractors ------------------------------------------------
 def _amp_to_db(x, min_level_db):
@@ -117,51 +128,71 @@ def extract_fbanks(
     return fbanks.unsqueeze(0)
 
 
+# Zeros appended to a stream's first chunk, whose output is dropped.
+FIRST_CHUNK_PAD = 720
+
+
 # Shared model store -------------------------------------------------------------------------------------
 class SharedModels:
+    """MeanVC's models. register() hands the loaders to a ModelPreloader
+    (common/preload.py), which loads them concurrently and warms them up."""
+
     def __init__(self, ckpt_dir: str, sv_ckpt_path: str):
         torch.set_num_threads(4)
         self.ckpt_dir = Path(ckpt_dir)
+        self.sv_ckpt_path = sv_ckpt_path
         self.device = "cpu"
         logger.info(f"MeanVC using device: {self.device}")
+        self.sv_model = None
+        self.asr = None
+        self.vc = None
+        self.vocoder = None
+        self.mel_extract = MelSpectrogramFeatures()
 
-        logger.info("Loading Speaker Verification model (wavlm_large)...")
-        sv_ckpt = sv_ckpt_path
-        if os.path.exists(sv_ckpt):
-            sv_root = os.environ.get("SPEAKER_VERIFICATION_ROOT", os.getcwd())
-            if sv_root not in sys.path:
-                sys.path.insert(0, sv_root)
-            from src.runtime.speaker_verification.verification import init_model
-
-            self.sv_model = init_model("wavlm_large", sv_ckpt)
-            self.sv_model.eval()
-            logger.info("Speaker verification model loaded")
-        else:
+    def _load_sv(self):
+        if not os.path.exists(self.sv_ckpt_path):
             logger.warning(
-                f"Speaker verification model not found at {sv_ckpt}, using fallback"
+                f"Speaker verification model not found at {self.sv_ckpt_path}, using fallback"
             )
-            self.sv_model = None
-
-        logger.info("Loading ASR model...")
-        self.asr = torch.jit.load(
-            str(self.ckpt_dir / "fastu2++.pt"), map_location="cpu"
-        )
-        self.asr.eval()
+            return None
+        sv_root = os.environ.get("SPEAKER_VERIFICATION_ROOT", os.getcwd())
+        if sv_root not in sys.path:
+            sys.path.insert(0, sv_root)
+        from src.runtime.speaker_verification.verification import init_model
+
+        self.sv_model = init_model("wavlm_large", self.sv_ckpt_path)
+        self.sv_model.eval()
+        return self.sv_model
+
+    def _load_jit(self, attr: str, filename: str):
+        module = torch.jit.load(str(self.ckpt_dir / filename), map_location="cpu")
+        module.eval()
+        setattr(self, attr, module)
+        return module
 
-        logger.info("Loading VC model...")
-        self.vc = torch.jit.load(
-            str(self.ckpt_dir / "meanvc_200ms.pt"), map_location="cpu"
-        )
-        self.vc.eval()
-
-        logger.info("Loading Vocoder...")
-        self.vocoder = torch.jit.load(
-            str(self.ckpt_dir / "vocos.pt"), map_location="cpu"
-        )
-        self.vocoder.eval()
-
-        self.mel_extract = MelSpectrogramFeatures()
-        logger.info("All models loaded")
+    @torch.no_grad()
+    def _warmup_pipeline(self):
+        # One short conversion through ASR -> VC -> vocoder, so the TorchScript
+        # profiling runs happen here rather than in the first user's stream.
+        wav = torch.from_numpy(np.random.default_rng(0).standard_normal(16000).astype(np.float32) * 1e-3)
+        wav = wav.unsqueeze(0)
+        spk_emb = self.sv_model(wav).detach() if self.sv_model is not None else torch.zeros(1, 512)
+        prompt_mel = self.mel_extract(wav).transpose(1, 2).detach()
+        session = InferenceSession(self, spk_emb, prompt_mel)
+        # Same shapes as a real stream: a first chunk with the 720-sample warm-up
+        # padding (see the /stream and chat-proxy handlers), then plain chunks.
+        session.inference_one_chunk(np.zeros(session.CHUNK + FIRST_CHUNK_PAD, dtype=np.float32))
+        for _ in range(2):
+            session.inference_one_chunk(np.zeros(session.CHUNK, dtype=np.float32))
+
+    def register(self, preloader: ModelPreloader) -> None:
+        preloader.add("speaker_verification", self._load_sv)
+        preloader.add("asr", lambda: self._load_jit("asr", "fastu2++.pt"))
+        preloader.add("vc", lambda: self._load_jit("vc", "meanvc_200ms.pt"))
+        preloader.add("vocoder", lambda: self._load_jit("vocoder", "vocos.pt"))
+        # Only a latency optimisation: if it fails, the service is still usable, so it
+        # must not keep /ready (and the ready middleware's 503s) stuck.
+        preloader.add_step("pipeline_warmup", self._warmup_pipeline, required=False)
 
 
 # Per-session inference state ---------------------------------------------------------------------------
@@ -333,6 +364,7 @@ class InferenceSession:
 targets: dict[str, tuple[torch.Tensor, torch.Tensor]] = {}
 targets_lock = Lock()
 models: SharedModels | None = None
+preloader = ModelPreloader("meanvc")
 
 
 async def handle_load_target(request: web.Request) -> web.Response:
@@ -384,19 +416,31 @@ async def handle_load_target(request: web.Request) -> web.Response:
 
 
 async def handle_stream(request: web.Request) -> web.WebSocketResponse:
-    """WebSocket /api/meanvc/stream?target_id=X - bidirectional streaming."""
+    """WebSocket /api/meanvc/stream?target_id=X - bidirectional streaming.
+
+    Wire formats are negotiated with ?codec= / ?echo_codec= (see common/wire.py).
+    """
     target_id = request.query.get("target_id", "default")
     steps = int(request.query.get("steps", 2))
     source_sr = int(request.query.get("source_sr", 16000))
-    need_resample = source_sr != 16000
-
-    if need_resample:
-        import torchaudio.functional as F
+    try:
+        codec = parse_codec(request.query.get("codec"))
+        echo_codec = parse_codec(request.query.get("echo_codec"))
+    except ValueError as e:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"error": str(e)})
+        await ws.close()
+        return ws
 
-        resampler = torchaudio.transforms.Resample(
-            orig_freq=source_sr, new_freq=16000
-        ).to("cpu")
-        logger.info(f"Resampling enabled: {source_sr}Hz -> 16000Hz")
+    uplink = UplinkDecoder(codec, source_sr)
+    # Stateful across chunks, so chunk boundaries don't click.
+    resampler = StreamingResampler(uplink.sr, 16000)
+    if not resampler.passthrough:
+        logger.info(f"Resampling enabled: {uplink.sr}Hz -> 16000Hz")
+    if echo_codec == "opus":
+        echo_resampler = StreamingResampler(16000, 24000)
+        echo_opus = OpusEncoder(24000)
 
     if target_id not in targets:
         ws = web.WebSocketResponse()
@@ -414,16 +458,18 @@ async def handle_stream(request: web.Request) -> web.WebSocketResponse:
 
     ws = web.WebSocketResponse()
     await ws.prepare(request)
-    await ws.send_json({"status": "ready", "chunk_size": session.CHUNK})
+    await ws.send_json(
+        {
+            "status": "ready",
+            "chunk_size": session.CHUNK,
+            "codec": codec,
+            "echo_codec": echo_codec,
+        }
+    )
 
     async for msg in ws:
         if msg.type == web.WSMsgType.BINARY:
-            raw = msg.data
-            incoming = np.frombuffer(raw, dtype=np.float32).copy()
-
-            if need_resample:
-                t = torch.from_numpy(incoming).unsqueeze(0)
-                incoming = resampler(t).squeeze(0).numpy()
+            incoming = resampler.process(uplink.decode(msg.data))
 
             acc_samples = np.concatenate([acc_samples, incoming])
 
@@ -433,7 +479,7 @@ async def handle_stream(request: web.Request) -> web.WebSocketResponse:
                 chunk_count += 1
 
                 if chunk_count == 1:
-                    chunk = np.concatenate([chunk, np.zeros(720, dtype=np.float32)])
+                    chunk = np.concatenate([chunk, np.zeros(FIRST_CHUNK_PAD, dtype=np.float32)])
                     vc_wav = session.inference_one_chunk(chunk)
                     continue  # skip first chunk output (warmup padding)
 
@@ -443,7 +489,11 @@ async def handle_stream(request: web.Request) -> web.WebSocketResponse:
 
                 try:
                     vc_wav = session.inference_one_chunk(chunk)
-                    await ws.send_bytes(vc_wav.tobytes())
+                    if echo_codec == "opus":
+                        for page in echo_opus.encode(echo_resampler.process(vc_wav)):
+                            await ws.send_bytes(page)
+                    else:
+                        await ws.send_bytes(encode_pcm(vc_wav, echo_codec))
                 except Exception as e:
                     logger.error(f"Inference error on chunk {chunk_count}: {e}")
 
@@ -457,7 +507,10 @@ async def handle_stream(request: web.Request) -> web.WebSocketResponse:
         elif msg.type in (web.WSMsgType.CLOSE, web.WSMsgType.ERROR):
             break
 
-    logger.info(f"Stream closed after {chunk_count} chunks")
+    logger.info(
+        f"Stream closed after {chunk_count} chunks "
+        f"({codec} uplink, {uplink.bytes_in / 1024:.0f} KiB in)"
+    )
     return ws
 
 
@@ -465,22 +518,13 @@ async def handle_stream(request: web.Request) -> web.WebSocketResponse:
 # plus 0x03 for the converted user voice that the browser keeps for downloads).
 TAG_AUDIO = b"\x01"
 TAG_VC_USER = b"\x03"
+# (0x04 = proxy lag/drop stats as UTF-8 JSON, common/backpressure.py.)
+TAG_RECORDING = b"\x05"  # server-side recording id + tracks, UTF-8 JSON (common/recorder.py)
+# (0x06 = live prosody of mic / converted voice / reply, UTF-8 JSON, common/prosody.py.)
 
-# Where PersonaPlex listens. It runs on the same host as MeanVC with self-signed
-# SSL, so the proxy connects over localhost with cert verification disabled.
-PERSONAPLEX_HOST = os.environ.get("PERSONAPLEX_PROXY_HOST", "127.0.0.1")
-PERSONAPLEX_PORT = os.environ.get("PERSONAPLEX_PROXY_PORT", "8000")
-
-
-def _save_wav(path: str, pcm: np.ndarray, sr: int) -> None:
-    """Write mono float32 PCM (range -1..1) to a 16-bit WAV file."""
-    pcm = np.clip(pcm, -1.0, 1.0)
-    ints = (pcm * 32767.0).astype("<i2")
-    with wave.open(path, "wb") as w:
-        w.setnchannels(1)
-        w.setsampwidth(2)
-        w.setframerate(sr)
-        w.writeframes(ints.tobytes())
+# Where PersonaPlex listens. It runs on the same host as MeanVC, so every proxy
+# session shares one pooled, pre-warmed client (see common/pplx_upstream.py).
+upstream = PersonaPlexUpstream.from_env()
 
 
 async def handle_chat_proxy(request: web.Request) -> web.WebSocketResponse:
@@ -493,25 +537,39 @@ async def handle_chat_proxy(request: web.Request) -> web.WebSocketResponse:
     audio, 0x02 transcript) are relayed back verbatim. The converted user PCM is
     also sent back tagged 0x03 so the browser can still assemble the user/merged
     WAV downloads (this is off the latency-critical path).
+
+    ?codec= picks the mic uplink format and ?echo_codec= the 0x03 format
+    (f32 | s16 | opus, see common/wire.py); both default to raw float32.
+    Mic audio is bounded by a drop policy and the session's lag is reported as
+    0x04 JSON frames (see common/backpressure.py). With VC_RECORD_DIR set, the
+    mic, converted voice and PersonaPlex reply are also recorded to disk and the
+    recording id is announced as a 0x05 JSON frame (see common/recorder.py).
+    Running pitch/voicing/energy statistics of the mic, converted voice and reply
+    are streamed as 0x06 JSON frames, with a final one at the end of the session
+    (see common/prosody.py).
     """
     target_id = request.query.get("target_id", "default")
     steps = int(request.query.get("steps", 2))
     source_sr = int(request.query.get("source_sr", 16000))
     voice_prompt = request.query.get("voice_prompt", "")
     text_prompt = request.query.get("text_prompt", "")
-    need_resample = source_sr != 16000
-
-    if need_resample:
-        import torchaudio
-
-        resampler = torchaudio.transforms.Resample(
-            orig_freq=source_sr, new_freq=16000
-        ).to("cpu")
-        logger.info(f"[proxy] Resampling enabled: {source_sr}Hz -> 16000Hz")
 
     browser_ws = web.WebSocketResponse()
     await browser_ws.prepare(request)
 
+    try:
+        codec = parse_codec(request.query.get("codec"))
+        echo_codec = parse_codec(request.query.get("echo_codec"))
+        flow = ProxyConfig(request.query)
+    except ValueError as e:
+        await browser_ws.send_json({"error": str(e)})
+        await browser_ws.close()
+        return browser_ws
+    uplink = UplinkDecoder(codec, source_sr)
+    resampler = StreamingResampler(uplink.sr, 16000)
+    if not resampler.passthrough:
+        logger.info(f"[proxy] Resampling enabled: {uplink.sr}Hz -> 16000Hz")
+
     if target_id not in targets:
         await browser_ws.send_json({"error": f"Unknown target_id: {target_id}"})
         await browser_ws.close()
@@ -524,148 +582,234 @@ async def handle_chat_proxy(request: web.Request) -> web.WebSocketResponse:
     # MeanVC outputs 16 kHz, but sphn's Opus encoder only accepts 24 kHz / 48 kHz
     # (PersonaPlex itself uses 24 kHz = its mimi rate). So encode at 24 kHz and
     # resample the converted audio up before feeding the encoder.
-    import torchaudio
-
-    opus_writer = sphn.OpusStreamWriter(24000)
-    out_resampler = torchaudio.transforms.Resample(16000, 24000).to("cpu")
+    opus_enc = OpusEncoder(24000)
+    out_resampler = StreamingResampler(16000, 24000)
     loop = asyncio.get_event_loop()
 
+    logger.info(
+        f"[proxy] Connecting to PersonaPlex: {upstream.chat_url(voice_prompt, text_prompt)}"
+    )
+    try:
+        pplx_ws, connect_ms = await upstream.connect(voice_prompt, text_prompt)
+    except Exception as e:
+        logger.error(f"[proxy] Failed to connect to PersonaPlex: {e}")
+        await browser_ws.send_json({"error": f"PersonaPlex unavailable: {e}"})
+        await browser_ws.close()
+        return browser_ws
+    logger.info(f"[proxy] PersonaPlex connected in {connect_ms:.1f} ms")
+
     # Optional debug capture: decode our own Opus stream with the SAME decoder
     # PersonaPlex uses, so the saved WAV is exactly what PersonaPlex hears
     # (post-Opus round trip). Enabled by setting MEANVC_PROXY_DEBUG_DIR.
     debug_dir = os.environ.get("MEANVC_PROXY_DEBUG_DIR")
     opus_reader_dbg = sphn.OpusStreamReader(24000) if debug_dir else None
-    debug_pcm: list[np.ndarray] = []
-
-    qs = urlencode({"voice_prompt": voice_prompt, "text_prompt": text_prompt})
-    pplx_url = f"wss://{PERSONAPLEX_HOST}:{PERSONAPLEX_PORT}/api/chat?{qs}"
-    logger.info(f"[proxy] Connecting to PersonaPlex: {pplx_url}")
+    debug_wav = None
+    # Opened only once connected, so a failed connect has nothing to close.
+    if debug_dir:
+        os.makedirs(debug_dir, exist_ok=True)
+        debug_wav = MmapWavWriter(
+            os.path.join(debug_dir, f"pplx_input_{target_id}_{int(time.time())}.wav"), 24000
+        )
 
-    client = aiohttp.ClientSession()
     try:
-        pplx_ws = await client.ws_connect(pplx_url, ssl=False, max_msg_size=0)
-    except Exception as e:
-        logger.error(f"[proxy] Failed to connect to PersonaPlex: {e}")
-        await browser_ws.send_json({"error": f"PersonaPlex unavailable: {e}"})
-        await browser_ws.close()
-        await client.close()
-        return browser_ws
+        rec = SessionRecorder.from_env(
+            request.query,
+            {"mic": uplink.sr, "vc": 16000, "reply": 24000},
+            meta={"server": "meanvc", "target_id": target_id, "steps": steps,
+                  "voice_prompt": voice_prompt, "text_prompt": text_prompt},
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"[proxy] Recording disabled: {e}")
+        rec = None
+    if rec is not None:
+        await browser_ws.send_bytes(TAG_RECORDING + json.dumps(rec.info()).encode("utf-8"))
+    prosody = (ProsodyReporter({"mic": 16000, "vc": 16000, "reply": 24000})
+               if flow.prosody_s > 0 else None)
+    reply_reader = sphn.OpusStreamReader(24000) if rec is not None or prosody is not None else None
 
     chunk_count = 0
     acc_samples = np.array([], dtype=np.float32)
-    # sphn.append_pcm only accepts exact Opus frame sizes; 1920 @ 24 kHz is what
-    # PersonaPlex itself feeds. Buffer the resampled audio and emit fixed frames.
-    OPUS_FRAME = 1920
-    opus_pcm_buf = np.array([], dtype=np.float32)
+    # Mic audio waits in a bounded queue (drop policy) instead of piling up
+    # unread in the socket; the 0x03 echo goes out on its own low-priority task.
+    in_q = AudioQueue(16000, flow.max_queue_ms, flow.drop_policy)
+    echo = EchoSender(browser_ws, TAG_VC_USER, flow.echo_max, droppable=echo_codec != "opus")
+    stats = ProxyStats(in_q, echo, chunk_ms=1000 * session.CHUNK / 16000)
 
-    async def browser_to_pplx():
-        nonlocal chunk_count, acc_samples, opus_pcm_buf
+    async def browser_reader():
         async for msg in browser_ws:
             if msg.type == web.WSMsgType.BINARY:
-                incoming = np.frombuffer(msg.data, dtype=np.float32).copy()
-                if need_resample:
-                    t = torch.from_numpy(incoming).unsqueeze(0)
-                    incoming = resampler(t).squeeze(0).numpy()
-                acc_samples = np.concatenate([acc_samples, incoming])
-
-                while len(acc_samples) >= session.CHUNK:
-                    chunk = acc_samples[: session.CHUNK]
-                    acc_samples = acc_samples[session.CHUNK :]
-                    chunk_count += 1
-
-                    if chunk_count == 1:
-                        # First chunk is warmup padding; produce but don't forward.
-                        chunk = np.concatenate(
-                            [chunk, np.zeros(720, dtype=np.float32)]
-                        )
-                        await loop.run_in_executor(
-                            None, session.inference_one_chunk, chunk
-                        )
-                        continue
-
-                    # Periodically realign the streaming offsets (matches the
-                    # reference run_rt.py). Without this, asr/vc offsets grow
-                    # unbounded and quality drifts over a long conversation.
-                    if chunk_count % 50 == 0:
-                        session.reset_cache()
-
-                    try:
-                        vc_wav = await loop.run_in_executor(
-                            None, session.inference_one_chunk, chunk
-                        )
-                    except Exception as e:
-                        logger.error(f"[proxy] Inference error chunk {chunk_count}: {e}")
-                        continue
-
-                    # (a) forward converted audio to PersonaPlex as Opus.
-                    # sphn encodes at 24 kHz, so upsample the 16 kHz VC output,
-                    # then hand the encoder exact 1920-sample frames.
-                    vc_wav_24k = (
-                        out_resampler(torch.from_numpy(vc_wav).unsqueeze(0))
-                        .squeeze(0)
-                        .numpy()
-                    )
-                    opus_pcm_buf = np.concatenate([opus_pcm_buf, vc_wav_24k])
-                    while len(opus_pcm_buf) >= OPUS_FRAME:
-                        frame = np.ascontiguousarray(opus_pcm_buf[:OPUS_FRAME])
-                        opus_pcm_buf = opus_pcm_buf[OPUS_FRAME:]
-                        opus_writer.append_pcm(frame)
-                        while True:
-                            encoded = opus_writer.read_bytes()
-                            if len(encoded) == 0:
-                                break
-                            await pplx_ws.send_bytes(TAG_AUDIO + encoded)
-                            if opus_reader_dbg is not None:
-                                opus_reader_dbg.append_bytes(encoded)
-                                pcm = opus_reader_dbg.read_pcm()
-                                if pcm.shape[-1] > 0:
-                                    debug_pcm.append(pcm.astype(np.float32))
-
-                    # (b) send converted PCM (16 kHz) back to browser for downloads
-                    if not browser_ws.closed:
-                        await browser_ws.send_bytes(TAG_VC_USER + vc_wav.tobytes())
-
+                mic = uplink.decode(msg.data)
+                if rec is not None:
+                    rec.write("mic", mic)
+                # process() returns a view into its reusable buffer; the queue keeps it.
+                pcm16 = resampler.process(mic).copy()
+                if prosody is not None:
+                    prosody.feed("mic", pcm16)
+                in_q.put_nowait(pcm16)
             elif msg.type in (web.WSMsgType.CLOSE, web.WSMsgType.ERROR):
                 break
+        in_q.close()
+
+    async def vc_to_pplx():
+        nonlocal chunk_count, acc_samples
+        while True:
+            incoming = await in_q.get()
+            if incoming is None:
+                break
+            acc_samples = np.concatenate([acc_samples, incoming])
+
+            while len(acc_samples) >= session.CHUNK:
+                chunk = acc_samples[: session.CHUNK]
+                acc_samples = acc_samples[session.CHUNK :]
+                chunk_count += 1
+
+                if chunk_count == 1:
+                    # First chunk is warmup padding; produce but don't forward.
+                    chunk = np.concatenate([chunk, np.zeros(FIRST_CHUNK_PAD, dtype=np.float32)])
+                    await loop.run_in_executor(None, session.inference_one_chunk, chunk)
+                    continue
+
+                # Periodically realign the streaming offsets (matches the
+                # reference run_rt.py). Without this, asr/vc offsets grow
+                # unbounded and quality drifts over a long conversation.
+                if chunk_count % 50 == 0:
+                    session.reset_cache()
+
+                t0 = time.perf_counter()
+                try:
+                    vc_wav = await loop.run_in_executor(
+                        None, session.inference_one_chunk, chunk
+                    )
+                except Exception as e:
+                    logger.error(f"[proxy] Inference error chunk {chunk_count}: {e}")
+                    continue
+                stats.record_inference((time.perf_counter() - t0) * 1000)
+                if rec is not None:
+                    rec.write("vc", vc_wav)
+                if prosody is not None:
+                    prosody.feed("vc", vc_wav)
+
+                # (a) forward converted audio to PersonaPlex as Opus.
+                # sphn encodes at 24 kHz, so upsample the 16 kHz VC output;
+                # the encoder hands sphn exact 1920-sample frames.
+                pages = opus_enc.encode(out_resampler.process(vc_wav))
+                for encoded in pages:
+                    await pplx_ws.send_bytes(TAG_AUDIO + encoded)
+                    if opus_reader_dbg is not None:
+                        opus_reader_dbg.append_bytes(encoded)
+                        pcm = opus_reader_dbg.read_pcm()
+                        if pcm.shape[-1] > 0:
+                            debug_wav.write(pcm.reshape(-1))
+
+                # (b) queue the converted voice for the browser's downloads:
+                # raw 16 kHz PCM, or the same Opus pages.
+                if echo_codec == "opus":
+                    for encoded in pages:
+                        echo.push(encoded)
+                else:
+                    echo.push(encode_pcm(vc_wav, echo_codec))
 
     async def pplx_to_browser():
         async for msg in pplx_ws:
             if msg.type == aiohttp.WSMsgType.BINARY:
                 if not browser_ws.closed:
                     await browser_ws.send_bytes(msg.data)
+                if reply_reader is not None and msg.data[:1] == TAG_AUDIO:
+                    reply_reader.append_bytes(msg.data[1:])
+                    reply = reply_reader.read_pcm().reshape(-1)
+                    if rec is not None:
+                        rec.write("reply", reply)
+                    if prosody is not None:
+                        prosody.feed("reply", reply)
             elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.ERROR):
                 break
 
     tasks = [
-        asyncio.create_task(browser_to_pplx()),
+        asyncio.create_task(browser_reader()),
+        asyncio.create_task(vc_to_pplx()),
         asyncio.create_task(pplx_to_browser()),
     ]
+    # Best-effort side channels; they never end the session on their own.
+    side_tasks = [
+        asyncio.create_task(echo.run()),
+        asyncio.create_task(stats.report(browser_ws, flow.stats_s)),
+    ]
+    if prosody is not None:
+        side_tasks.append(asyncio.create_task(prosody.report(browser_ws, flow.prosody_s)))
     try:
         _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
         for task in pending:
             task.cancel()
         await asyncio.gather(*pending, return_exceptions=True)
     finally:
+        echo.close()
+        for task in side_tasks:
+            task.cancel()
+        await asyncio.gather(*side_tasks, return_exceptions=True)
         await pplx_ws.close()
-        await client.close()
+        if prosody is not None:
+            # Final statistics: to the browser if it is still there, the log and the recording.
+            final = await prosody.finish(browser_ws)
+            logger.info(f"[proxy] Prosody: {json.dumps(final)}")
+            if rec is not None:
+                rec.meta["prosody"] = final
         if not browser_ws.closed:
             await browser_ws.close()
 
-    if debug_dir and debug_pcm:
+    if debug_wav is not None:
+        debug_wav.close()
+        logger.info(f"[proxy] Saved PersonaPlex-input audio to {debug_wav.path}")
+    if rec is not None:
         try:
-            os.makedirs(debug_dir, exist_ok=True)
-            out_path = os.path.join(
-                debug_dir, f"pplx_input_{target_id}_{int(time.time())}.wav"
-            )
-            _save_wav(out_path, np.concatenate(debug_pcm), 24000)
-            logger.info(f"[proxy] Saved PersonaPlex-input audio to {out_path}")
+            meta = await rec.close()
+            logger.info(f"[proxy] Recording {rec.id}: {meta['tracks']}")
         except Exception as e:
-            logger.error(f"[proxy] Failed to save debug WAV: {e}")
+            logger.error(f"[proxy] Failed to finalize recording {rec.id}: {e}")
 
-    logger.info(f"[proxy] Closed after {chunk_count} chunks")
+    logger.info(
+        f"[proxy] Closed after {chunk_count} chunks ({codec} uplink "
+        f"{uplink.bytes_in / 1024:.0f} KiB, {echo_codec} echo {echo.sent_bytes / 1024:.0f} KiB, "
+        f"dropped {in_q.dropped_ms:.0f} ms mic / {echo.dropped} echo)"
+    )
     return browser_ws
 
 
+async def handle_recording_meta(request: web.Request) -> web.Response:
+    """GET /api/meanvc/recordings/{rec_id} - track list of a proxy recording."""
+    meta = await recording_meta(os.environ.get("VC_RECORD_DIR"), request.match_info["rec_id"])
+    if meta is None:
+        return web.json_response({"error": "Unknown recording"}, status=404)
+    return web.json_response(meta)
+
+
+async def handle_recording_file(request: web.Request) -> web.StreamResponse:
+    """GET /api/meanvc/recordings/{rec_id}/{name} - one track, with Range support."""
+    path = await recording_file(
+        os.environ.get("VC_RECORD_DIR"), request.match_info["rec_id"], request.match_info["name"]
+    )
+    if path is None:
+        return web.json_response({"error": "Unknown recording file"}, status=404)
+    return web.FileResponse(path)
+
+
+async def handle_ready(request: web.Request) -> web.Response:
+    """GET /ready - 200 once every model is loaded and warm, else 503; per-model timings."""
+    return web.json_response(preloader.status(), status=200 if preloader.ready else 503)
+
+
+async def handle_upstream_stats(request: web.Request) -> web.Response:
+    """GET /api/meanvc/upstream - PersonaPlex connection pool + setup-time metrics."""
+    return web.json_response(upstream.stats())
+
+
+@web.middleware
+async def ready_middleware(request: web.Request, handler):
+    # Models load in the background (so /ready can answer meanwhile); refuse work until then.
+    if not preloader.ready and request.path.startswith("/api/meanvc/") and request.method != "OPTIONS":
+        return web.json_response(preloader.status(), status=503)
+    return await handler(request)
+
+
 @web.middleware
 async def cors_middleware(request: web.Request, handler):
     if request.method == "OPTIONS":
@@ -674,17 +818,22 @@ async def cors_middleware(request: web.Request, handler):
         resp = await handler(request)
     resp.headers["Access-Control-Allow-Origin"] = "*"
     resp.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-    resp.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    resp.headers["Access-Control-Allow-Headers"] = "Content-Type, Range"
+    resp.headers["Access-Control-Expose-Headers"] = "Content-Range, Accept-Ranges, Content-Length"
     return resp
 
 
 def create_app() -> web.Application:
     app = web.Application(
-        middlewares=[cors_middleware], client_max_size=10 * 1024 * 1024
+        middlewares=[cors_middleware, ready_middleware], client_max_size=10 * 1024 * 1024
     )
+    app.router.add_get("/ready", handle_ready)
     app.router.add_post("/api/meanvc/load-target", handle_load_target)
     app.router.add_get("/api/meanvc/stream", handle_stream)
     app.router.add_get("/api/meanvc/chat-proxy", handle_chat_proxy)
+    app.router.add_get("/api/meanvc/upstream", handle_upstream_stats)
+    app.router.add_get("/api/meanvc/recordings/{rec_id}", handle_recording_meta)
+    app.router.add_get("/api/meanvc/recordings/{rec_id}/{name}", handle_recording_file)
     return app
 
 
@@ -696,6 +845,13 @@ async def on_startup(app: web.Application):
         "/app/meanvc-src/runtime/speaker_verification/ckpt/wavlm_large_finetune.pth",
     )
     models = SharedModels(ckpt_dir, sv_ckpt)
+    models.register(preloader)
+    preloader.start()
+    await upstream.start()
+
+
+async def on_cleanup(app: web.Application):
+    await upstream.close()
 
 
 def main():
@@ -704,6 +860,7 @@ def main():
     port = int(os.environ.get("MEANVC_PORT", 5002))
     app = create_app()
     app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
     ssl_dir = os.environ.get("SSL_DIR", "/app/ssl")
     ssl_context = None
     cert_file = os.path.join(ssl_dir, "cert.pem")
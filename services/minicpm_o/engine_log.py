@@ -0,0 +1,153 @@
+"""Bounded tee of a llama-server's stdout: rotating file, recent-lines ring, timings.
+
+The reader thread used to write and flush llama-server.log line by line, with no
+size limit, and ran a keyword search over every line in Python. EngineLogTee
+instead:
+
+  - writes through a 64 KB buffer, flushed every MINICPM_O_LOG_FLUSH_S (default 1)
+    and immediately after an error line;
+  - rotates llama-server.log -> .1 -> .2 ... once it passes MINICPM_O_LOG_MAX_MB
+    (default 50), keeping MINICPM_O_LOG_BACKUPS (default 3) old files. A restart
+    also rotates, so the log of a crashed run survives its revive;
+  - keeps the last MINICPM_O_LOG_RING lines (default 2000) in memory, served by
+    GET /api/engines/{index}/log;
+  - parses llama.cpp's timing lines ("prompt eval time = 123.45 ms / 56 tokens
+    (... 453.59 tokens per second)", "eval time = ...") into counters, which are
+    reported by GET /api/engines.
+"""
+
+import collections
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger("minicpm-o-server")
+
+LOG_MAX_BYTES = int(float(os.environ.get("MINICPM_O_LOG_MAX_MB", "50")) * 1024 * 1024)
+LOG_BACKUPS = int(os.environ.get("MINICPM_O_LOG_BACKUPS", "3"))
+LOG_RING = int(os.environ.get("MINICPM_O_LOG_RING", "2000"))
+LOG_FLUSH_S = float(os.environ.get("MINICPM_O_LOG_FLUSH_S", "1"))
+
+_ALERT_RE = re.compile(r"error|fail|cannot|abort|assert|cuda", re.IGNORECASE)
+# llama.cpp print_timings / perf lines; the omni fork adds its own "<stage> time" lines.
+_TIMING_RE = re.compile(
+    r"(?P<kind>[a-z][a-z0-9_ ]*?)\s+time\s*=\s*(?P<ms>[\d.]+)\s*ms"
+    r"(?:\s*/\s*(?P<n>\d+)\s*(?:tokens|runs))?"
+    r"(?:.*?(?P<tps>[\d.]+)\s*tokens per second)?",
+    re.IGNORECASE,
+)
+
+
+class EngineLogTee:
+    """Sink for one engine's output lines; feed() runs on the reader thread."""
+
+    def __init__(self, path: str, index: int = 0, max_bytes: int = LOG_MAX_BYTES,
+                 backups: int = LOG_BACKUPS, ring: int = LOG_RING):
+        self.path = path
+        self.index = index
+        self.max_bytes = max_bytes
+        self.backups = max(0, backups)
+        self.recent: collections.deque[str] = collections.deque(maxlen=max(1, ring))
+        self.lines = 0
+        self.alerts = 0
+        self._f = None
+        self._gen = 0   # bumped by open(); readers of older processes are ignored
+        self._written = 0
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._timings: dict[str, dict] = {}
+
+    # -- file --
+    def _rotate(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if self.backups and os.path.exists(self.path):
+            for i in range(self.backups - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+
+    def open(self) -> int:
+        """Start a new log file for a fresh engine process (the previous one becomes .1).
+
+        Returns the new generation, which that process's reader passes to feed()
+        and close(): a reader that outlives its process neither writes into nor
+        closes its replacement's log.
+        """
+        with self._lock:
+            self._rotate()
+            self._f = open(self.path, "w", buffering=64 * 1024, encoding="utf-8")
+            self._gen += 1
+            self._written = 0
+            self._last_flush = time.monotonic()
+            return self._gen
+
+    def close(self, gen: int | None = None) -> None:
+        """Close the current file (size-rotated or not); with `gen`, only if it is still current."""
+        with self._lock:
+            if self._f is not None and (gen is None or gen == self._gen):
+                self._f.close()
+                self._f = None
+
+    # -- per line --
+    def feed(self, line: str, gen: int | None = None) -> None:
+        if gen is not None and gen != self._gen:
+            return   # late output of a replaced process
+        s = line.rstrip()
+        self.recent.append(s)
+        self.lines += 1
+        alert = _ALERT_RE.search(s) is not None
+        if alert:
+            self.alerts += 1
+            logger.warning("[llama-server:%d] %s", self.index, s)
+        elif " time" in s:
+            self._parse_timing(s)
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.write(line if line.endswith("\n") else line + "\n")
+            self._written += len(line) + 1
+            now = time.monotonic()
+            if alert or now - self._last_flush >= LOG_FLUSH_S:
+                self._f.flush()
+                self._last_flush = now
+            if self.max_bytes and self._written >= self.max_bytes:
+                self._rotate()
+                self._f = open(self.path, "w", buffering=64 * 1024, encoding="utf-8")
+                self._written = 0
+
+    def _parse_timing(self, s: str) -> None:
+        m = _TIMING_RE.search(s)
+        if m is None:
+            return
+        kind = m["kind"].strip().lower().replace(" ", "_")
+        ms = float(m["ms"])
+        with self._lock:
+            t = self._timings.setdefault(kind, {"count": 0, "total_ms": 0.0, "last_ms": 0.0,
+                                                "tokens": 0, "last_tps": None})
+            t["count"] += 1
+            t["total_ms"] += ms
+            t["last_ms"] = ms
+            if m["n"]:
+                t["tokens"] += int(m["n"])
+            if m["tps"]:
+                t["last_tps"] = float(m["tps"])
+
+    # -- reporting --
+    def tail(self, n: int) -> list[str]:
+        return list(self.recent)[-n:] if n > 0 else []
+
+    def metrics(self) -> dict:
+        with self._lock:
+            timings = {
+                k: {**t, "total_ms": round(t["total_ms"], 1),
+                    "mean_ms": round(t["total_ms"] / t["count"], 2),
+                    "tokens_per_s": (round(1000 * t["tokens"] / t["total_ms"], 2)
+                                     if t["tokens"] and t["total_ms"] else t["last_tps"])}
+                for k, t in self._timings.items()
+            }
+        return {"lines": self.lines, "alerts": self.alerts, "timings": timings}
@@ -0,0 +1,233 @@
+"""Pool of llama-server engines so several /api/chat sessions can run at once.
+
+One Q4_K_M engine needs ~9 GB of VRAM, so a 24 GB card fits two. Each engine
+is a separate llama-server process on its own port and output dir (see
+LlamaOmni). A WebSocket session takes an idle engine for its whole
+conversation, and later sessions queue in FIFO order and are told their
+position. A background health check restarts engines that died or stopped
+answering /health while idle.
+
+Changing the persona prompt costs a full llama-server restart (see
+LlamaOmni.begin_session), so the idle engines double as an LRU cache keyed by
+prompt. A session gets an idle engine already initialised with its prompt when
+there is one (hit). Otherwise it gets the least recently used idle engine
+(miss), which is re-initialised. At startup the engines are warmed with
+MINICPM_O_WARM_PROMPTS, so the common personas are hits from the first session.
+
+Env:
+  MINICPM_O_INSTANCES     engine count, or "auto" to size by free VRAM (default 1)
+  MINICPM_O_INSTANCE_GB   VRAM budget per engine for "auto" (default 10)
+  MINICPM_O_MAX_INSTANCES cap for "auto" (default 4)
+  MINICPM_O_HEALTH_S      idle-engine health-check interval, 0 disables (default 15)
+  MINICPM_O_WARM_PROMPTS  JSON list of prompts to pre-load, spread over the engines
+                          (default: the frontend's default prompt)
+"""
+
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+import os
+import subprocess
+import time
+from typing import Callable
+
+logger = logging.getLogger("minicpm-o-server")
+
+
+def instance_count() -> int:
+    """MINICPM_O_INSTANCES, resolving "auto" from nvidia-smi's free memory on GPU 0."""
+    value = os.environ.get("MINICPM_O_INSTANCES", "1").strip().lower()
+    if value != "auto":
+        return max(1, int(value))
+    per_gb = float(os.environ.get("MINICPM_O_INSTANCE_GB", "10"))
+    cap = int(os.environ.get("MINICPM_O_MAX_INSTANCES", "4"))
+    try:
+        out = subprocess.run(
+            ["nvidia-smi", "--query-gpu=memory.free", "--format=csv,noheader,nounits", "-i", "0"],
+            capture_output=True, text=True, timeout=10, check=True,
+        ).stdout
+        free_gb = float(out.strip().splitlines()[0]) / 1024
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError) as e:
+        logger.warning("MINICPM_O_INSTANCES=auto: can't read free VRAM (%s); using 1", e)
+        return 1
+    n = max(1, min(cap, int(free_gb // per_gb)))
+    logger.info("MINICPM_O_INSTANCES=auto: %.1f GB free / %.0f GB each -> %d engine(s)",
+                free_gb, per_gb, n)
+    return n
+
+
+def warm_prompts() -> list[str]:
+    raw = os.environ.get("MINICPM_O_WARM_PROMPTS")
+    if not raw:
+        return ["You enjoy having a good conversation."]   # frontend DEFAULT_PROMPT
+    prompts = json.loads(raw)
+    if isinstance(prompts, str):
+        prompts = [prompts]
+    return [str(p) for p in prompts] or [""]
+
+
+class EnginePool:
+    """FIFO hand-out of engines; waiters get position callbacks as the queue moves.
+
+    Engines need `index`, `cur_prompt`, `alive()`, `async health()` and
+    `async revive()`.
+    """
+
+    def __init__(self, engines: list, health_s: float | None = None):
+        self.engines = list(engines)
+        self.health_s = health_s if health_s is not None else float(
+            os.environ.get("MINICPM_O_HEALTH_S", "15")
+        )
+        self._idle = collections.deque(self.engines)
+        self._reviving: set = set()
+        self._waiters: collections.deque[tuple[asyncio.Future, Callable | None]] = collections.deque()
+        self._health_task: asyncio.Task | None = None
+        self.sessions = 0
+        self.restarts = 0
+        self.max_queue = 0
+        self.hits = 0
+        self.misses = 0
+        self._last_used = {e: 0.0 for e in self.engines}
+
+    # -- hand-out --
+    def _take(self, prompt: str | None):
+        """Idle engine already holding `prompt`, else the least recently used one."""
+        warm = [e for e in self._idle if e.cur_prompt == prompt]
+        engine = warm[0] if warm else min(self._idle, key=self._last_used.__getitem__)
+        self._idle.remove(engine)
+        return engine
+
+    def _count(self, engine, prompt: str | None) -> None:
+        self.sessions += 1
+        if engine.cur_prompt == prompt:
+            self.hits += 1
+        else:
+            self.misses += 1
+        logger.info("[pool] engine #%d -> session (%s; hits=%d misses=%d)", engine.index,
+                    "warm" if engine.cur_prompt == prompt else "prompt switch",
+                    self.hits, self.misses)
+
+    async def acquire(self, report: Callable[[int], None] | None = None, prompt: str | None = None,
+                      abandon: asyncio.Future | None = None):
+        """Wait for an idle engine, preferring one warmed with `prompt`. `report(position)`
+        is called whenever the caller's 1-based queue position changes (not called if an
+        engine is free right away). If `abandon` completes first (the client hung up while
+        queued), leave the queue and return None."""
+        if self._idle and not self._waiters:
+            engine = self._take(prompt)
+            self._count(engine, prompt)
+            return engine
+        entry = (asyncio.get_running_loop().create_future(), report)
+        self._waiters.append(entry)
+        self.max_queue = max(self.max_queue, len(self._waiters))
+        self._notify()
+        try:
+            if abandon is not None:
+                await asyncio.wait((entry[0], abandon), return_when=asyncio.FIRST_COMPLETED)
+                if not entry[0].done():
+                    entry[0].cancel()   # release() skips it from now on
+                    logger.info("[pool] waiter left the queue")
+                    return None
+            engine = await entry[0]
+        except asyncio.CancelledError:
+            fut = entry[0]
+            if fut.done() and not fut.cancelled():
+                self.release(fut.result())   # handed an engine just as the client left
+            raise
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                self._notify()
+        self._count(engine, prompt)
+        return engine
+
+    @contextlib.asynccontextmanager
+    async def session(self, report: Callable[[int], None] | None = None, prompt: str | None = None,
+                      abandon: asyncio.Future | None = None):
+        """acquire()/release() around the block; yields None if abandoned while queued."""
+        engine = await self.acquire(report, prompt, abandon)
+        if engine is None:
+            yield None
+            return
+        try:
+            yield engine
+        finally:
+            self.release(engine)
+
+    def release(self, engine) -> None:
+        self._last_used[engine] = time.monotonic()
+        if not engine.alive():
+            self._schedule_revive(engine)
+            return
+        while self._waiters:
+            fut, _ = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(engine)
+                self._notify()
+                return
+        self._idle.append(engine)
+
+    def _notify(self) -> None:
+        for pos, (_fut, report) in enumerate(self._waiters, start=1):
+            if report is not None:
+                report(pos)
+
+    # -- health --
+    def _schedule_revive(self, engine) -> None:
+        if engine in self._reviving:
+            return
+        self._reviving.add(engine)
+        asyncio.get_running_loop().create_task(self._revive(engine))
+
+    async def _revive(self, engine) -> None:
+        logger.warning("[pool] engine #%d unhealthy — restarting", engine.index)
+        delay = 5.0
+        while True:
+            try:
+                await engine.revive()
+                break
+            except Exception as e:
+                logger.error("[pool] engine #%d restart failed: %s (retry in %.0fs)",
+                             engine.index, e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 120.0)
+        self.restarts += 1
+        self._reviving.discard(engine)
+        self.release(engine)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_s)
+            for engine in list(self._idle):
+                if engine.alive() and await engine.health():
+                    continue
+                if engine in self._idle:   # may have been handed out meanwhile
+                    self._idle.remove(engine)
+                    self._schedule_revive(engine)
+
+    def start(self) -> None:
+        if self.health_s > 0 and self._health_task is None:
+            self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+    def stats(self) -> dict:
+        return {
+            "engines": len(self.engines),
+            "idle": [e.index for e in self._idle],
+            "busy": [e.index for e in self.engines
+                     if e not in self._idle and e not in self._reviving],
+            "restarting": [e.index for e in self._reviving],
+            "queued": len(self._waiters),
+            "max_queued": self.max_queue,
+            "sessions": self.sessions,
+            "restarts": self.restarts,
+            "prompt_hits": self.hits,
+            "prompt_misses": self.misses,
+            "warm_prompts": {e.index: (e.cur_prompt or "")[:60] for e in self.engines},
+        }
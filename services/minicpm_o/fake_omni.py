@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""CPU-only stand-in for llama.cpp-omni's llama-server, for testing the bridge.
+
+It speaks the same HTTP/SSE API as the real engine (see server.py's docstring),
+with no model behind it. Replies are canned sentences, and "TTS" is a tone
+written to <output_dir>/tts_wav/wav_N.wav after a delay, just as Token2Wav
+writes its WAVs asynchronously to decode. One request at a time holds the
+engine lock, as with the real single-context engine. The time spent waiting
+for it is reported at GET /stats, so lock contention in the bridge shows up.
+
+It accepts llama-server's command line, so the bridge can launch it in place
+of the real binary (the --model file only has to exist):
+
+    touch /tmp/fake.gguf
+    LLAMA_OMNI_BIN=services/minicpm_o/fake_omni.py \\
+    MINICPM_O_GGUF_DIR=/tmp MINICPM_O_LLM=fake.gguf \\
+    FAKE_OMNI_PROFILE=realistic uv run python server.py --ssl ""
+
+Latency profiles (FAKE_OMNI_PROFILE or --profile): a preset name below, or a
+JSON object overriding any of its fields, e.g. '{"prefill_ms": 80}'.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import wave
+
+import numpy as np
+from aiohttp import web
+
+logger = logging.getLogger("fake-omni")
+
+PROFILES = {
+    # No delays at all: measures the bridge alone.
+    "instant": dict(startup_s=0, init_ms=0, prefill_ms=0, prefill_ms_per_s=0,
+                    first_token_ms=0, token_ms=0, tts_ms=0, reply_every=3, jitter=0.0),
+    # Roughly a Q4_K_M engine on one 24 GB card.
+    "realistic": dict(startup_s=2, init_ms=1500, prefill_ms=60, prefill_ms_per_s=40,
+                      first_token_ms=180, token_ms=35, tts_ms=250, reply_every=4, jitter=0.2),
+    # An engine that can't keep up with real time (exercises pacing and drops).
+    "slow": dict(startup_s=2, init_ms=3000, prefill_ms=400, prefill_ms_per_s=300,
+                 first_token_ms=600, token_ms=80, tts_ms=700, reply_every=3, jitter=0.3),
+}
+TTS_SR = 24000
+TTS_S_PER_CHAR = 0.06
+REPLIES = [
+    "Sure, I can help with that.",
+    "That sounds interesting, tell me more.",
+    "Hmm, let me think about it for a second.",
+    "I'm not sure the server room is open to visitors.",
+]
+
+
+def load_profile(spec: str) -> dict:
+    if spec.lstrip().startswith("{"):
+        overrides = json.loads(spec)
+        base = dict(PROFILES[overrides.pop("base", "realistic")])
+        base.update(overrides)
+        return base
+    if spec not in PROFILES:
+        raise SystemExit(f"unknown profile {spec!r} (expected one of {', '.join(PROFILES)} or JSON)")
+    return dict(PROFILES[spec])
+
+
+def wav_duration_s(path: str) -> float:
+    with wave.open(path, "rb") as w:
+        return w.getnframes() / w.getframerate()
+
+
+def write_tone(path: str, seconds: float, seed: int) -> None:
+    t = np.arange(int(TTS_SR * seconds)) / TTS_SR
+    f0 = 140 + 40 * (seed % 5)
+    env = np.minimum(1.0, np.minimum(t, t[-1] - t) * 20) if len(t) else t
+    pcm = (0.2 * env * np.sin(2 * np.pi * f0 * t) * 32767).astype("<i2")
+    with wave.open(path, "wb") as w:   # closed after writing -> IN_CLOSE_WRITE, as in the real engine
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(TTS_SR)
+        w.writeframes(pcm.tobytes())
+
+
+class FakeEngine:
+    def __init__(self, profile: dict):
+        self.p = profile
+        self.lock = asyncio.Lock()
+        self.ready_at = time.monotonic() + profile["startup_s"]
+        self.output_dir: str | None = None
+        self.chunks = 0
+        self.wav_n = 0
+        self.pending_reply: str | None = None
+        self.tts_tasks: set[asyncio.Task] = set()
+        self.stats = {"prefill": 0, "decode": 0, "break": 0, "init": 0, "wavs": 0,
+                      "prefill_audio_s": 0.0, "lock_wait_ms": 0.0, "max_lock_wait_ms": 0.0}
+
+    async def _delay(self, ms: float) -> None:
+        if ms > 0:
+            await asyncio.sleep(ms * (1 + random.uniform(-1, 1) * self.p["jitter"]) / 1000)
+
+    async def _locked(self):
+        t0 = time.perf_counter()
+        await self.lock.acquire()
+        waited = (time.perf_counter() - t0) * 1000
+        self.stats["lock_wait_ms"] += waited
+        self.stats["max_lock_wait_ms"] = max(self.stats["max_lock_wait_ms"], waited)
+
+    def _reset(self) -> None:
+        self.chunks = 0
+        self.wav_n = 0
+        self.pending_reply = None
+        for task in self.tts_tasks:
+            task.cancel()
+
+    # -- handlers --
+    async def health(self, request):
+        if time.monotonic() < self.ready_at:
+            return web.json_response({"status": "loading model"}, status=503)
+        return web.json_response({"status": "ok"})
+
+    async def omni_init(self, request):
+        body = await request.json()
+        self.output_dir = body.get("output_dir") or "."
+        os.makedirs(os.path.join(self.output_dir, "tts_wav"), exist_ok=True)
+        await self._delay(self.p["init_ms"])
+        self._reset()
+        self.stats["init"] += 1
+        return web.json_response({"success": True})
+
+    async def prefill(self, request):
+        body = await request.json()
+        path = body.get("audio_path_prefix", "")
+        try:
+            dur = wav_duration_s(path)
+        except (OSError, EOFError, wave.Error) as e:
+            return web.json_response({"error": f"bad prefill audio {path!r}: {e}"}, status=400)
+        await self._locked()
+        try:
+            await self._delay(self.p["prefill_ms"] + self.p["prefill_ms_per_s"] * dur)
+            self.chunks += 1
+            self.stats["prefill"] += 1
+            self.stats["prefill_audio_s"] += dur
+            if self.chunks % self.p["reply_every"] == 0:
+                self.pending_reply = random.choice(REPLIES)
+        finally:
+            self.lock.release()
+        return web.json_response({"success": True})
+
+    async def decode(self, request):
+        await request.read()
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+
+        async def event(obj):
+            await resp.write(f"data: {json.dumps(obj)}\n\n".encode())
+
+        await self._locked()
+        try:
+            self.stats["decode"] += 1
+            await self._delay(self.p["first_token_ms"])
+            reply, self.pending_reply = self.pending_reply, None
+            if reply is None:
+                await event({"is_listen": True})
+            else:
+                words = reply.split(" ")
+                for i, word in enumerate(words):
+                    if i:
+                        await self._delay(self.p["token_ms"])
+                    await event({"is_listen": False, "text": word + (" " if i < len(words) - 1 else ""),
+                                 "end_of_turn": i == len(words) - 1})
+                self._schedule_tts(reply)
+        finally:
+            self.lock.release()
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    def _schedule_tts(self, text: str) -> None:
+        if self.output_dir is None:
+            return
+        n = self.wav_n
+        self.wav_n += 1
+        path = os.path.join(self.output_dir, "tts_wav", f"wav_{n}.wav")
+
+        async def run():
+            await self._delay(self.p["tts_ms"])
+            await asyncio.get_running_loop().run_in_executor(
+                None, write_tone, path, max(0.3, len(text) * TTS_S_PER_CHAR), n)
+            self.stats["wavs"] += 1
+
+        task = asyncio.get_running_loop().create_task(run())
+        self.tts_tasks.add(task)
+        task.add_done_callback(self.tts_tasks.discard)
+
+    async def break_(self, request):
+        body = await request.json()
+        self.stats["break"] += 1
+        if body.get("reason") == "new_session":
+            self._reset()
+        else:
+            self.pending_reply = None
+        return web.json_response({"success": True})
+
+    async def get_stats(self, request):
+        return web.json_response({**self.stats, "chunks": self.chunks, "profile": self.p})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake llama.cpp-omni server (no model, CPU only)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=19080)
+    parser.add_argument("--model", default="")
+    parser.add_argument("--profile", default=os.environ.get("FAKE_OMNI_PROFILE", "realistic"))
+    args, _ = parser.parse_known_args()   # ignore llama-server's other flags
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    engine = FakeEngine(load_profile(args.profile))
+    app = web.Application()
+    app.router.add_get("/health", engine.health)
+    app.router.add_get("/stats", engine.get_stats)
+    app.router.add_post("/v1/stream/omni_init", engine.omni_init)
+    app.router.add_post("/v1/stream/prefill", engine.prefill)
+    app.router.add_post("/v1/stream/decode", engine.decode)
+    app.router.add_post("/v1/stream/break", engine.break_)
+    logger.info("fake llama-omni on %s:%d (profile %s)", args.host, args.port, engine.p)
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
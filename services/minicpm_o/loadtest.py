@@ -0,0 +1,179 @@
+"""Load-test driver for the MiniCPM-o bridge's /api/chat.
+
+It opens N concurrent WebSocket sessions. Each one streams a recording as
+Ogg-Opus mic audio, paced in real time, as the browser does. It measures:
+
+  queue_ms         connect -> handshake (includes waiting for a free engine)
+  first_text_ms    first mic frame -> first 0x02 text
+  first_audio_ms   first mic frame -> first 0x01 reply audio (time-to-first-audio)
+  audio_s          reply audio received
+  dropped_ms       mic audio the bridge dropped (last "pacing" frame)
+
+It then prints p50/p95/max over the sessions and the bridge's /api/engines.
+Pair it with fake_omni.py to measure the bridge's own overhead without a GPU:
+
+    uv run python loadtest.py --url ws://127.0.0.1:8000 --sessions 8 --seconds 20
+"""
+
+import argparse
+import asyncio
+import json
+import ssl
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+import soundfile as sf
+import sphn
+
+COMMON_DIR = str(Path(__file__).resolve().parents[1] / "common")
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
+
+from resample import StreamingResampler  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+OPUS_SR = 24000
+OPUS_FRAME = 1920   # 80 ms
+TAG_HANDSHAKE, TAG_AUDIO, TAG_TEXT = b"\x00", b"\x01", b"\x02"
+
+
+def load_mic(path: Path) -> np.ndarray:
+    data, sr = sf.read(path, dtype="float32", always_2d=True)
+    mono = data.mean(axis=1)
+    return StreamingResampler(sr, OPUS_SR).process(mono).copy()
+
+
+async def run_session(idx: int, args, mic: np.ndarray, ssl_ctx) -> dict:
+    res = {"session": idx, "queue_ms": None, "first_text_ms": None, "first_audio_ms": None,
+           "audio_s": 0.0, "text": "", "dropped_ms": 0.0, "max_queue_pos": 0, "error": None}
+    url = f"{args.url.rstrip('/')}/api/chat"
+    t_connect = time.perf_counter()
+    t_mic: float | None = None
+    opus_in = sphn.OpusStreamReader(OPUS_SR)
+    try:
+        async with aiohttp.ClientSession() as http, http.ws_connect(
+            url, params={"text_prompt": args.prompt}, ssl=ssl_ctx, max_msg_size=0
+        ) as ws:
+            # Wait for the handshake (queue position frames may come first).
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    ev = json.loads(msg.data)
+                    if ev.get("type") == "queue":
+                        res["max_queue_pos"] = max(res["max_queue_pos"], ev["position"])
+                elif msg.type == aiohttp.WSMsgType.BINARY and msg.data[:1] == TAG_HANDSHAKE:
+                    break
+                else:
+                    raise RuntimeError(f"closed before handshake ({msg.type})")
+            res["queue_ms"] = (time.perf_counter() - t_connect) * 1000
+
+            async def send_mic():
+                nonlocal t_mic
+                writer = sphn.OpusStreamWriter(OPUS_SR)
+                n_frames = int(args.seconds * OPUS_SR / OPUS_FRAME)
+                t0 = time.perf_counter()
+                for i in range(n_frames):
+                    start = (i * OPUS_FRAME) % max(1, len(mic) - OPUS_FRAME)
+                    writer.append_pcm(np.ascontiguousarray(mic[start:start + OPUS_FRAME]))
+                    while len(page := writer.read_bytes()):
+                        await ws.send_bytes(TAG_AUDIO + page)
+                    if t_mic is None:
+                        t_mic = time.perf_counter()
+                    # Real-time pacing against the session clock, not per-frame sleeps.
+                    delay = t0 + (i + 1) * OPUS_FRAME / OPUS_SR - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await asyncio.sleep(args.tail)   # let the last replies arrive
+                await ws.close()
+
+            async def receive():
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        ev = json.loads(msg.data)
+                        if ev.get("type") == "pacing":
+                            res["dropped_ms"] = ev.get("dropped_ms", 0.0)
+                        continue
+                    if msg.type != aiohttp.WSMsgType.BINARY or not msg.data:
+                        continue
+                    tag, payload = msg.data[:1], msg.data[1:]
+                    now_ms = (time.perf_counter() - t_mic) * 1000 if t_mic else None
+                    if tag == TAG_TEXT:
+                        res["text"] += payload.decode("utf-8", errors="replace")
+                        if res["first_text_ms"] is None:
+                            res["first_text_ms"] = now_ms
+                    elif tag == TAG_AUDIO:
+                        opus_in.append_bytes(payload)
+                        res["audio_s"] += opus_in.read_pcm().shape[-1] / OPUS_SR
+                        if res["first_audio_ms"] is None:
+                            res["first_audio_ms"] = now_ms
+
+            await asyncio.gather(send_mic(), receive())
+    except Exception as e:
+        res["error"] = f"{type(e).__name__}: {e}"
+    return res
+
+
+def summarize(results: list[dict]) -> dict:
+    out = {"sessions": len(results), "errors": sum(1 for r in results if r["error"])}
+    for key in ("queue_ms", "first_text_ms", "first_audio_ms", "audio_s", "dropped_ms"):
+        vals = np.array([r[key] for r in results if r[key] is not None], dtype=np.float64)
+        if len(vals):
+            out[key] = {"p50": round(float(np.percentile(vals, 50)), 1),
+                        "p95": round(float(np.percentile(vals, 95)), 1),
+                        "max": round(float(vals.max()), 1), "n": int(len(vals))}
+    return out
+
+
+async def main_async(args) -> None:
+    mic = load_mic(Path(args.wav))
+    ssl_ctx = False if args.insecure else None
+    if args.url.startswith("wss://") and args.insecure:
+        ssl_ctx = ssl.create_default_context()
+        ssl_ctx.check_hostname = False
+        ssl_ctx.verify_mode = ssl.CERT_NONE
+
+    async def staggered(i):
+        await asyncio.sleep(i * args.ramp)
+        return await run_session(i, args, mic, ssl_ctx)
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(staggered(i) for i in range(args.sessions)))
+    wall = time.perf_counter() - t0
+
+    engines = None
+    http_url = args.url.replace("ws://", "http://").replace("wss://", "https://").rstrip("/")
+    try:
+        async with aiohttp.ClientSession() as http, http.get(
+            f"{http_url}/api/engines", ssl=ssl_ctx, timeout=aiohttp.ClientTimeout(total=5)
+        ) as r:
+            engines = await r.json()
+    except Exception as e:
+        print(f"GET /api/engines failed: {e}", file=sys.stderr)
+
+    for r in results:
+        if r["error"]:
+            print(f"session {r['session']}: {r['error']}", file=sys.stderr)
+    report = {"wall_s": round(wall, 1), **summarize(results), "engines": engines}
+    if args.json:
+        report["results"] = results
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /api/chat load test for the MiniCPM-o bridge")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000", help="bridge base URL (ws:// or wss://)")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20.0, help="mic audio streamed per session")
+    parser.add_argument("--tail", type=float, default=3.0, help="seconds to keep listening after the mic stops")
+    parser.add_argument("--ramp", type=float, default=0.25, help="seconds between session starts")
+    parser.add_argument("--wav", default=str(REPO_ROOT / "recordings" / "Target_2.wav"))
+    parser.add_argument("--prompt", default="You enjoy having a good conversation.")
+    parser.add_argument("--insecure", action="store_true", help="skip TLS verification (self-signed certs)")
+    parser.add_argument("--json", action="store_true", help="include per-session results")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Real-time paced Opus output for a MiniCPM-o session.
+
+Token2Wav hands us the reply a whole WAV at a time, typically ~1 s or more.
+Encoding and sending each WAV as fast as possible gave the browser a burst of
+frames followed by silence. PacedOpusSender smooths that out:
+
+  - push() copies PCM into a preallocated ring buffer. The ring only grows
+    when a WAV outruns it, so there is no per-WAV np.concatenate.
+  - run() encodes 80 ms frames on a per-session worker thread, keeping the
+    stateful sphn writer off the event loop and in order.
+  - Frames go out on a real-time clock, at most MINICPM_O_OUT_PREBUFFER_MS
+    ahead of playback. The first frame of a reply is sent at once, so the
+    prebuffer adds no latency. It only bounds how far the browser's jitter
+    buffer is filled ahead. When the ring runs dry (a gap between WAVs)
+    the clock restarts with the next frame.
+
+Env:
+  MINICPM_O_OUT_PREBUFFER_MS   audio sent ahead of the playback clock (default 160)
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import time
+from typing import Awaitable, Callable
+
+import numpy as np
+
+logger = logging.getLogger("minicpm-o-server")
+
+OUT_PREBUFFER_MS = float(os.environ.get("MINICPM_O_OUT_PREBUFFER_MS", "160"))
+
+
+class PacedOpusSender:
+    """Buffers reply PCM and sends it as Opus frames paced to real time.
+
+    `send(payload)` is awaited once per Ogg page. `writer` is a sphn.OpusStreamWriter
+    at `sr`, and `frame` must be a size the writer accepts.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[bytes], Awaitable[None]],
+        writer,
+        sr: int,
+        frame: int,
+        prebuffer_ms: float = OUT_PREBUFFER_MS,
+        capacity_s: float = 4.0,
+    ):
+        self.send = send
+        self.writer = writer
+        self.sr = sr
+        self.frame = frame
+        self.prebuffer_s = max(0.0, prebuffer_ms) / 1000
+        self._buf = np.zeros(max(frame, int(sr * capacity_s)), dtype=np.float32)
+        self._frame_buf = np.zeros(frame, dtype=np.float32)
+        self._read = 0
+        self._avail = 0
+        self._ready = asyncio.Event()
+        self._finished = False
+        self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="opus-enc")
+        self.frames = 0
+        self.underruns = 0
+
+    # -- producer side --
+    def push(self, pcm: np.ndarray) -> None:
+        n = len(pcm)
+        if n == 0:
+            return
+        if self._avail + n > len(self._buf):
+            self._grow(self._avail + n)
+        cap = len(self._buf)
+        start = (self._read + self._avail) % cap
+        first = min(n, cap - start)
+        self._buf[start:start + first] = pcm[:first]
+        self._buf[:n - first] = pcm[first:]
+        self._avail += n
+        self._ready.set()
+
+    def finish(self) -> None:
+        """No more audio: run() pads and sends the tail, then returns."""
+        self._finished = True
+        self._ready.set()
+
+    def _grow(self, need: int) -> None:
+        cap = len(self._buf)
+        new = np.zeros(max(2 * cap, need), dtype=np.float32)
+        first = min(self._avail, cap - self._read)
+        new[:first] = self._buf[self._read:self._read + first]
+        new[first:self._avail] = self._buf[:self._avail - first]
+        self._buf = new
+        self._read = 0
+
+    def _pop_frame(self) -> np.ndarray:
+        """Next frame into the reused frame buffer, zero-padded if the ring runs short."""
+        n = min(self.frame, self._avail)
+        cap = len(self._buf)
+        first = min(n, cap - self._read)
+        self._frame_buf[:first] = self._buf[self._read:self._read + first]
+        self._frame_buf[first:n] = self._buf[:n - first]
+        self._frame_buf[n:] = 0.0
+        self._read = (self._read + n) % cap
+        self._avail -= n
+        return self._frame_buf
+
+    # -- consumer side --
+    def _encode(self, frame: np.ndarray) -> list[bytes]:
+        self.writer.append_pcm(frame)
+        pages = []
+        while True:
+            enc = self.writer.read_bytes()
+            if len(enc) == 0:
+                return pages
+            pages.append(enc)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        t0 = time.monotonic()
+        sent_s = 0.0
+        try:
+            while True:
+                if self._avail < self.frame and not (self._finished and self._avail):
+                    if self._finished:
+                        return
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                ahead = sent_s - (time.monotonic() - t0)
+                if ahead < 0:
+                    # Playback caught up with us (gap between WAVs): restart the clock.
+                    if sent_s:
+                        self.underruns += 1
+                    t0, sent_s, ahead = time.monotonic(), 0.0, 0.0
+                if ahead > self.prebuffer_s:
+                    await asyncio.sleep(ahead - self.prebuffer_s)
+                frame = self._pop_frame()
+                for page in await loop.run_in_executor(self._executor, self._encode, frame):
+                    await self.send(page)
+                self.frames += 1
+                sent_s += self.frame / self.sr
+        finally:
+            self._executor.shutdown(wait=False)
+            logger.info("[opus-out] %d frame(s) sent, %d underrun(s)", self.frames, self.underruns)
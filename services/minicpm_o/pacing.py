@@ -0,0 +1,79 @@
+"""Adaptive prefill chunk length for a MiniCPM-o duplex session.
+
+The duplex model is trained on ~1 s chunks (its 1 Hz decision rate), but each
+prefill+decode round trip also carries a fixed cost. When that round trip takes
+longer than the audio it covers the session falls behind. The old fixed-size
+in_q then silently dropped whole seconds of speech.
+
+ChunkPacer keeps an EMA of the real-time factor (prefill+decode time / chunk
+audio time). It grows the chunk while the engine can't keep up, so the fixed
+cost is spread over more audio, and shrinks it back once the engine has headroom.
+The session's mic audio waits in an AudioQueue (services/common/backpressure.py).
+A worker that fell behind merges the backlog into one larger prefill, up to
+the max chunk. Audio is dropped, and counted, only beyond
+MINICPM_O_MAX_BACKLOG_MS.
+
+Env:
+  MINICPM_O_CHUNK_MIN_MS     shortest chunk (default 1000, the model's native rate)
+  MINICPM_O_CHUNK_MAX_MS     longest chunk, also the merge cap (default 2000)
+  MINICPM_O_MAX_BACKLOG_MS   queued mic audio before the oldest is dropped (default 4000)
+"""
+
+import os
+
+CHUNK_MIN_MS = float(os.environ.get("MINICPM_O_CHUNK_MIN_MS", "1000"))
+CHUNK_MAX_MS = float(os.environ.get("MINICPM_O_CHUNK_MAX_MS", "2000"))
+MAX_BACKLOG_MS = float(os.environ.get("MINICPM_O_MAX_BACKLOG_MS", "4000"))
+
+
+class ChunkPacer:
+    """Picks the next prefill chunk length from measured prefill+decode times."""
+
+    STEP_MS = 250.0
+    GROW_RTF = 0.9     # above this (EMA), grow the chunk
+    SHRINK_RTF = 0.5   # below this, with no backlog, shrink it
+    ALPHA = 0.3
+
+    def __init__(self, sr: int, min_ms: float = CHUNK_MIN_MS, max_ms: float = CHUNK_MAX_MS):
+        self.sr = sr
+        self.min_ms = max(100.0, min_ms)
+        self.max_ms = max(self.min_ms, max_ms)
+        self.chunk_ms = min(max(1000.0, self.min_ms), self.max_ms)
+        self.rtf = 0.0
+        self.chunks = 0
+        self.merged = 0        # prefills that carried more than one chunk's worth
+        self.audio_ms = 0.0
+        self.busy_ms = 0.0
+
+    @property
+    def chunk_samples(self) -> int:
+        return int(self.sr * self.chunk_ms / 1000)
+
+    @property
+    def max_samples(self) -> int:
+        return int(self.sr * self.max_ms / 1000)
+
+    def update(self, audio_ms: float, proc_ms: float, backlog_ms: float) -> None:
+        """Record one prefill+decode round and adjust chunk_ms for the next one."""
+        rtf = proc_ms / max(audio_ms, 1.0)
+        self.rtf = rtf if self.chunks == 0 else (1 - self.ALPHA) * self.rtf + self.ALPHA * rtf
+        self.chunks += 1
+        if audio_ms > self.chunk_ms * 1.25:
+            self.merged += 1
+        self.audio_ms += audio_ms
+        self.busy_ms += proc_ms
+        if self.rtf > self.GROW_RTF or backlog_ms > self.chunk_ms:
+            self.chunk_ms = min(self.max_ms, self.chunk_ms + self.STEP_MS)
+        elif self.rtf < self.SHRINK_RTF and backlog_ms < self.chunk_ms / 2:
+            self.chunk_ms = max(self.min_ms, self.chunk_ms - self.STEP_MS)
+
+    def snapshot(self, backlog_ms: float, dropped_ms: float) -> dict:
+        return {
+            "type": "pacing",
+            "chunk_ms": round(self.chunk_ms),
+            "rtf": round(self.rtf, 3),
+            "backlog_ms": round(backlog_ms),
+            "dropped_ms": round(dropped_ms),
+            "merged": self.merged,
+            "chunks": self.chunks,
+        }
@@ -10,38 +10,41 @@ Protocol on /api/chat (matches moshi/PersonaPlex):
   server -> browser : 0x00 handshake (once, on connect)
                       0x01 Ogg-Opus audio frame @24kHz (assistant speech)
                       0x02 UTF-8 text chunk (assistant transcript)
+                      JSON text {"type":"queue"|"pacing",...} (engine queue position,
+                      per-chunk pacing: chunk_ms, rtf, backlog_ms, dropped_ms)
   browser -> server : 0x01 Ogg-Opus audio frame @24kHz (mic)
 
 llama-omni-server HTTP API (localhost, from MiniCPM-o-Demo@Comni cpp_backend.py):
   POST /v1/stream/omni_init   {media_type,use_tts,duplex_mode,model_dir,tts_bin_dir,
                                tts_gpu_layers,token2wav_device,output_dir,voice_audio,
                                voice_clone_prompt,assistant_prompt}
-  POST /v1/stream/prefill     {audio_path_prefix,img_path_prefix,cnt}
+  POST /v1/stream/prefill     {audio_path_prefix,img_path_prefix,cnt}   (path to a 16k WAV; we
+                               hand over reusable /dev/shm slots, see PrefillSlots)
   POST /v1/stream/decode      {stream:true,length_penalty}  -> SSE: data:{is_listen,end_of_turn,text|content}
   POST /v1/stream/break       {reason}
 TTS audio is NOT in the SSE — the C++ server writes 24kHz WAVs to <output_dir>/tts_wav/wav_N.wav;
-we scan for new ones each chunk and forward them as Opus.
+tts_watcher.py gets told (inotify) as each one is closed and we forward it as Opus.
 
 Audio rates: mic Opus@24k -> decode -> resample to 16k for prefill; reply WAVs are 24k = our Opus rate.
 """
 
 import argparse
 import asyncio
+import contextlib
 import json
 import logging
 import os
-import queue
-import re
 import signal
 import subprocess
+import sys
 import threading
 import time
 from pathlib import Path
 
+import aiohttp
 import numpy as np
 import requests
 import soundfile as sf
-import soxr
 import sphn
 from aiohttp import web
 
@@ -50,6 +53,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger("minicpm-o-server")
 
+# Helpers shared with the VC servers live in services/common/.
+COMMON_DIR = str(Path(__file__).resolve().parents[1] / "common")
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
+
+from recorder import wav_header  # noqa: E402
+from resample import StreamingResampler  # noqa: E402
+from tts_watcher import TTSWavWatcher  # noqa: E402
+from engine_pool import EnginePool, instance_count, warm_prompts  # noqa: E402
+from backpressure import AudioQueue  # noqa: E402
+from pacing import MAX_BACKLOG_MS, ChunkPacer  # noqa: E402
+from paced_opus import PacedOpusSender  # noqa: E402
+from engine_log import EngineLogTee  # noqa: E402
+
 # Tag bytes (must match frontend/useWebSocket.ts and moshi's server).
 TAG_HANDSHAKE = b"\x00"
 TAG_AUDIO = b"\x01"
@@ -57,7 +74,6 @@ TAG_TEXT = b"\x02"
 
 OPUS_SR = 24000          # browser Opus + llama-omni TTS WAV output rate
 MODEL_IN_SR = 16000      # prefill audio rate (fixed by the model)
-CHUNK_SAMPLES = MODEL_IN_SR   # duplex processes ~1s chunks (its 1Hz decision rate)
 MIN_PREFILL_SAMPLES = 1600    # llama-omni pads shorter chunks
 OPUS_FRAME = 1920        # 80ms @24k; sphn.append_pcm needs exact frame sizes
 
@@ -80,9 +96,17 @@ REF_AUDIO_PATH = os.environ.get(
 OUTPUT_DIR = os.environ.get(
     "MINICPM_O_OUTPUT_DIR", str(REPO_ROOT / "services" / "minicpm_o" / "_omni_out")
 )
-TEMP_DIR = os.path.join(OUTPUT_DIR, "_in")
+# Where prefill chunks are handed to the engine: "shm" (tmpfs slots, default) or
+# "file" (the same slots under <output_dir>/_in, on disk).
+PREFILL_HANDOFF = os.environ.get("MINICPM_O_PREFILL_HANDOFF", "shm")
+SHM_DIR = os.environ.get("MINICPM_O_SHM_DIR", "/dev/shm")
 
 _NO_PROXY = {"http": None, "https": None}
+# Per-call limits for the pooled aiohttp client (the startup-time calls keep requests).
+PREFILL_TIMEOUT = aiohttp.ClientTimeout(total=30)
+DECODE_TIMEOUT = aiohttp.ClientTimeout(total=600, sock_read=120)
+BREAK_TIMEOUT = aiohttp.ClientTimeout(total=10)
+HEALTH_TIMEOUT = aiohttp.ClientTimeout(total=3)
 
 
 def build_prompts(text_prompt: str) -> dict:
@@ -98,20 +122,85 @@ def build_prompts(text_prompt: str) -> dict:
     }
 
 
+class PrefillSlots:
+    """Fixed ring of reusable WAV files the engine reads prefill audio from.
+
+    The engine's prefill API only takes a path, so instead of sf.write-ing,
+    sending and deleting a new chunk_N.wav per ~1s chunk, each chunk is encoded
+    straight to int16 + a 44-byte header and pwrite()n over the next slot. On
+    tmpfs that never touches the disk. prefill() is awaited before the next
+    chunk, so the engine is done with a slot long before the ring comes back to it.
+    """
+
+    def __init__(self, directory: str, n_slots: int = 4, tmp: bool = False):
+        os.makedirs(directory, exist_ok=True)
+        self.dir = directory
+        self.tmp = tmp   # our own directory: removed on close
+        self.paths = [os.path.join(directory, f"slot_{i}.wav") for i in range(n_slots)]
+        self._fds = [os.open(p, os.O_RDWR | os.O_CREAT, 0o644) for p in self.paths]
+        self._sizes = [-1] * n_slots
+        self._next = 0
+
+    @classmethod
+    def from_env(cls, temp_dir: str, tag: str) -> "PrefillSlots":
+        if PREFILL_HANDOFF == "shm":
+            try:
+                return cls(os.path.join(SHM_DIR, f"hearmeout-minicpm-o-{os.getpid()}-{tag}"), tmp=True)
+            except OSError as e:
+                logger.warning("prefill shm handoff unavailable (%s) — using %s", e, temp_dir)
+        return cls(temp_dir)
+
+    def write(self, pcm_16k: np.ndarray) -> str:
+        i = self._next
+        self._next = (i + 1) % len(self.paths)
+        ints = (np.clip(pcm_16k, -1.0, 1.0) * 32767.0).astype("<i2")
+        blob = wav_header(MODEL_IN_SR, ints.nbytes) + ints.tobytes()
+        os.pwrite(self._fds[i], blob, 0)
+        if self._sizes[i] != len(blob):   # chunks are normally all the same length
+            os.ftruncate(self._fds[i], len(blob))
+            self._sizes[i] = len(blob)
+        return self.paths[i]
+
+    def close(self):
+        for fd, path in zip(self._fds, self.paths):
+            os.close(fd)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._fds = []
+        if self.tmp:
+            try:
+                os.rmdir(self.dir)
+            except OSError:
+                pass
+
+
 # ---------------------------------------------------------------------------
 # llama.cpp-omni server manager (subprocess + HTTP/SSE client). Mirrors the
-# official MiniCPM-o-Demo@Comni cpp_backend.py duplex path.
+# official MiniCPM-o-Demo@Comni cpp_backend.py duplex path. The startup calls
+# (health, omni_init) stay on blocking requests; the per-chunk prefill/decode/
+# break calls go through one keep-alive aiohttp pool on the event loop.
 # ---------------------------------------------------------------------------
 class LlamaOmni:
-    def __init__(self):
-        self.url = f"http://127.0.0.1:{CPP_PORT}"
+    """One llama-server process: its own port, output dir and prefill slots."""
+
+    def __init__(self, index: int = 0, port: int = CPP_PORT, output_dir: str = OUTPUT_DIR):
+        self.index = index
+        self.port = port
+        self.output_dir = output_dir
+        self.url = f"http://127.0.0.1:{port}"
         self.proc: subprocess.Popen | None = None
         self.cnt = 0
-        self.sent_wavs: set[str] = set()
         self.cur_prompt: str | None = None
-        self._cpp_log_path = os.path.join(OUTPUT_DIR, "llama-server.log")
-        os.makedirs(TEMP_DIR, exist_ok=True)
-        os.makedirs(os.path.join(OUTPUT_DIR, "tts_wav"), exist_ok=True)
+        self.load_s: float | None = None   # startup: spawn + /health + warm omni_init
+        self._http: aiohttp.ClientSession | None = None
+        temp_dir = os.path.join(output_dir, "_in")
+        self.slots = PrefillSlots.from_env(temp_dir, str(index))
+        self._cpp_log_path = os.path.join(output_dir, "llama-server.log")
+        self.log = EngineLogTee(self._cpp_log_path, index)
+        os.makedirs(temp_dir, exist_ok=True)
+        os.makedirs(os.path.join(output_dir, "tts_wav"), exist_ok=True)
 
     # -- subprocess lifecycle --
     def start_server(self):
@@ -122,18 +211,19 @@ class LlamaOmni:
             raise RuntimeError(f"LLM GGUF not found: {model_path}")
         cmd = [
             LLAMA_OMNI_BIN,
-            "--host", "127.0.0.1", "--port", str(CPP_PORT),
+            "--host", "127.0.0.1", "--port", str(self.port),
             "--model", model_path,
             "--ctx-size", str(CTX_SIZE), "--n-gpu-layers", str(N_GPU_LAYERS),
             "--repeat-penalty", "1.05", "--temp", "0.7",
         ]
-        logger.info("Starting llama-omni-server: %s", " ".join(cmd))
+        logger.info("Starting llama-omni-server #%d: %s", self.index, " ".join(cmd))
         self.proc = subprocess.Popen(
             cmd, cwd=LLAMA_OMNI_ROOT or None,
             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
             bufsize=1, encoding="utf-8", errors="replace", start_new_session=True,
         )
-        threading.Thread(target=self._log_reader, daemon=True).start()
+        gen = self.log.open()
+        threading.Thread(target=self._log_reader, args=(self.proc, gen), daemon=True).start()
         # Wait for /health, but fail fast if the process dies (don't hang 300s blind).
         for i in range(300):
             if self.proc.poll() is not None:
@@ -143,27 +233,39 @@ class LlamaOmni:
                 )
             try:
                 if requests.get(f"{self.url}/health", timeout=2, proxies=_NO_PROXY).status_code == 200:
-                    logger.info("llama-omni-server ready after %ds", i + 1)
+                    logger.info("llama-omni-server #%d ready after %ds", self.index, i + 1)
                     return
             except Exception:
                 pass
             time.sleep(1)
         raise RuntimeError(f"llama-omni-server startup timeout (300s) — see {self._cpp_log_path}")
 
-    def _log_reader(self):
-        # Tee the C++ engine's output to a file, and surface error-ish lines in our log.
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    async def health(self) -> bool:
         try:
-            with open(self._cpp_log_path, "w") as f:
-                for line in self.proc.stdout:
-                    f.write(line)
-                    f.flush()
-                    s = line.rstrip()
-                    if any(k in s.lower() for k in ("error", "fail", "cannot", "abort", "assert", "cuda")):
-                        logger.warning("[llama-server] %s", s)
-                    else:
-                        logger.debug("[llama-server] %s", s)
+            async with self._client().get(f"{self.url}/health", timeout=HEALTH_TIMEOUT) as r:
+                return r.status == 200
+        except Exception:
+            return False
+
+    async def revive(self):
+        """Restart a crashed/wedged engine with its last prompt (EnginePool health check)."""
+        await self._restart(self.cur_prompt or "")
+
+    def _log_reader(self, proc: subprocess.Popen, gen: int):
+        # Tee the C++ engine's output (rotating file + recent-lines ring + timing
+        # counters, see engine_log.py); error-ish lines are surfaced in our log.
+        # Tagged with this process's log generation: after _restart the old reader
+        # drains late and must neither write into nor close the new process's log.
+        try:
+            for line in proc.stdout:
+                self.log.feed(line, gen)
         except Exception:
             pass
+        finally:
+            self.log.close(gen)
 
     def stop_server(self):
         if self.proc and self.proc.poll() is None:
@@ -184,7 +286,7 @@ class LlamaOmni:
             "media_type": 2, "use_tts": True, "duplex_mode": True,
             "model_dir": GGUF_DIR, "tts_bin_dir": os.path.join(GGUF_DIR, "tts"),
             "tts_gpu_layers": 100, "token2wav_device": "gpu:0",
-            "output_dir": OUTPUT_DIR,
+            "output_dir": self.output_dir,
             "voice_clone_prompt": prompts["voice_clone_prompt"],
             "assistant_prompt": prompts["assistant_prompt"],
         }
@@ -194,133 +296,131 @@ class LlamaOmni:
         if r.status_code != 200:
             raise RuntimeError(f"omni_init failed: {r.text}")
         self.cur_prompt = text_prompt
-        logger.info("omni_init ok (duplex, prompt=%r)", (text_prompt or "")[:60])
+        logger.info("omni_init ok (engine #%d, duplex, prompt=%r)", self.index, (text_prompt or "")[:60])
 
-    def begin_session(self, text_prompt: str):
+    async def begin_session(self, text_prompt: str):
         """Per-connection clean start. If the persona prompt changed, restart the
         server + omni_init (the stable clean-state path in cpp_backend.full_reinit);
         otherwise reset counters/output and reuse the loaded model."""
-        self._reset_output()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._reset_output)
         self.cnt = 0
-        self.sent_wavs = set()
         if self.proc is None or self.proc.poll() is not None:
-            self.start_server()
-            self.omni_init(text_prompt)
+            await self._restart(text_prompt, stop=False)
         elif text_prompt != self.cur_prompt:
             logger.info("prompt changed -> full reinit")
-            self.stop_server()
+            await self._restart(text_prompt)
+        else:
+            await self.break_("new_session")
+
+    async def _restart(self, text_prompt: str, stop: bool = True):
+        # Pooled keep-alive connections belong to the old process; drop them with it.
+        await self.close_http()
+
+        def _run():
+            if stop:
+                self.stop_server()
             self.start_server()
             self.omni_init(text_prompt)
-        else:
-            self.break_("new_session")
+
+        await asyncio.get_running_loop().run_in_executor(None, _run)
+
+    def _client(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60),
+            )
+        return self._http
+
+    async def close_http(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def close(self):
+        await self.close_http()
+        self.slots.close()
 
     def _reset_output(self):
-        d = os.path.join(OUTPUT_DIR, "tts_wav")
-        try:
-            for f in os.listdir(d):
-                if f.startswith("wav_") and f.endswith(".wav"):
-                    os.remove(os.path.join(d, f))
-        except FileNotFoundError:
-            os.makedirs(d, exist_ok=True)
+        # Per-round dirs too: the session's TTS watcher treats whatever is there as new.
+        dirs = [os.path.join(self.output_dir, "tts_wav")]
+        dirs += [os.path.join(self.output_dir, rd, "tts_wav")
+                 for rd in os.listdir(self.output_dir) if rd.startswith("round_")]
+        for d in dirs:
+            try:
+                for f in os.listdir(d):
+                    if f.startswith("wav_") and f.endswith(".wav"):
+                        os.remove(os.path.join(d, f))
+            except FileNotFoundError:
+                pass
+        os.makedirs(dirs[0], exist_ok=True)
 
-    def prefill(self, pcm_16k: np.ndarray):
+    async def prefill(self, pcm_16k: np.ndarray):
         if len(pcm_16k) < MIN_PREFILL_SAMPLES:
             pcm_16k = np.pad(pcm_16k, (0, MIN_PREFILL_SAMPLES - len(pcm_16k)))
-        path = os.path.join(TEMP_DIR, f"chunk_{self.cnt}.wav")
-        sf.write(path, np.clip(pcm_16k, -1.0, 1.0).astype(np.float32),
-                 MODEL_IN_SR, format="WAV", subtype="PCM_16")
+        path = self.slots.write(pcm_16k)   # ~32 KB to tmpfs: cheap enough for the loop
         body = {"audio_path_prefix": path, "img_path_prefix": "", "cnt": self.cnt}
         self.cnt += 1
-        try:
-            requests.post(f"{self.url}/v1/stream/prefill", json=body, timeout=30, proxies=_NO_PROXY)
-        finally:
-            try:
-                os.remove(path)
-            except OSError:
-                pass
-
-    def decode(self) -> tuple[str, bool]:
-        """POST /v1/stream/decode (SSE). Returns (text, is_listen)."""
-        r = requests.post(f"{self.url}/v1/stream/decode",
-                          json={"stream": True, "length_penalty": LENGTH_PENALTY},
-                          timeout=600, proxies=_NO_PROXY)
-        texts, is_listen = [], True
-        if r.status_code == 200:
-            for line in r.text.splitlines():
-                line = line.strip()
+        async with self._client().post(f"{self.url}/v1/stream/prefill", json=body,
+                                       timeout=PREFILL_TIMEOUT) as r:
+            await r.read()
+
+    async def decode(self):
+        """POST /v1/stream/decode and yield its SSE events (dicts) as they arrive."""
+        async with self._client().post(f"{self.url}/v1/stream/decode",
+                                       json={"stream": True, "length_penalty": LENGTH_PENALTY},
+                                       timeout=DECODE_TIMEOUT) as r:
+            if r.status != 200:
+                logger.warning("decode failed (%d): %s", r.status, (await r.text())[:200])
+                return
+            async for raw in r.content:
+                line = raw.decode("utf-8", errors="replace").strip()
                 if not line.startswith("data: "):
                     continue
                 data = line[6:]
                 if data == "[DONE]":
                     break
                 try:
-                    ev = json.loads(data)
+                    yield json.loads(data)
                 except ValueError:
                     continue
-                if "is_listen" in ev:
-                    is_listen = ev["is_listen"]
-                if ev.get("text"):
-                    texts.append(ev["text"])
-                if ev.get("content"):
-                    texts.append(ev["content"])
-        return "".join(texts), is_listen
-
-    def collect_new_audio(self) -> np.ndarray | None:
-        """Scan for new wav_N.wav (24k float32) and concat. The C++ server writes either to
-        <output_dir>/tts_wav/ (duplex) or per-round <output_dir>/round_NNN/tts_wav/, so we
-        scan both. Sent files are tracked by full path."""
-        dirs = []
-        direct = os.path.join(OUTPUT_DIR, "tts_wav")
-        if os.path.isdir(direct):
-            dirs.append(direct)
-        try:
-            for rd in sorted(os.listdir(OUTPUT_DIR)):
-                p = os.path.join(OUTPUT_DIR, rd, "tts_wav")
-                if rd.startswith("round_") and os.path.isdir(p):
-                    dirs.append(p)
-        except FileNotFoundError:
-            pass
-
-        def _idx(name):
-            m = re.search(r"wav_(\d+)", name)
-            return int(m.group(1)) if m else 0
 
-        chunks = []
-        for d in dirs:
-            for f in sorted((x for x in os.listdir(d) if x.startswith("wav_") and x.endswith(".wav")), key=_idx):
-                key = os.path.join(d, f)
-                if key in self.sent_wavs:
-                    continue
-                try:
-                    data, _sr = sf.read(key, dtype="float32")
-                    if len(data):
-                        if data.ndim > 1:
-                            data = data.mean(axis=1)
-                        chunks.append(data)
-                    self.sent_wavs.add(key)
-                except Exception as e:
-                    logger.warning("[audio] read %s failed: %s", key, e)
-        if chunks:
-            logger.info("[audio] %d new wav(s), %d samples (dirs=%s)",
-                        len(chunks), sum(len(c) for c in chunks), [os.path.relpath(d, OUTPUT_DIR) for d in dirs])
-            return np.concatenate(chunks)
-        return None
-
-    def break_(self, reason: str):
+    def read_tts_wav(self, path: Path) -> np.ndarray | None:
+        """Load one finished wav_N.wav (24k) as mono float32."""
+        try:
+            data, _sr = sf.read(path, dtype="float32")
+        except Exception as e:
+            logger.warning("[audio] read %s failed: %s", path, e)
+            return None
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        logger.info("[audio] %s: %d samples", os.path.relpath(path, self.output_dir), len(data))
+        return data
+
+    async def break_(self, reason: str):
         try:
-            requests.post(f"{self.url}/v1/stream/break", json={"reason": reason},
-                         timeout=10, proxies=_NO_PROXY)
+            async with self._client().post(f"{self.url}/v1/stream/break", json={"reason": reason},
+                                           timeout=BREAK_TIMEOUT) as r:
+                await r.read()
         except Exception as e:
             logger.warning("break failed: %s", e)
 
 
-omni: LlamaOmni | None = None
-_session_lock: asyncio.Lock | None = None
+pool: EnginePool | None = None
 
 
 # ---------------------------------------------------------------------------
 # WebSocket handler — the PersonaPlex-compatible /api/chat endpoint.
 # ---------------------------------------------------------------------------
+async def _hangup(ws: web.WebSocketResponse) -> None:
+    """Return once the client closes the socket (frames sent before the handshake are dropped)."""
+    while True:
+        msg = await ws.receive()
+        if msg.type in (web.WSMsgType.CLOSE, web.WSMsgType.CLOSING,
+                        web.WSMsgType.CLOSED, web.WSMsgType.ERROR):
+            return
+
+
 async def handle_chat(request: web.Request) -> web.WebSocketResponse:
     text_prompt = request.query.get("text_prompt", "")
     ws = web.WebSocketResponse(max_msg_size=0)
@@ -328,71 +428,97 @@ async def handle_chat(request: web.Request) -> web.WebSocketResponse:
 
     opus_reader = sphn.OpusStreamReader(OPUS_SR)
     opus_writer = sphn.OpusStreamWriter(OPUS_SR)
+    mic_resampler = StreamingResampler(OPUS_SR, MODEL_IN_SR)   # stateful: no chunk-edge clicks
     loop = asyncio.get_event_loop()
 
-    # Official worker.py pattern: bounded chunk queue (drop oldest for backpressure), a
-    # per-chunk prefill+decode worker that emits TEXT only, and a SEPARATE 0.1s WAV poller
-    # that streams audio — because the C++ Token2Wav writes wavs asynchronously, so audio
-    # cannot be collected synchronously right after decode().
-    in_q: queue.Queue = queue.Queue(maxsize=2)
-    text_q: asyncio.Queue = asyncio.Queue()
-    sentinel = object()
-    worker_stop = threading.Event()
-    stop = asyncio.Event()
-    out_pcm_buf = np.array([], dtype=np.float32)
-    pcm16_buf = np.array([], dtype=np.float32)
-
-    async with _session_lock:
+    # Official worker.py pattern: a mic queue, a per-chunk prefill+decode worker that
+    # emits TEXT only, and a SEPARATE audio sender fed by the TTS WAV watcher — because
+    # the C++ Token2Wav writes wavs asynchronously, so audio cannot be collected
+    # synchronously right after decode(). The worker is an asyncio task on the pooled
+    # HTTP client, forwarding each SSE text delta as it lands. Chunk length adapts to
+    # the measured round-trip time and a backlog is merged, not dropped (see pacing.py).
+    in_q = AudioQueue(MODEL_IN_SR, MAX_BACKLOG_MS, "drop_oldest")
+    pacer = ChunkPacer(MODEL_IN_SR)
+
+    def report_queue(position: int):
+        # JSON text frame: the browser's binary-tag parser ignores it unless it knows it.
+        if not ws.closed:
+            asyncio.ensure_future(ws.send_json({"type": "queue", "position": position}))
+
+    # A client that hangs up while queued must not take an engine: begin_session
+    # could evict a warmed prompt, and the handshake would go to a closed socket.
+    hangup = asyncio.ensure_future(_hangup(ws))
+    async with pool.session(report_queue, prompt=text_prompt, abandon=hangup) as omni:
+        hangup.cancel()   # the session's own receive loop takes over the socket
+        with contextlib.suppress(asyncio.CancelledError):
+            await hangup
+        if omni is None or ws.closed:
+            logger.info("[chat] client left before an engine was free")
+            return ws
+        t0 = time.perf_counter()
         try:
-            await loop.run_in_executor(None, omni.begin_session, text_prompt)
+            await omni.begin_session(text_prompt)
+            logger.info("[chat] engine #%d ready in %.0f ms", omni.index,
+                        (time.perf_counter() - t0) * 1000)
         except Exception as e:
             logger.error("session init failed: %s", e)
             await ws.close()
             return ws
+        tts_watch = TTSWavWatcher(omni.output_dir)
+        tts_watch.start()   # after begin_session cleared the previous session's wavs
         await ws.send_bytes(TAG_HANDSHAKE)
-        logger.info("[chat] connected, handshake sent")
+        logger.info("[chat] connected to engine #%d, handshake sent", omni.index)
 
-        def worker():
+        async def worker():
             n = 0
-            try:
-                while not worker_stop.is_set():
-                    try:
-                        chunk = in_q.get(timeout=0.25)
-                    except queue.Empty:
-                        continue
-                    if chunk is None:
-                        break
-                    n += 1
-                    omni.prefill(chunk)
-                    text, is_listen = omni.decode()
-                    logger.info("[chunk %d] is_listen=%s text=%r", n, is_listen, (text or "")[:60])
-                    if text:
-                        loop.call_soon_threadsafe(text_q.put_nowait, text)
-            except Exception as e:
-                loop.call_soon_threadsafe(text_q.put_nowait, e)
-            finally:
-                loop.call_soon_threadsafe(text_q.put_nowait, sentinel)
-
-        async def send_opus(pcm: np.ndarray, flush: bool = False):
-            nonlocal out_pcm_buf
-            out_pcm_buf = np.concatenate([out_pcm_buf, pcm])
-            if flush:
-                pad = (-len(out_pcm_buf)) % OPUS_FRAME
-                if pad:
-                    out_pcm_buf = np.concatenate([out_pcm_buf, np.zeros(pad, dtype=np.float32)])
-            while len(out_pcm_buf) >= OPUS_FRAME:
-                frame = np.ascontiguousarray(out_pcm_buf[:OPUS_FRAME])
-                out_pcm_buf = out_pcm_buf[OPUS_FRAME:]
-                opus_writer.append_pcm(frame)
-                while True:
-                    enc = opus_writer.read_bytes()
-                    if len(enc) == 0:
+            pcm16_buf = np.array([], dtype=np.float32)
+            while True:
+                if len(pcm16_buf) < pacer.chunk_samples:
+                    pcm16 = await in_q.get()
+                    if pcm16 is None:
                         break
-                    if not ws.closed:
-                        await ws.send_bytes(TAG_AUDIO + enc)
+                    pcm16_buf = np.concatenate([pcm16_buf, pcm16])
+                    continue
+                # Everything that piled up during the last round goes in one prefill.
+                take = min(len(pcm16_buf), pacer.max_samples)
+                chunk = np.ascontiguousarray(pcm16_buf[:take])
+                pcm16_buf = pcm16_buf[take:]
+                n += 1
+                t_round = time.perf_counter()
+                await omni.prefill(chunk)
+                t0 = time.perf_counter()
+                texts, is_listen, first_ms = [], True, None
+                async for ev in omni.decode():
+                    if "is_listen" in ev:
+                        is_listen = ev["is_listen"]
+                    for delta in (ev.get("text"), ev.get("content")):
+                        if not delta:
+                            continue
+                        if first_ms is None:
+                            first_ms = (time.perf_counter() - t0) * 1000
+                        texts.append(delta)
+                        if not ws.closed:
+                            await ws.send_bytes(TAG_TEXT + delta.encode("utf-8"))
+                text = "".join(texts)
+                audio_ms = 1000 * take / MODEL_IN_SR
+                proc_ms = (time.perf_counter() - t_round) * 1000
+                backlog_ms = in_q.queued_ms + 1000 * len(pcm16_buf) / MODEL_IN_SR
+                pacer.update(audio_ms, proc_ms, backlog_ms)
+                logger.info("[chunk %d] %.0f ms audio in %.0f ms (next %.0f ms, dropped %.0f ms) "
+                            "is_listen=%s first_text=%s text=%r", n, audio_ms, proc_ms,
+                            pacer.chunk_ms, in_q.dropped_ms, is_listen,
+                            f"{first_ms:.0f}ms" if first_ms is not None else "-", text[:60])
+                if not ws.closed:
+                    await ws.send_json(pacer.snapshot(backlog_ms, in_q.dropped_ms))
+
+        async def send_audio(page: bytes):
+            if not ws.closed:
+                await ws.send_bytes(TAG_AUDIO + page)
+
+        # Reply audio is encoded off-loop and sent on a real-time clock (paced_opus.py).
+        paced = PacedOpusSender(send_audio, opus_writer, OPUS_SR, OPUS_FRAME)
 
         async def reader():
-            nonlocal pcm16_buf
             async for msg in ws:
                 if msg.type == web.WSMsgType.BINARY:
                     data = msg.data
@@ -402,62 +528,46 @@ async def handle_chat(request: web.Request) -> web.WebSocketResponse:
                     pcm24 = opus_reader.read_pcm()
                     if pcm24.shape[-1] == 0:
                         continue
-                    pcm16 = soxr.resample(pcm24.astype(np.float32), OPUS_SR, MODEL_IN_SR)
-                    pcm16_buf = np.concatenate([pcm16_buf, pcm16])
-                    while len(pcm16_buf) >= CHUNK_SAMPLES:
-                        c = np.ascontiguousarray(pcm16_buf[:CHUNK_SAMPLES])
-                        pcm16_buf = pcm16_buf[CHUNK_SAMPLES:]
-                        try:
-                            in_q.put_nowait(c)
-                        except queue.Full:        # drop oldest, keep latency bounded
-                            try:
-                                in_q.get_nowait()
-                            except queue.Empty:
-                                pass
-                            try:
-                                in_q.put_nowait(c)
-                            except queue.Full:
-                                pass
+                    in_q.put_nowait(mic_resampler.process(pcm24).copy())   # view of a reused buffer
                 elif msg.type in (web.WSMsgType.CLOSE, web.WSMsgType.ERROR):
                     break
 
-        async def text_sender():
+        async def wav_sender():
+            # Hand each TTS WAV to the paced Opus sender as soon as the watcher sees it closed;
+            # close() emits anything finished meanwhile, then None.
             while True:
-                item = await text_q.get()
-                if item is sentinel:
-                    break
-                if isinstance(item, Exception):
-                    logger.error("[chat] worker error: %s", item)
+                path = await tts_watch.queue.get()
+                if path is None:
                     break
-                if item and not ws.closed:
-                    await ws.send_bytes(TAG_TEXT + item.encode("utf-8"))
-
-        async def wav_poller():
-            # Drain the async TTS WAV output every 0.1s and stream it as Opus (0x01).
-            while not stop.is_set():
-                audio = await loop.run_in_executor(None, omni.collect_new_audio)
+                audio = await loop.run_in_executor(None, omni.read_tts_wav, path)
                 if audio is not None and len(audio):
-                    await send_opus(audio)
-                try:
-                    await asyncio.wait_for(stop.wait(), timeout=0.1)
-                except asyncio.TimeoutError:
-                    pass
-            audio = await loop.run_in_executor(None, omni.collect_new_audio)  # final drain
-            if audio is not None and len(audio):
-                await send_opus(audio)
-            if len(out_pcm_buf):
-                await send_opus(np.array([], dtype=np.float32), flush=True)
-
-        worker_fut = loop.run_in_executor(None, worker)
-        poller = asyncio.create_task(wav_poller())
+                    paced.push(audio)
+            paced.finish()
+
+        # The session ends when the browser goes away or the worker fails; an
+        # in-flight prefill/decode is cancelled and the engine told to break.
+        tasks = [asyncio.create_task(reader()), asyncio.create_task(worker())]
+        sender = asyncio.create_task(wav_sender())
+        opus_task = asyncio.create_task(paced.run())
         try:
-            await asyncio.gather(reader(), text_sender())
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error("[chat] worker error: %s", task.exception())
         finally:
-            worker_stop.set()
-            stop.set()
-            await worker_fut
-            await poller
-            await loop.run_in_executor(None, omni.break_, "disconnect")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            tts_watch.close()
+            await sender
+            if ws.closed:
+                opus_task.cancel()   # nobody left to play the rest
+            await asyncio.gather(opus_task, return_exceptions=True)
+            await omni.break_("disconnect")
+            logger.info("[chat] pacing: %d chunk(s), %d merged, %.1f s audio in %.1f s busy, "
+                        "dropped %.0f ms, final chunk %.0f ms", pacer.chunks, pacer.merged,
+                        pacer.audio_ms / 1000, pacer.busy_ms / 1000, in_q.dropped_ms,
+                        pacer.chunk_ms)
             if not ws.closed:
                 await ws.close()
 
@@ -477,9 +587,45 @@ async def cors_middleware(request: web.Request, handler):
     return resp
 
 
+async def handle_engines(request: web.Request) -> web.Response:
+    """GET /api/engines - engine pool occupancy, queue length, restarts and engine timings."""
+    stats = pool.stats()
+    stats["engine_logs"] = {e.index: e.log.metrics() for e in pool.engines}
+    return web.json_response(stats)
+
+
+async def handle_ready(request: web.Request) -> web.Response:
+    """GET /ready - 200 while at least one engine is up, else 503; per-engine load times."""
+    restarting = set(pool.stats()["restarting"])
+    engines = {}
+    for e in pool.engines:
+        status = "restarting" if e.index in restarting else "ready" if e.alive() else "failed"
+        engines[f"engine_{e.index}"] = {"status": status, "required": False,
+                                        "load_s": round(e.load_s or 0.0, 2)}
+    ready = any(m["status"] == "ready" for m in engines.values())
+    return web.json_response({"service": "minicpm-o", "ready": ready, "models": engines},
+                             status=200 if ready else 503)
+
+
+async def handle_engine_log(request: web.Request) -> web.Response:
+    """GET /api/engines/{index}/log?lines=N - the engine's most recent output lines."""
+    try:
+        index = int(request.match_info["index"])
+        lines = int(request.query.get("lines", "200"))
+    except ValueError:
+        raise web.HTTPBadRequest(text="index and lines must be integers")
+    engine = next((e for e in pool.engines if e.index == index), None)
+    if engine is None:
+        raise web.HTTPNotFound(text=f"no engine #{index}")
+    return web.Response(text="\n".join(engine.log.tail(lines)) + "\n")
+
+
 def create_app() -> web.Application:
     app = web.Application(middlewares=[cors_middleware])
     app.router.add_get("/api/chat", handle_chat)
+    app.router.add_get("/api/engines", handle_engines)
+    app.router.add_get("/ready", handle_ready)
+    app.router.add_get("/api/engines/{index}/log", handle_engine_log)
     return app
 
 
@@ -493,10 +639,23 @@ def main():
     parser.add_argument("--ssl", default=os.environ.get("SSL_DIR", ""))
     args = parser.parse_args()
 
-    global omni, _session_lock
-    omni = LlamaOmni()
-    omni.start_server()
-    omni.omni_init("")  # warm load; per-connection begin_session re-inits if the prompt differs
+    # Engine i listens on MINICPM_O_CPP_PORT+i; with more than one, each writes under
+    # its own OUTPUT_DIR/engine_i so the TTS watchers and prefill slots never collide.
+    global pool
+    n = instance_count()
+    engines = [
+        LlamaOmni(i, CPP_PORT + i, OUTPUT_DIR if n == 1 else os.path.join(OUTPUT_DIR, f"engine_{i}"))
+        for i in range(n)
+    ]
+    prompts = warm_prompts()
+    for i, engine in enumerate(engines):   # one at a time: concurrent GGUF loads spike VRAM
+        t0 = time.perf_counter()
+        engine.start_server()
+        # Warm load with a likely persona; the pool routes sessions to a matching engine
+        # and begin_session only re-inits (full restart) on a prompt switch.
+        engine.omni_init(prompts[i % len(prompts)])
+        engine.load_s = time.perf_counter() - t0
+    pool = EnginePool(engines)
 
     ssl_context = None
     if args.ssl:
@@ -508,13 +667,19 @@ def main():
         else:
             logger.warning("SSL dir %s missing cert.pem/key.pem — serving plain", args.ssl)
 
+    async def _close_engines(app: web.Application):
+        await pool.close()
+        for engine in engines:
+            await engine.close()
+
     async def _make_app():
-        global _session_lock
-        _session_lock = asyncio.Lock()
-        return create_app()
+        pool.start()
+        app = create_app()
+        app.on_cleanup.append(_close_engines)
+        return app
 
-    logger.info("MiniCPM-o bridge (llama.cpp-omni) on %s:%d (ssl=%s)",
-                args.host, args.port, ssl_context is not None)
+    logger.info("MiniCPM-o bridge (llama.cpp-omni, %d engine(s)) on %s:%d (ssl=%s)",
+                n, args.host, args.port, ssl_context is not None)
     web.run_app(_make_app(), host=args.host, port=args.port, ssl_context=ssl_context)
 
 
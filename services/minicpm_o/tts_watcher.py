@@ -0,0 +1,261 @@
+"""Event-driven watcher for llama.cpp-omni's TTS WAV output.
+
+The C++ Token2Wav writes each audio segment as <output_dir>/tts_wav/wav_N.wav
+(or per round, <output_dir>/round_NNN/tts_wav/wav_N.wav) asynchronously to the
+decode call. Instead of re-listing every directory every 0.1 s, we ask the kernel
+(inotify, via ctypes - no extra dependency) to tell us when a wav_N.wav is
+closed after writing, and push its path straight into an asyncio queue.
+
+Files are emitted once each, in index order per directory. A wav_N that closes
+before a lower-numbered file still on disk is held back until that one is
+emitted (Token2Wav finishes segments out of order), and anything still held is
+flushed at close(). Directories created later (round_*/tts_wav) are picked up
+from IN_CREATE events on their parents.
+Where inotify isn't available (non-Linux, or the watch limit is exhausted) the
+same logic runs from a poller every MINICPM_O_TTS_POLL_S seconds (default 0.05),
+which only considers files whose WAV header says they are complete.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import re
+import struct
+from pathlib import Path
+
+logger = logging.getLogger("minicpm-o-server")
+
+_WAV_RE = re.compile(r"^wav_(\d+)\.wav$")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (then the NUL-padded name)
+
+_libc = None
+
+
+def _inotify_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return _libc
+
+
+def _wav_index(name: str) -> int | None:
+    m = _WAV_RE.match(name)
+    return int(m.group(1)) if m else None
+
+
+def _wav_complete(path: Path) -> bool:
+    """True once the RIFF header's sizes agree with the file on disk (writer is done)."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            size = os.fstat(f.fileno()).st_size
+    except OSError:
+        return False
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return False
+    return 8 + struct.unpack("<I", head[4:8])[0] == size and size > 44
+
+
+class TTSWavWatcher:
+    """Feeds newly written wav_N.wav paths under `root` into `self.queue`.
+
+    `queue` yields Path objects in emission order and a final None after close().
+    """
+
+    def __init__(self, root: str, poll_s: float | None = None):
+        self.root = Path(root)
+        self.poll_s = poll_s if poll_s is not None else float(
+            os.environ.get("MINICPM_O_TTS_POLL_S", "0.05")
+        )
+        self.queue: asyncio.Queue[Path | None] = asyncio.Queue()
+        self.mode = "off"
+        self.emitted = 0
+        self._high: dict[Path, int] = {}
+        self._held: dict[Path, dict[int, str]] = {}   # closed, waiting on a lower index
+        self._fd: int | None = None
+        self._wds: dict[int, Path] = {}
+        self._poll_task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    # -- lifecycle --
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        try:
+            self._start_inotify()
+            self.mode = "inotify"
+        except (OSError, AttributeError) as e:
+            self._close_fd()
+            logger.warning("[tts-watch] inotify unavailable (%s); polling every %.0f ms",
+                           e, self.poll_s * 1000)
+            self.mode = "poll"
+            self._poll_task = self._loop.create_task(self._poll())
+        logger.info("[tts-watch] watching %s (%s)", self.root, self.mode)
+
+    def close(self) -> None:
+        """Stop watching, emit anything completed meanwhile, then a final None."""
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        self._close_fd()
+        self._scan_all()
+        for d in list(self._held):
+            self._release(d, flush=True)
+        self.queue.put_nowait(None)
+        self.mode = "off"
+
+    def _close_fd(self) -> None:
+        if self._fd is not None:
+            if self._loop is not None:
+                self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        self._wds.clear()
+
+    # -- emission --
+    def _offer(self, d: Path, name: str) -> None:
+        idx = _wav_index(name)
+        if idx is None or idx <= self._high.get(d, -1):
+            return
+        self._held.setdefault(d, {})[idx] = name
+        self._release(d)
+
+    def _release(self, d: Path, flush: bool = False) -> None:
+        """Emit held files in index order, stopping at a gap a file on disk will fill."""
+        held = self._held.get(d)
+        while held:
+            idx = min(held)
+            high = self._high.get(d, -1)
+            if not flush and idx != high + 1 and self._written_between(d, high, idx):
+                return
+            self._high[d] = idx
+            self.emitted += 1
+            self.queue.put_nowait(d / held.pop(idx))
+
+    @staticmethod
+    def _written_between(d: Path, low: int, high: int) -> bool:
+        # Only gaps with a file being written wait; numbering may start above 0 or skip.
+        try:
+            names = os.listdir(d)
+        except OSError:
+            return False
+        return any(low < i < high for n in names if (i := _wav_index(n)) is not None)
+
+    def _scan_dir(self, d: Path) -> None:
+        """Offer already-complete files in `d` (catch-up when a watch is added)."""
+        try:
+            names = os.listdir(d)
+        except OSError:
+            return
+        high = self._high.get(d, -1)
+        found = sorted(
+            (i, n) for n in names if (i := _wav_index(n)) is not None and i > high
+        )
+        for _, name in found:
+            if not _wav_complete(d / name):
+                break   # keep order: later files wait for this one's close event
+            self._offer(d, name)
+
+    def _tts_dirs(self) -> list[Path]:
+        dirs = [self.root / "tts_wav"]
+        try:
+            dirs += [self.root / rd / "tts_wav" for rd in sorted(os.listdir(self.root))
+                     if rd.startswith("round_")]
+        except OSError:
+            pass
+        return [d for d in dirs if d.is_dir()]
+
+    def _scan_all(self) -> None:
+        for d in self._tts_dirs():
+            self._scan_dir(d)
+
+    # -- inotify backend --
+    def _start_inotify(self) -> None:
+        libc = _inotify_libc()
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self._fd = fd
+        self._add_watch(self.root, IN_CREATE | IN_MOVED_TO)
+        for rd in self._round_dirs():
+            self._add_watch(rd, IN_CREATE | IN_MOVED_TO)
+        for d in self._tts_dirs():
+            self._add_tts_watch(d)
+        self._loop.add_reader(fd, self._on_readable)
+
+    def _round_dirs(self) -> list[Path]:
+        try:
+            return [self.root / rd for rd in sorted(os.listdir(self.root)) if rd.startswith("round_")]
+        except OSError:
+            return []
+
+    def _add_watch(self, path: Path, mask: int) -> None:
+        wd = _inotify_libc().inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch({path}): {os.strerror(err)}")
+        self._wds[wd] = path
+
+    def _add_tts_watch(self, d: Path) -> None:
+        # Watch first, then scan, so nothing closes unseen in between.
+        self._add_watch(d, IN_CLOSE_WRITE | IN_MOVED_TO)
+        self._scan_dir(d)
+
+    def _on_readable(self) -> None:
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.warning("[tts-watch] inotify read failed: %s", e)
+            return
+        try:
+            self._handle_events(buf)
+        except OSError as e:
+            # Typically ENOSPC (max_user_watches) on a new round dir: degrade to polling.
+            logger.warning("[tts-watch] %s; switching to polling", e)
+            self._close_fd()
+            self.mode = "poll"
+            self._poll_task = self._loop.create_task(self._poll())
+
+    def _handle_events(self, buf: bytes) -> None:
+        off = 0
+        while off + _EVENT.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, off)
+            name = buf[off + _EVENT.size: off + _EVENT.size + length].rstrip(b"\0").decode()
+            off += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                self._scan_all()
+                continue
+            if mask & IN_IGNORED:
+                self._wds.pop(wd, None)
+                continue
+            parent = self._wds.get(wd)
+            if parent is None or not name:
+                continue
+            path = parent / name
+            if mask & IN_ISDIR:
+                if parent == self.root and name.startswith("round_"):
+                    self._add_watch(path, IN_CREATE | IN_MOVED_TO)
+                    if (path / "tts_wav").is_dir():
+                        self._add_tts_watch(path / "tts_wav")
+                elif name == "tts_wav":
+                    self._add_tts_watch(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._offer(parent, name)
+
+    # -- polling fallback --
+    async def _poll(self) -> None:
+        while True:
+            self._scan_all()
+            await asyncio.sleep(self.poll_s)
@@ -7,6 +7,8 @@ meanvc_server.py, so it's a drop-in swap selected by run_all.sh (VC_ENGINE=xvc):
     GET/POST /api/meanvc/load-target   - register a target voice (precompute conditions)
     GET      /api/meanvc/stream        - browser-mediated VC (legacy/fallback)
     GET      /api/meanvc/chat-proxy    - server-side VC bridge to PersonaPlex (the live path)
+    GET      /api/meanvc/upstream      - PersonaPlex connection pool / setup-time metrics
+    GET      /api/meanvc/recordings/{id}[/{file}] - server-side proxy recordings (Range OK)
 
 It reuses X-VC's OFFICIAL inference code verbatim (bins.infer_utils:
 load_xvc / precompute_conditions / run_stream_chunk_forward and the run_streaming
@@ -24,23 +26,27 @@ Env:
   MEANVC_PORT          listen port (default 5002)
   SSL_DIR              dir with cert.pem/key.pem
   PERSONAPLEX_PROXY_HOST / PERSONAPLEX_PROXY_PORT   default 127.0.0.1 / 8000
+  PERSONAPLEX_PROXY_SCHEME / PERSONAPLEX_PROXY_UDS  optional plain-WS / Unix-socket hop
   XVC_PROXY_DEBUG_DIR  optional: dump exactly-what-PersonaPlex-hears WAVs
+  VC_PROXY_MAX_QUEUE_MS / VC_PROXY_DROP_POLICY / VC_PROXY_ECHO_MAX / VC_PROXY_STATS_S
+                       chat-proxy backpressure (common/backpressure.py)
+  VC_RECORD_DIR / VC_RECORD_FORMAT / VC_RECORD_GROW_S
+                       server-side chat-proxy recordings (common/recorder.py)
 """
 import asyncio
+import json
 import logging
 import os
 import sys
 import time
 import uuid
-import wave
-from urllib.parse import urlencode
+from pathlib import Path
 
 import numpy as np
 import torch
 from aiohttp import web
 import aiohttp
 import sphn
-import torchaudio
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("xvc_server")
@@ -58,8 +64,24 @@ from bins.infer_utils import (  # noqa: E402  (import after sys.path setup)
 from models.codec.sac.utils import process_audio  # noqa: E402
 from utils.audio import audio_highpass_filter  # noqa: E402
 
+# Helpers shared with the MeanVC server live in services/common/.
+COMMON_DIR = str(Path(__file__).resolve().parents[1] / "common")
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
+
+from pplx_upstream import PersonaPlexUpstream  # noqa: E402
+from resample import StreamingResampler  # noqa: E402
+from backpressure import AudioQueue, EchoSender, ProxyConfig, ProxyStats  # noqa: E402
+from wire import OpusEncoder, UplinkDecoder, encode_pcm, parse_codec  # noqa: E402
+from recorder import MmapWavWriter, SessionRecorder, recording_file, recording_meta  # noqa: E402
+from preload import ModelPreloader  # noqa: E402
+from prosody import ProsodyReporter  # noqa: E402
+
 TAG_AUDIO = b"\x01"      # converted audio -> PersonaPlex (Opus)
-TAG_VC_USER = b"\x03"    # converted user PCM (float32 16k) -> browser
+TAG_VC_USER = b"\x03"    # converted user voice (float32 16k by default) -> browser
+# 0x04 = proxy lag/drop stats as UTF-8 JSON -> browser (common/backpressure.py)
+TAG_RECORDING = b"\x05"  # server-side recording id + tracks, UTF-8 JSON (common/recorder.py)
+# 0x06 = live prosody of mic / converted voice / reply, UTF-8 JSON -> browser (common/prosody.py)
 
 XVC_CONFIG = os.environ.get("XVC_CONFIG", os.path.join(XVC_DIR, "configs/xvc.yaml"))
 XVC_CKPT = os.environ.get("XVC_CKPT", os.path.join(XVC_DIR, "ckpts/xvc.pt"))
@@ -71,8 +93,8 @@ CURRENT_MS = int(os.environ.get("XVC_CURRENT_MS", 120))
 SMOOTH_MS = int(os.environ.get("XVC_SMOOTH_MS", 20))
 FUTURE_MS = int(os.environ.get("XVC_FUTURE_MS", 100))
 
-PERSONAPLEX_HOST = os.environ.get("PERSONAPLEX_PROXY_HOST", "127.0.0.1")
-PERSONAPLEX_PORT = os.environ.get("PERSONAPLEX_PROXY_PORT", "8000")
+# One pooled, pre-warmed client for every proxy session (common/pplx_upstream.py).
+upstream = PersonaPlexUpstream.from_env()
 
 # Globals populated on startup.
 cfg: dict | None = None
@@ -81,21 +103,12 @@ device: torch.device | None = None
 SR = 16000
 HP_CUT = 0.0
 MASK_TARGET_COND = True
+preloader = ModelPreloader("xvc")
 
 # target_id -> (speaker_condition, frame_condition)
 targets: dict[str, tuple[torch.Tensor, torch.Tensor]] = {}
 
 
-def _save_wav(path: str, pcm: np.ndarray, sr: int) -> None:
-    pcm = np.clip(pcm, -1.0, 1.0)
-    ints = (pcm * 32767.0).astype("<i2")
-    with wave.open(path, "wb") as w:
-        w.setnchannels(1)
-        w.setsampwidth(2)
-        w.setframerate(sr)
-        w.writeframes(ints.tobytes())
-
-
 class XVCStreamSession:
     """Online driver around X-VC's official per-window forward.
 
@@ -199,21 +212,30 @@ async def handle_load_target(request: web.Request) -> web.Response:
             pass
 
 
-def _maybe_resampler(source_sr: int):
+def _maybe_resampler(source_sr: int) -> StreamingResampler | None:
+    # One stateful resampler per stream, so chunk boundaries don't click.
     if source_sr == SR:
         return None
-    return torchaudio.transforms.Resample(orig_freq=source_sr, new_freq=SR).to("cpu")
+    return StreamingResampler(source_sr, SR)
 
 
 async def handle_stream(request: web.Request) -> web.WebSocketResponse:
     """GET /api/meanvc/stream - browser-mediated VC (legacy fallback).
 
-    Browser sends raw float32 PCM; we return converted float32 PCM (16 kHz).
+    Browser sends mic PCM; we return converted PCM (16 kHz). Both default to raw
+    float32; ?codec= / ?echo_codec= negotiate s16 or Opus (see common/wire.py).
     """
     target_id = request.query.get("target_id", "")
     source_sr = int(request.query.get("source_sr", SR))
     ws = web.WebSocketResponse()
     await ws.prepare(request)
+    try:
+        codec = parse_codec(request.query.get("codec"))
+        echo_codec = parse_codec(request.query.get("echo_codec"))
+    except ValueError as e:
+        await ws.send_json({"error": str(e)})
+        await ws.close()
+        return ws
     if target_id not in targets:
         await ws.send_json({"error": f"Unknown target_id: {target_id}"})
         await ws.close()
@@ -221,19 +243,28 @@ async def handle_stream(request: web.Request) -> web.WebSocketResponse:
 
     spk, frame = targets[target_id]
     session = XVCStreamSession(spk, frame)
-    resampler = _maybe_resampler(source_sr)
+    uplink = UplinkDecoder(codec, source_sr)
+    resampler = _maybe_resampler(uplink.sr)
+    if echo_codec == "opus":
+        echo_resampler = StreamingResampler(SR, 24000)
+        echo_opus = OpusEncoder(24000)
     loop = asyncio.get_event_loop()
-    await ws.send_json({"status": "ready"})
+    await ws.send_json({"status": "ready", "codec": codec, "echo_codec": echo_codec})
 
     async for msg in ws:
         if msg.type == web.WSMsgType.BINARY:
-            incoming = np.frombuffer(msg.data, dtype=np.float32).copy()
+            incoming = uplink.decode(msg.data)
             if resampler is not None:
-                incoming = resampler(torch.from_numpy(incoming).unsqueeze(0)).squeeze(0).numpy()
+                incoming = resampler.process(incoming).copy()
             curs = await loop.run_in_executor(None, session.feed, incoming)
             for cur in curs:
-                if not ws.closed:
-                    await ws.send_bytes(cur.tobytes())
+                if ws.closed:
+                    break
+                if echo_codec == "opus":
+                    for page in echo_opus.encode(echo_resampler.process(cur)):
+                        await ws.send_bytes(page)
+                else:
+                    await ws.send_bytes(encode_pcm(cur, echo_codec))
         elif msg.type in (web.WSMsgType.CLOSE, web.WSMsgType.ERROR):
             break
     return ws
@@ -242,19 +273,34 @@ async def handle_stream(request: web.Request) -> web.WebSocketResponse:
 async def handle_chat_proxy(request: web.Request) -> web.WebSocketResponse:
     """GET /api/meanvc/chat-proxy - server-side VC bridge to PersonaPlex.
 
-    Browser sends raw float32 mic PCM; we convert each window with X-VC, Opus-encode
-    at 24 kHz, and forward to PersonaPlex over localhost. PersonaPlex's framed replies
-    (0x00/0x01/0x02) are relayed back verbatim; the converted user PCM (16 kHz) is also
-    sent back tagged 0x03 for the browser's downloads/monitor.
+    Browser sends mic PCM; we convert each window with X-VC, Opus-encode at 24 kHz,
+    and forward to PersonaPlex over localhost. PersonaPlex's framed replies
+    (0x00/0x01/0x02) are relayed back verbatim; the converted user voice is also
+    sent back tagged 0x03 for the browser's downloads/monitor. ?codec= / ?echo_codec=
+    pick the uplink and 0x03 formats (f32 | s16 | opus, default f32). Mic audio is
+    bounded by a drop policy and the session's lag is reported as 0x04 JSON frames
+    (common/backpressure.py). With VC_RECORD_DIR set, mic / converted / reply audio
+    is recorded to disk and announced as a 0x05 JSON frame (common/recorder.py).
+    Running pitch/voicing/energy statistics of all three are streamed as 0x06 JSON
+    frames, with a final one when the session ends (common/prosody.py).
     """
     target_id = request.query.get("target_id", "default")
     source_sr = int(request.query.get("source_sr", SR))
     voice_prompt = request.query.get("voice_prompt", "")
     text_prompt = request.query.get("text_prompt", "")
-    resampler = _maybe_resampler(source_sr)
 
     browser_ws = web.WebSocketResponse()
     await browser_ws.prepare(request)
+    try:
+        codec = parse_codec(request.query.get("codec"))
+        echo_codec = parse_codec(request.query.get("echo_codec"))
+        flow = ProxyConfig(request.query)
+    except ValueError as e:
+        await browser_ws.send_json({"error": str(e)})
+        await browser_ws.close()
+        return browser_ws
+    uplink = UplinkDecoder(codec, source_sr)
+    resampler = _maybe_resampler(uplink.sr)
     if target_id not in targets:
         await browser_ws.send_json({"error": f"Unknown target_id: {target_id}"})
         await browser_ws.close()
@@ -266,105 +312,205 @@ async def handle_chat_proxy(request: web.Request) -> web.WebSocketResponse:
 
     # X-VC outputs 16 kHz; sphn's Opus encoder only accepts 24/48 kHz (PersonaPlex
     # uses 24 kHz = its mimi rate). Encode at 24 kHz and upsample before encoding.
-    opus_writer = sphn.OpusStreamWriter(24000)
-    out_resampler = torchaudio.transforms.Resample(16000, 24000).to("cpu")
-    OPUS_FRAME = 1920
+    opus_enc = OpusEncoder(24000)
+    out_resampler = StreamingResampler(SR, 24000)
 
-    debug_dir = os.environ.get("XVC_PROXY_DEBUG_DIR")
-    opus_reader_dbg = sphn.OpusStreamReader(24000) if debug_dir else None
-    debug_pcm: list[np.ndarray] = []
-
-    qs = urlencode({"voice_prompt": voice_prompt, "text_prompt": text_prompt})
-    pplx_url = f"wss://{PERSONAPLEX_HOST}:{PERSONAPLEX_PORT}/api/chat?{qs}"
-    logger.info(f"[xvc proxy] connecting to PersonaPlex: {pplx_url}")
-
-    client = aiohttp.ClientSession()
+    logger.info(
+        f"[xvc proxy] connecting to PersonaPlex: {upstream.chat_url(voice_prompt, text_prompt)}"
+    )
     try:
-        pplx_ws = await client.ws_connect(pplx_url, ssl=False, max_msg_size=0)
+        pplx_ws, connect_ms = await upstream.connect(voice_prompt, text_prompt)
     except Exception as e:
         logger.error(f"[xvc proxy] PersonaPlex connect failed: {e}")
         await browser_ws.send_json({"error": f"PersonaPlex unavailable: {e}"})
         await browser_ws.close()
-        await client.close()
         return browser_ws
+    logger.info(f"[xvc proxy] PersonaPlex connected in {connect_ms:.1f} ms")
+
+    debug_dir = os.environ.get("XVC_PROXY_DEBUG_DIR")
+    opus_reader_dbg = sphn.OpusStreamReader(24000) if debug_dir else None
+    debug_wav = None
+    # Opened only once connected, so a failed connect has nothing to close.
+    if debug_dir:
+        os.makedirs(debug_dir, exist_ok=True)
+        debug_wav = MmapWavWriter(
+            os.path.join(debug_dir, f"pplx_input_{target_id}_{int(time.time())}.wav"), 24000
+        )
+
+    try:
+        rec = SessionRecorder.from_env(
+            request.query,
+            {"mic": uplink.sr, "vc": SR, "reply": 24000},
+            meta={"server": "xvc", "target_id": target_id,
+                  "voice_prompt": voice_prompt, "text_prompt": text_prompt},
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"[xvc proxy] recording disabled: {e}")
+        rec = None
+    if rec is not None:
+        await browser_ws.send_bytes(TAG_RECORDING + json.dumps(rec.info()).encode("utf-8"))
+    prosody = (ProsodyReporter({"mic": SR, "vc": SR, "reply": 24000})
+               if flow.prosody_s > 0 else None)
+    reply_reader = sphn.OpusStreamReader(24000) if rec is not None or prosody is not None else None
 
     chunk_count = 0
-    opus_pcm_buf = np.zeros(0, dtype=np.float32)
+    # Mic audio waits in a bounded queue (drop policy) instead of piling up
+    # unread in the socket; the 0x03 echo goes out on its own low-priority task.
+    in_q = AudioQueue(SR, flow.max_queue_ms, flow.drop_policy)
+    echo = EchoSender(browser_ws, TAG_VC_USER, flow.echo_max, droppable=echo_codec != "opus")
+    stats = ProxyStats(in_q, echo, chunk_ms=CURRENT_MS)
 
-    async def browser_to_pplx():
-        nonlocal chunk_count, opus_pcm_buf
+    async def browser_reader():
         async for msg in browser_ws:
             if msg.type == web.WSMsgType.BINARY:
-                incoming = np.frombuffer(msg.data, dtype=np.float32).copy()
+                incoming = uplink.decode(msg.data)
+                if rec is not None:
+                    rec.write("mic", incoming)
                 if resampler is not None:
-                    incoming = resampler(torch.from_numpy(incoming).unsqueeze(0)).squeeze(0).numpy()
-                try:
-                    curs = await loop.run_in_executor(None, session.feed, incoming)
-                except Exception as e:
-                    logger.error(f"[xvc proxy] inference error: {e}")
-                    continue
-
-                for cur in curs:
-                    chunk_count += 1
-                    cur_24k = (
-                        out_resampler(torch.from_numpy(cur).unsqueeze(0)).squeeze(0).numpy()
-                    )
-                    opus_pcm_buf = np.concatenate([opus_pcm_buf, cur_24k])
-                    while len(opus_pcm_buf) >= OPUS_FRAME:
-                        frame_pcm = np.ascontiguousarray(opus_pcm_buf[:OPUS_FRAME])
-                        opus_pcm_buf = opus_pcm_buf[OPUS_FRAME:]
-                        opus_writer.append_pcm(frame_pcm)
-                        while True:
-                            encoded = opus_writer.read_bytes()
-                            if len(encoded) == 0:
-                                break
-                            await pplx_ws.send_bytes(TAG_AUDIO + encoded)
-                            if opus_reader_dbg is not None:
-                                opus_reader_dbg.append_bytes(encoded)
-                                pcm = opus_reader_dbg.read_pcm()
-                                if pcm.shape[-1] > 0:
-                                    debug_pcm.append(pcm.astype(np.float32))
-                    if not browser_ws.closed:
-                        await browser_ws.send_bytes(TAG_VC_USER + cur.tobytes())
+                    incoming = resampler.process(incoming)
+                if prosody is not None:
+                    prosody.feed("mic", incoming)
+                in_q.put_nowait(incoming.copy())
             elif msg.type in (web.WSMsgType.CLOSE, web.WSMsgType.ERROR):
                 break
+        in_q.close()
+
+    async def vc_to_pplx():
+        nonlocal chunk_count
+        while True:
+            incoming = await in_q.get()
+            if incoming is None:
+                break
+            t0 = time.perf_counter()
+            try:
+                curs = await loop.run_in_executor(None, session.feed, incoming)
+            except Exception as e:
+                logger.error(f"[xvc proxy] inference error: {e}")
+                continue
+            if curs:
+                stats.record_inference((time.perf_counter() - t0) * 1000 / len(curs))
+
+            for cur in curs:
+                chunk_count += 1
+                if rec is not None:
+                    rec.write("vc", cur)
+                if prosody is not None:
+                    prosody.feed("vc", cur)
+                pages = opus_enc.encode(out_resampler.process(cur))
+                for encoded in pages:
+                    await pplx_ws.send_bytes(TAG_AUDIO + encoded)
+                    if opus_reader_dbg is not None:
+                        opus_reader_dbg.append_bytes(encoded)
+                        pcm = opus_reader_dbg.read_pcm()
+                        if pcm.shape[-1] > 0:
+                            debug_wav.write(pcm.reshape(-1))
+                if echo_codec == "opus":
+                    for encoded in pages:
+                        echo.push(encoded)
+                else:
+                    echo.push(encode_pcm(cur, echo_codec))
 
     async def pplx_to_browser():
         async for msg in pplx_ws:
             if msg.type == aiohttp.WSMsgType.BINARY:
                 if not browser_ws.closed:
                     await browser_ws.send_bytes(msg.data)
+                if reply_reader is not None and msg.data[:1] == TAG_AUDIO:
+                    reply_reader.append_bytes(msg.data[1:])
+                    reply = reply_reader.read_pcm().reshape(-1)
+                    if rec is not None:
+                        rec.write("reply", reply)
+                    if prosody is not None:
+                        prosody.feed("reply", reply)
             elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.ERROR):
                 break
 
     tasks = [
-        asyncio.create_task(browser_to_pplx()),
+        asyncio.create_task(browser_reader()),
+        asyncio.create_task(vc_to_pplx()),
         asyncio.create_task(pplx_to_browser()),
     ]
+    # Best-effort side channels; they never end the session on their own.
+    side_tasks = [
+        asyncio.create_task(echo.run()),
+        asyncio.create_task(stats.report(browser_ws, flow.stats_s)),
+    ]
+    if prosody is not None:
+        side_tasks.append(asyncio.create_task(prosody.report(browser_ws, flow.prosody_s)))
     try:
         _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
         for task in pending:
             task.cancel()
         await asyncio.gather(*pending, return_exceptions=True)
     finally:
+        echo.close()
+        for task in side_tasks:
+            task.cancel()
+        await asyncio.gather(*side_tasks, return_exceptions=True)
         await pplx_ws.close()
-        await client.close()
+        if prosody is not None:
+            # Final statistics: to the browser if it is still there, the log and the recording.
+            final = await prosody.finish(browser_ws)
+            logger.info(f"[xvc proxy] prosody: {json.dumps(final)}")
+            if rec is not None:
+                rec.meta["prosody"] = final
         if not browser_ws.closed:
             await browser_ws.close()
 
-    if debug_dir and debug_pcm:
+    if debug_wav is not None:
+        debug_wav.close()
+        logger.info(f"[xvc proxy] saved PersonaPlex-input audio to {debug_wav.path}")
+    if rec is not None:
         try:
-            os.makedirs(debug_dir, exist_ok=True)
-            out_path = os.path.join(debug_dir, f"pplx_input_{target_id}_{int(time.time())}.wav")
-            _save_wav(out_path, np.concatenate(debug_pcm), 24000)
-            logger.info(f"[xvc proxy] saved PersonaPlex-input audio to {out_path}")
+            meta = await rec.close()
+            logger.info(f"[xvc proxy] recording {rec.id}: {meta['tracks']}")
         except Exception as e:
-            logger.error(f"[xvc proxy] failed to save debug WAV: {e}")
+            logger.error(f"[xvc proxy] failed to finalize recording {rec.id}: {e}")
 
-    logger.info(f"[xvc proxy] closed after {chunk_count} chunks")
+    logger.info(
+        f"[xvc proxy] closed after {chunk_count} chunks ({codec} uplink "
+        f"{uplink.bytes_in / 1024:.0f} KiB, {echo_codec} echo {echo.sent_bytes / 1024:.0f} KiB, "
+        f"dropped {in_q.dropped_ms:.0f} ms mic / {echo.dropped} echo)"
+    )
     return browser_ws
 
 
+async def handle_recording_meta(request: web.Request) -> web.Response:
+    """GET /api/meanvc/recordings/{rec_id} - track list of a proxy recording."""
+    meta = await recording_meta(os.environ.get("VC_RECORD_DIR"), request.match_info["rec_id"])
+    if meta is None:
+        return web.json_response({"error": "Unknown recording"}, status=404)
+    return web.json_response(meta)
+
+
+async def handle_recording_file(request: web.Request) -> web.StreamResponse:
+    """GET /api/meanvc/recordings/{rec_id}/{name} - one track, with Range support."""
+    path = await recording_file(
+        os.environ.get("VC_RECORD_DIR"), request.match_info["rec_id"], request.match_info["name"]
+    )
+    if path is None:
+        return web.json_response({"error": "Unknown recording file"}, status=404)
+    return web.FileResponse(path)
+
+
+async def handle_ready(request: web.Request) -> web.Response:
+    """GET /ready - 200 once the model is loaded and warm, else 503; with timings."""
+    return web.json_response(preloader.status(), status=200 if preloader.ready else 503)
+
+
+async def handle_upstream_stats(request: web.Request) -> web.Response:
+    """GET /api/meanvc/upstream - PersonaPlex connection pool + setup-time metrics."""
+    return web.json_response(upstream.stats())
+
+
+@web.middleware
+async def ready_middleware(request: web.Request, handler):
+    # The model loads in the background (so /ready can answer meanwhile); refuse work until then.
+    if not preloader.ready and request.path.startswith("/api/meanvc/") and request.method != "OPTIONS":
+        return web.json_response(preloader.status(), status=503)
+    return await handler(request)
+
+
 @web.middleware
 async def cors_middleware(request: web.Request, handler):
     if request.method == "OPTIONS":
@@ -373,19 +519,26 @@ async def cors_middleware(request: web.Request, handler):
         resp = await handler(request)
     resp.headers["Access-Control-Allow-Origin"] = "*"
     resp.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-    resp.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    resp.headers["Access-Control-Allow-Headers"] = "Content-Type, Range"
+    resp.headers["Access-Control-Expose-Headers"] = "Content-Range, Accept-Ranges, Content-Length"
     return resp
 
 
 def create_app() -> web.Application:
-    app = web.Application(middlewares=[cors_middleware], client_max_size=10 * 1024 * 1024)
+    app = web.Application(
+        middlewares=[cors_middleware, ready_middleware], client_max_size=10 * 1024 * 1024
+    )
+    app.router.add_get("/ready", handle_ready)
     app.router.add_post("/api/meanvc/load-target", handle_load_target)
     app.router.add_get("/api/meanvc/stream", handle_stream)
     app.router.add_get("/api/meanvc/chat-proxy", handle_chat_proxy)
+    app.router.add_get("/api/meanvc/upstream", handle_upstream_stats)
+    app.router.add_get("/api/meanvc/recordings/{rec_id}", handle_recording_meta)
+    app.router.add_get("/api/meanvc/recordings/{rec_id}/{name}", handle_recording_file)
     return app
 
 
-async def on_startup(app: web.Application):
+def _load_model():
     global cfg, model, device, SR, HP_CUT, MASK_TARGET_COND
     logger.info(f"[xvc] loading model: config={XVC_CONFIG} ckpt={XVC_CKPT} device={XVC_DEVICE}")
     cfg, model, device = load_xvc(XVC_CONFIG, XVC_CKPT, XVC_DEVICE, XVC_EMA_LOAD)
@@ -393,9 +546,37 @@ async def on_startup(app: web.Application):
     HP_CUT = float(cfg.get("highpass_cutoff_freq", 0.0))
     MASK_TARGET_COND = bool(cfg.get("dataloader", {}).get("mask_target_condition", True))
     logger.info(
-        f"[xvc] ready: sr={SR} hp_cut={HP_CUT} window(ms) chunk={CHUNK_MS} "
+        f"[xvc] loaded: sr={SR} hp_cut={HP_CUT} window(ms) chunk={CHUNK_MS} "
         f"current={CURRENT_MS} smooth={SMOOTH_MS} future={FUTURE_MS}"
     )
+    return model
+
+
+def _warmup(_model):
+    # Condition on a throwaway target and push two windows through the streaming
+    # forward, so cuDNN autotuning and allocator growth happen before the first user.
+    with torch.inference_mode():
+        target_wav = torch.randn((1, 1, 3 * SR), device=device) * 1e-2
+        if MASK_TARGET_COND:
+            pad = torch.zeros((1, 1, int(2.4 * SR)), device=device)
+            target_wav_cond = torch.cat([target_wav, pad], dim=-1)
+        else:
+            target_wav_cond = target_wav
+        spk, frame = precompute_conditions(model, target_wav, target_wav_cond)
+    session = XVCStreamSession(spk, frame)
+    session.feed(np.zeros((CHUNK_MS + 2 * CURRENT_MS) * SR // 1000, dtype=np.float32))
+    if device is not None and device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+async def on_startup(app: web.Application):
+    preloader.add("xvc", _load_model, warmup=_warmup)
+    preloader.start()
+    await upstream.start()
+
+
+async def on_cleanup(app: web.Application):
+    await upstream.close()
 
 
 def main():
@@ -404,6 +585,7 @@ def main():
     port = int(os.environ.get("MEANVC_PORT", 5002))
     app = create_app()
     app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
     ssl_dir = os.environ.get("SSL_DIR", "/app/ssl")
     ssl_context = None
     cert_file = os.path.join(ssl_dir, "cert.pem")